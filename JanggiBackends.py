@@ -0,0 +1,9 @@
+# Author: John Cheshire
+# Date: March 9, 2021
+# Description: This file names each JanggiBoard backend, so tools that take a
+#               board on the command line can share one list of them.
+from JanggiGame import JanggiBoard
+from JanggiBitboard import BitboardJanggiBoard
+from JanggiMailbox import MailboxJanggiBoard
+
+BOARD_CLASSES = {"list": JanggiBoard, "bitboard": BitboardJanggiBoard, "mailbox": MailboxJanggiBoard}
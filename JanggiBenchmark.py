@@ -0,0 +1,202 @@
+# Author: John Cheshire
+# Date: March 9, 2021
+# Description: This file contains benchmarks for the JanggiGame classes that
+#               are not covered by perft, starting with how much memory a live
+#               game takes, how long the move tables take to build, how fast
+#               a single move is checked and how fast a position is loaded.
+#               Run it as a script to print the results.
+import gc
+import sys
+import time
+import tracemalloc
+from JanggiGame import JanggiGame, JanggiBoard, JanggiPiece, Soldier, build_move_tables, build_line_tables
+from JanggiGame import PIECE_CLASSES, SQUARE_LOCATIONS, get_move_squares
+from JanggiBitboard import BitboardJanggiBoard
+from JanggiPerft import POSITIONS, make_position
+
+# Most bytes per game the memory test allows on the list board
+MAX_BYTES_PER_GAME = 5500
+# Most seconds building the move tables may take, since it happens on import
+MAX_TABLE_SECONDS = 0.05
+
+
+def measure_game_memory(count: int = 1000, board_class: type = JanggiBoard) -> float:
+    """
+    Measures the memory held by new games while they are alive
+    :param count: Number of games to create
+    :param board_class: Board class for the games to use
+    :return: Bytes allocated for each game
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        games = [JanggiGame(board_class) for _ in range(count)]
+        used = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    del games
+    return used / count
+
+
+def _make_dict_piece_class(piece_class: type) -> type:
+    """
+    Makes a subclass of a piece class without slots, whose instances keep
+    their piece type and on board flag in an attribute dictionary, as every
+    piece did before pieces had slots
+    :param piece_class: The piece class, for example Chariot
+    :return: The subclass
+    """
+    def __init__(self, color: str):
+        piece_class.__init__(self, color)
+        self._piece_type = piece_class._piece_type
+        self._on_board = False
+    return type("Dict" + piece_class.__name__, (piece_class,), {"__init__": __init__})
+
+
+# Unslotted subclass of each piece class, by piece class
+DICT_PIECE_CLASSES = {piece_class: _make_dict_piece_class(piece_class) for piece_class in PIECE_CLASSES}
+
+
+def _measure_pieces(count: int, piece_classes: dict) -> float:
+    """
+    Measures the memory held by the pieces of new games
+    :param count: Number of games' worth of pieces to create
+    :param piece_classes: Dictionary of piece class to the class to create instead
+    :return: Bytes allocated for each game's pieces
+    """
+    game = JanggiGame()
+    pieces = game.get_side("red").get_pieces(True) + game.get_side("blue").get_pieces(True)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        created = [piece_classes[type(piece)](piece.get_color()) for _ in range(count) for piece in pieces]
+        used = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    del created
+    return used / count
+
+
+def measure_dict_piece_game_memory(count: int = 1000) -> float:
+    """
+    Measures the memory new games would hold if their pieces kept their
+    attributes in a dictionary. Such pieces cannot play, so a game is
+    measured as it is and its pieces are measured again as the unslotted
+    subclasses in DICT_PIECE_CLASSES.
+    :param count: Number of games to create
+    :return: Bytes allocated for each game
+    """
+    slotted = _measure_pieces(count, {piece_class: piece_class for piece_class in PIECE_CLASSES})
+    unslotted = _measure_pieces(count, DICT_PIECE_CLASSES)
+    return measure_game_memory(count) + unslotted - slotted
+
+
+def measure_piece_size() -> int:
+    """
+    Returns the size of one piece object, counting its attribute dictionary
+    if it has one
+    :return: Size in bytes
+    """
+    piece = Soldier("red")
+    size = sys.getsizeof(piece)
+    if hasattr(piece, "__dict__"):
+        size += sys.getsizeof(piece.__dict__)
+    return size
+
+
+def measure_table_construction(repeat: int = 20) -> float:
+    """
+    Times building the precomputed move tables
+    :param repeat: Number of times to build them
+    :return: Fastest build in seconds
+    """
+    fastest = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build_move_tables()
+        build_line_tables()
+        seconds = time.perf_counter() - start
+        if fastest is None or seconds < fastest:
+            fastest = seconds
+    return fastest
+
+
+def find_check_candidates(game: JanggiGame) -> list:
+    """
+    Lists the moves a user might send for the side to move: every legal move,
+    and each one again to the opposite space, which is usually not a move
+    :param game: The JanggiGame to look at
+    :return: list of (piece, row, column) tuples
+    """
+    board = game.get_board()
+    candidates = []
+    for move in game.legal_moves():
+        from_square, to_square = get_move_squares(move)
+        piece = board.get_space_info(*SQUARE_LOCATIONS[from_square])
+        row, column = SQUARE_LOCATIONS[to_square]
+        candidates.append((piece, row, column))
+        candidates.append((piece, 9 - row, 8 - column))
+    return candidates
+
+
+def measure_move_checks(repeat: int = 20) -> (float, float):
+    """
+    Times checking single moves on the perft positions, once by searching
+    each piece's list of valid moves and once with the pieces' direct checks
+    :param repeat: Number of times to check every candidate move
+    :return: Tuple of microseconds per check for the list and the direct way
+    """
+    positions = []
+    for name in POSITIONS:
+        game = make_position(name)
+        positions.append((game.get_board(), find_check_candidates(game)))
+    count = sum(len(candidates) for board, candidates in positions) * repeat
+
+    results = []
+    for check in (JanggiPiece.check_move, None):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for board, candidates in positions:
+                for piece, row, column in candidates:
+                    if check is None:
+                        piece.check_move(row, column, board)
+                    else:
+                        check(piece, row, column, board)
+        results.append((time.perf_counter() - start) / count * 1000000)
+    return results[0], results[1]
+
+
+def measure_position_load(name: str = "palace", repeat: int = 50) -> (float, float):
+    """
+    Times setting up one of the perft positions from its position string,
+    and by playing its moves from a new game
+    :param name: Key of the position in POSITIONS
+    :param repeat: Number of times to set it up each way
+    :return: Tuple of microseconds per set up from the string and by playing the moves
+    """
+    position = make_position(name).to_position()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        JanggiGame.from_position(position)
+    load_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        make_position(name)
+    replay_seconds = time.perf_counter() - start
+    return load_seconds / repeat * 1000000, replay_seconds / repeat * 1000000
+
+
+if __name__ == "__main__":
+    print("Move table build milliseconds:", round(measure_table_construction() * 1000, 2))
+    print("Bytes per piece:", measure_piece_size())
+    for name, measured_class in (("list", JanggiBoard), ("bitboard", BitboardJanggiBoard)):
+        print("Bytes per game on the", name, "board:", round(measure_game_memory(board_class=measured_class)))
+    print("Bytes per game with dictionary pieces:", round(measure_dict_piece_game_memory()))
+    list_check, direct_check = measure_move_checks()
+    print("Microseconds per move check from the move list:", round(list_check, 2))
+    print("Microseconds per direct move check:", round(direct_check, 2))
+    load, replay = measure_position_load()
+    print("Microseconds to load a position string:", round(load, 1))
+    print("Microseconds to play the same position's moves:", round(replay, 1))
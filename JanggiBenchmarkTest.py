@@ -0,0 +1,65 @@
+import os
+import pickle
+import unittest
+from JanggiGame import JanggiGame, JanggiPiece
+from JanggiBenchmark import measure_game_memory, measure_dict_piece_game_memory, measure_piece_size, \
+    measure_table_construction, find_check_candidates, measure_move_checks, measure_position_load, \
+    MAX_BYTES_PER_GAME, MAX_TABLE_SECONDS
+from JanggiPerft import POSITIONS, make_position
+
+
+class JanggiBenchmarkTest(unittest.TestCase):
+    """Janggi benchmark tests"""
+
+    def test_piece_size(self):
+        """Tests that pieces do not carry an attribute dictionary"""
+        for piece in JanggiGame().get_side("red").get_pieces(True):
+            self.assertIsInstance(piece, JanggiPiece)
+            self.assertFalse(hasattr(piece, "__dict__"))
+        self.assertLess(measure_piece_size(), 100)
+
+    def test_game_memory(self):
+        """Tests that a live game stays under the recorded memory ceiling"""
+        self.assertLess(measure_game_memory(200), MAX_BYTES_PER_GAME)
+
+    def test_dict_piece_memory(self):
+        """Tests that slotted pieces make a game smaller than pieces with attribute dictionaries"""
+        self.assertLess(measure_game_memory(200), measure_dict_piece_game_memory(200))
+
+    def test_table_construction(self):
+        """Tests that the move tables are quick to build on import"""
+        self.assertLess(measure_table_construction(3), MAX_TABLE_SECONDS)
+
+    def test_move_checks(self):
+        """Tests that the direct move checks agree with the move lists"""
+        for name in POSITIONS:
+            game = make_position(name)
+            board = game.get_board()
+            for piece, row, column in find_check_candidates(game):
+                self.assertEqual(JanggiPiece.check_move(piece, row, column, board),
+                                 piece.check_move(row, column, board), (name, piece, row, column))
+
+    @unittest.skipUnless(os.environ.get("JANGGI_BENCHMARK"), "set JANGGI_BENCHMARK=1 to run benchmarks")
+    def test_move_check_speed(self):
+        """Tests that the direct move checks are faster than searching the move lists"""
+        list_check, direct_check = measure_move_checks(3)
+        self.assertLess(direct_check, list_check)
+
+    @unittest.skipUnless(os.environ.get("JANGGI_BENCHMARK"), "set JANGGI_BENCHMARK=1 to run benchmarks")
+    def test_position_load(self):
+        """Tests that loading a position string is faster than playing its moves"""
+        load, replay = measure_position_load(repeat=5)
+        self.assertLess(load, replay)
+
+    def test_pickle_slotted_pieces(self):
+        """Tests that games with slotted pieces can be sent to other processes"""
+        game = JanggiGame()
+        game.make_move("c7", "c6")
+        copy = pickle.loads(pickle.dumps(game))
+        self.assertEqual(game.position_key(), copy.position_key())
+        self.assertEqual(game.legal_moves(), copy.legal_moves())
+        self.assertEqual((5, 2), copy.get_board().get_space_info(5, 2).get_location())
+
+
+if __name__ == '__main__':
+    unittest.main()
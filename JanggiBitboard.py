@@ -0,0 +1,282 @@
+# Author: John Cheshire
+# Date: March 9, 2021
+# Description: This file contains a JanggiBoard backend that stores the
+#               position as 90 bit integer bitboards, one for each color and
+#               piece type, and generates moves from attack tables that are
+#               built once when the module is imported. Use it by passing it
+#               to the game, for example JanggiGame(BitboardJanggiBoard).
+from JanggiGame import JanggiBoard, JanggiPiece
+from JanggiGame import General, Guard, Horse, Elephant, Chariot, Cannon, Soldier
+from JanggiGame import PIECE_CLASSES, SQUARE_LOCATIONS
+# The list board's move tables, which the bitboard tables are made from
+from JanggiGame import HORSE_MOVES as LIST_HORSE_MOVES, ELEPHANT_MOVES as LIST_ELEPHANT_MOVES
+from JanggiGame import PALACE_MOVES as LIST_PALACE_MOVES, SOLDIER_MOVES as LIST_SOLDIER_MOVES
+
+# Squares are numbered row * 9 + column, so bit 0 is "a1" and bit 89 is "i10"
+ROWS = 10
+COLUMNS = 9
+SQUARES = ROWS * COLUMNS
+
+COLORS = ("red", "blue")
+
+# Orthogonal directions first, then the palace diagonals
+ORTHOGONAL_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIAGONAL_DIRECTIONS = ((1, 1), (-1, 1), (-1, -1), (1, -1))
+
+
+def _location_mask(locations: tuple) -> int:
+    """
+    Builds a bitboard of some locations
+    :param locations: Tuple of row, column locations
+    :return: Bitboard with the bit of each location set
+    """
+    mask = 0
+    for row, column in locations:
+        mask |= 1 << (row * COLUMNS + column)
+    return mask
+
+
+def _build_target_table(location_tables: dict) -> dict:
+    """
+    Builds the General and Guard or the Soldier table from the list board's
+    table of destinations
+    :param location_tables: Dictionary of color to a list indexed by square
+                            of tuples of destinations
+    :return: Dictionary of color to a list of bitboards indexed by square
+    """
+    return {color: [_location_mask(targets) for targets in table] for color, table in location_tables.items()}
+
+
+def _build_leaper_table(location_table: list) -> list:
+    """
+    Builds the Horse or Elephant table from the list board's table. Each entry
+    is a list of (blocking bitboard, destination square) for the moves that
+    stay on the board
+    :param location_table: List indexed by square of tuples of moves, each
+                           the spaces passed through and then the destination
+    :return: List of move lists indexed by square
+    """
+    return [[(_location_mask(move[:-1]), move[-1][0] * COLUMNS + move[-1][1]) for move in moves]
+            for moves in location_table]
+
+
+def _build_ray_tables() -> list:
+    """
+    Builds the Chariot and Cannon ray table. Orthogonal rays run to the edge of
+    the board. Diagonal rays only exist inside the palace and stop at its edge.
+    :return: List indexed by direction then square of (ray bitboard, ray is increasing)
+    """
+    tables = []
+    for direction in ORTHOGONAL_DIRECTIONS + DIAGONAL_DIRECTIONS:
+        diagonal = direction in DIAGONAL_DIRECTIONS
+        table = []
+        for row, column in SQUARE_LOCATIONS:
+            mask = 0
+            if not diagonal or JanggiBoard.check_space_in_palace(row, column):
+                target_row, target_column = row + direction[0], column + direction[1]
+                while JanggiBoard.check_location_on_board(target_row, target_column) and \
+                        (not diagonal or JanggiBoard.check_space_in_palace(target_row, target_column)):
+                    mask |= 1 << (target_row * COLUMNS + target_column)
+                    target_row, target_column = target_row + direction[0], target_column + direction[1]
+            table.append(mask)
+        tables.append((table, direction[0] > 0 or (direction[0] == 0 and direction[1] > 0)))
+    return tables
+
+
+PALACE_NEIGHBORS = _build_target_table(LIST_PALACE_MOVES)
+HORSE_MOVES = _build_leaper_table(LIST_HORSE_MOVES)
+ELEPHANT_MOVES = _build_leaper_table(LIST_ELEPHANT_MOVES)
+RAYS = _build_ray_tables()
+SOLDIER_MOVES = _build_target_table(LIST_SOLDIER_MOVES)
+
+
+def _first_blocker(blockers: int, increasing: bool) -> int:
+    """
+    Finds the square of the blocker closest to the start of a ray
+    :param blockers: Bitboard of the occupied squares on the ray, not 0
+    :param increasing: Whether the ray runs toward higher square numbers
+    :return: Square of the closest blocker
+    """
+    if increasing:
+        return (blockers & -blockers).bit_length() - 1
+    return blockers.bit_length() - 1
+
+
+def squares_to_locations(mask: int) -> list:
+    """
+    Converts a bitboard to a list of row, column locations
+    :param mask: Bitboard of squares
+    :return: list of (row, column) tuples in square order
+    """
+    locations = []
+    while mask:
+        low_bit = mask & -mask
+        locations.append(SQUARE_LOCATIONS[low_bit.bit_length() - 1])
+        mask ^= low_bit
+    return locations
+
+
+class BitboardJanggiBoard(JanggiBoard):
+    """
+    A JanggiBoard that also keeps a bitboard for each color and piece type and
+    uses them with precomputed attack tables to find valid moves
+    """
+    def __init__(self, spaces: list = None):
+        """Initializes the board and builds the bitboards from the spaces"""
+        super().__init__(spaces)
+        self._pieces = {color: [0] * len(PIECE_CLASSES) for color in COLORS}
+        self._colors = {color: 0 for color in COLORS}
+        self._cannons = 0
+        for row, column in SQUARE_LOCATIONS:
+            piece = self._spaces[row][column]
+            if piece is not None:
+                self._add_bit(row * COLUMNS + column, piece)
+
+    def _add_bit(self, square: int, piece: JanggiPiece):
+        """
+        Adds a piece to the bitboards
+        :param square: Square the piece is on
+        :param piece: Piece to add
+        :return: Nothing
+        """
+        bit = 1 << square
+        type_index = PIECE_CLASSES.index(type(piece))
+        self._pieces[piece.get_color()][type_index] |= bit
+        self._colors[piece.get_color()] |= bit
+        if type_index == 5:
+            self._cannons |= bit
+
+    def _remove_bit(self, square: int, piece: JanggiPiece):
+        """
+        Removes a piece from the bitboards
+        :param square: Square the piece is on
+        :param piece: Piece to remove
+        :return: Nothing
+        """
+        bit = ~(1 << square)
+        type_index = PIECE_CLASSES.index(type(piece))
+        self._pieces[piece.get_color()][type_index] &= bit
+        self._colors[piece.get_color()] &= bit
+        self._cannons &= bit
+
+    def set_space_info(self, row: int, column: int, piece: JanggiPiece):
+        """
+        Sets the piece on a specific board space and updates the bitboards
+        :param row: Row to set
+        :param column: Column to set
+        :param piece: Piece to set in space
+        :return: Nothing
+        """
+        current_piece = self._spaces[row][column]
+        if current_piece is not None:
+            self._remove_bit(row * COLUMNS + column, current_piece)
+        super().set_space_info(row, column, piece)
+        if piece is not None:
+            self._add_bit(row * COLUMNS + column, piece)
+
+    def clear_space(self, row: int, column: int):
+        """
+        Sets the specified space to be empty and updates the bitboards
+        :param row: row of space to clear
+        :param column: column of space to clear
+        :return: nothing
+        """
+        current_piece = self._spaces[row][column]
+        if current_piece is not None:
+            self._remove_bit(row * COLUMNS + column, current_piece)
+        super().clear_space(row, column)
+
+    def get_bitboard(self, color: str, piece_type: type = None) -> int:
+        """
+        Returns the bitboard of one color, optionally of one piece type
+        :param color: "red" or "blue"
+        :param piece_type: Piece class, for example Chariot, or None for all pieces
+        :return: Bitboard of the squares holding those pieces
+        """
+        if piece_type is None:
+            return self._colors[color]
+        return self._pieces[color][PIECE_CLASSES.index(piece_type)]
+
+    def get_occupied(self) -> int:
+        """
+        Returns the bitboard of all occupied squares
+        :return: Bitboard of occupied squares
+        """
+        return self._colors["red"] | self._colors["blue"]
+
+    def find_move_mask(self, piece: JanggiPiece) -> int:
+        """
+        Finds the valid moves of a piece as a bitboard
+        :param piece: The piece to find moves for
+        :return: Bitboard of the destination squares
+        """
+        row, column = piece.get_location()
+        square = row * COLUMNS + column
+        color = piece.get_color()
+        own = self._colors[color]
+        occupied = own | self._colors["blue" if color == "red" else "red"]
+        piece_class = type(piece)
+
+        if piece_class is Chariot:
+            mask = 0
+            for table, increasing in RAYS:
+                ray = table[square]
+                blockers = ray & occupied
+                if blockers:
+                    ray ^= table[_first_blocker(blockers, increasing)]
+                mask |= ray
+            return mask & ~own
+
+        if piece_class is Cannon:
+            mask = 0
+            cannons = self._cannons
+            for table, increasing in RAYS:
+                blockers = table[square] & occupied
+                if not blockers:
+                    continue
+                screen = _first_blocker(blockers, increasing)
+                # A cannon cannot be jumped over
+                if cannons >> screen & 1:
+                    continue
+                ray = table[screen]
+                blockers = ray & occupied
+                if blockers:
+                    target = _first_blocker(blockers, increasing)
+                    ray ^= table[target]
+                    # Only an enemy piece that is not a cannon can be taken
+                    if own >> target & 1 or cannons >> target & 1:
+                        ray &= ~(1 << target)
+                mask |= ray
+            return mask
+
+        if piece_class is Horse or piece_class is Elephant:
+            table = HORSE_MOVES if piece_class is Horse else ELEPHANT_MOVES
+            mask = 0
+            for blocking, target in table[square]:
+                if not blocking & occupied:
+                    mask |= 1 << target
+            return mask & ~own
+
+        if piece_class is Soldier:
+            return SOLDIER_MOVES[color][square] & ~own
+
+        # General and Guard
+        return PALACE_NEIGHBORS[color][square] & ~own
+
+    def generate_valid_moves(self, piece: JanggiPiece) -> list:
+        """
+        Creates a list of all valid moves for a piece using the bitboards
+        :param piece: The piece to find moves for
+        :return: list of moves that are valid
+        """
+        return squares_to_locations(self.find_move_mask(piece))
+
+    def check_move(self, piece: JanggiPiece, row: int, column: int) -> bool:
+        """
+        Determine whether or not the requested move is valid for a piece
+        :param piece: The piece to move
+        :param row: Row of move destination
+        :param column: Column of move destination
+        :return: True or False
+        """
+        return bool(self.find_move_mask(piece) >> (row * COLUMNS + column) & 1)
@@ -0,0 +1,74 @@
+import random
+import unittest
+from JanggiGame import JanggiGame, JanggiBoard, General, Guard, Horse, Elephant, Chariot, Cannon, Soldier, encode_move
+from JanggiBitboard import BitboardJanggiBoard
+
+
+class BitboardJanggiBoardTest(unittest.TestCase):
+    """Bitboard backend tests"""
+
+    def setUp(self) -> None:
+        self.my_game = JanggiGame(BitboardJanggiBoard)
+
+    def assert_same_moves(self, board: BitboardJanggiBoard):
+        """Compares every piece's moves against the list based generator"""
+        for row in board.get_board_layout():
+            for piece in row:
+                if piece is not None:
+                    self.assertEqual(sorted(piece.find_valid_moves(board)),
+                                     sorted(board.find_valid_moves(piece)),
+                                     repr(piece) + str(piece.get_location()))
+
+    def test_bitboards_follow_moves(self):
+        """Tests that the bitboards are updated when pieces move and are taken"""
+        board = self.my_game.get_board()
+        self.assertEqual(32, bin(board.get_occupied()).count("1"))
+        self.assertEqual((1 << 19) | (1 << 25), board.get_bitboard("red", Cannon))
+        self.my_game.make_move("a7", "a6")
+        self.my_game.make_move("a4", "a5")
+        self.my_game.make_move("a6", "a5")
+        self.assertEqual(31, bin(board.get_occupied()).count("1"))
+        self.assertEqual(1 << 36, board.get_bitboard("blue", Soldier) & (1 << 36))
+        self.assertEqual(0, board.get_bitboard("red", Soldier) & (1 << 27))
+        self.assertEqual(0, board.get_bitboard("blue") & board.get_bitboard("red"))
+
+    def test_matches_list_generator(self):
+        """Plays random games and compares the generators at every position"""
+        rng = random.Random(7)
+        for game_number in range(5):
+            game = JanggiGame(BitboardJanggiBoard)
+            board = game.get_board()
+            for ply in range(80):
+                self.assert_same_moves(board)
+                pieces = game.get_current_side().get_pieces(True)
+                moves = [encode_move(piece.get_location()[0] * 9 + piece.get_location()[1], move[0] * 9 + move[1])
+                         for piece in pieces for move in piece.find_valid_moves(board)]
+                if not moves or game.get_game_state() != "UNFINISHED":
+                    break
+                board.push(rng.choice(moves))
+                game.change_current_side()
+            # The bitboards kept up to date through the pushes match ones built from scratch
+            rebuilt = BitboardJanggiBoard([row[:] for row in board.get_board_layout()])
+            for color in ("red", "blue"):
+                for piece_class in (General, Guard, Horse, Elephant, Chariot, Cannon, Soldier):
+                    self.assertEqual(rebuilt.get_bitboard(color, piece_class), board.get_bitboard(color, piece_class),
+                                     (game_number, color, piece_class))
+                self.assertEqual(rebuilt.get_bitboard(color), board.get_bitboard(color))
+            self.assertEqual(rebuilt.get_occupied(), board.get_occupied())
+
+    def test_game_play(self):
+        """Tests that a game played on the bitboard backend follows the rules"""
+        self.assertFalse(self.my_game.make_move("b8", "b7"))
+        self.assertTrue(self.my_game.make_move("e9", "e8"))
+        self.assertFalse(self.my_game.make_move("b3", "d3"))
+        self.assertTrue(self.my_game.make_move("c1", "d3"))
+        self.assertTrue(self.my_game.make_move("b8", "g8"))
+        self.assertTrue(self.my_game.make_move("b3", "g3"))
+        self.assertTrue(self.my_game.make_move("g8", "g4"))
+        self.assertFalse(self.my_game.make_move("g3", "g7"))
+        self.assertIsInstance(self.my_game.get_board(), JanggiBoard)
+
+
+if __name__ == "__main__":
+    """Runs the unit test"""
+    unittest.main()
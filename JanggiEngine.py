@@ -0,0 +1,568 @@
+# Author: John Cheshire
+# Date: March 9, 2021
+# Description: This file contains a computer player for JanggiGame. It searches
+#               the game tree with iterative deepening negamax alpha-beta and
+#               stops when a time or node budget runs out, returning the best
+#               move found so far and the line of play it expects.
+import time
+from JanggiGame import JanggiGame, General, Guard, Horse, Elephant, Chariot, Cannon, Soldier
+from JanggiGame import SQUARE_LOCATIONS, MOVE_MASK, CAPTURE_FLAG, encode_move, get_move_squares
+from JanggiTransposition import TranspositionTable, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER
+
+# Piece values used by the evaluation, in hundredths of a soldier's base value
+PIECE_VALUES = {General: 0, Chariot: 1300, Cannon: 700, Horse: 500,
+                Elephant: 300, Guard: 300, Soldier: 200}
+# Score for checkmate, reduced by the number of moves it takes to get there
+MATE_SCORE = 100000
+# Scores at least this close to MATE_SCORE are mates and are stored relative to the position
+MATE_BOUND = MATE_SCORE - 1000
+# Bonus for a soldier that has crossed into the enemy half of the board
+ADVANCED_SOLDIER_BONUS = 20
+# Piece values used to order captures, most valuable victim first and then
+# least valuable attacker. The General is ordered as the most valuable attacker.
+ORDERING_VALUES = {General: 14, Chariot: 13, Cannon: 7, Horse: 5,
+                   Elephant: 3, Guard: 3, Soldier: 2}
+# Deepest distance from the root that killer moves are kept for
+MAX_PLY = 128
+# Value of the General when working out exchanges, so it is always the last attacker
+EXCHANGE_GENERAL_VALUE = 10000
+
+
+def evaluate_position(game: JanggiGame) -> int:
+    """
+    Scores a position for the side to move by material, with a small bonus for
+    soldiers that have crossed the middle of the board
+    :param game: The JanggiGame to score
+    :return: Score in hundredths of a soldier
+    """
+    score = 0
+    for side in (game.get_side("red"), game.get_side("blue")):
+        side_score = 0
+        for piece in side.get_pieces(True):
+            side_score += PIECE_VALUES[type(piece)]
+            if type(piece) is Soldier:
+                row = piece.get_location()[0]
+                if (side.get_color() == "red" and row > 4) or (side.get_color() == "blue" and row < 5):
+                    side_score += ADVANCED_SOLDIER_BONUS
+        if side is game.get_current_side():
+            score += side_score
+        else:
+            score -= side_score
+    return score
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time or node budget runs out"""
+    pass
+
+
+class MoveOrdering:
+    """
+    Orders moves for the search: the hash move, then captures by most valuable
+    victim and least valuable attacker, then killer moves for the ply, then the
+    remaining moves by history score. Moves are picked one at a time, so the
+    moves after a cutoff are never scored or sorted.
+    """
+    def __init__(self):
+        """Initializes empty killer move and history tables"""
+        self._killers = [[None, None] for ply in range(MAX_PLY)]
+        # History scores indexed by from square * 90 + to square
+        self._history = [0] * (90 * 90)
+
+    def clear(self):
+        """
+        Forgets all killer moves and history scores
+        :return: Nothing
+        """
+        self._killers = [[None, None] for ply in range(MAX_PLY)]
+        self._history = [0] * (90 * 90)
+
+    @staticmethod
+    def _history_index(move: int) -> int:
+        """
+        Returns the history table index of a move
+        :param move: The move
+        :return: from square * 90 + to square
+        """
+        return move & MOVE_MASK
+
+    def order_moves(self, board, moves: list, hash_move: int, ply: int):
+        """
+        Generates the moves in search order
+        :param board: The JanggiBoard the moves are for
+        :param moves: The legal moves
+        :param hash_move: Best move from the transposition table, or None
+        :param ply: Distance from the root
+        :return: Generator of moves
+        """
+        if hash_move in moves:
+            yield hash_move
+
+        captures = []
+        quiet_moves = []
+        for move in moves:
+            if move == hash_move:
+                continue
+            if not move & CAPTURE_FLAG:
+                quiet_moves.append(move)
+            else:
+                from_square, to_square = get_move_squares(move)
+                victim = board.get_space_info(*SQUARE_LOCATIONS[to_square])
+                attacker = board.get_space_info(*SQUARE_LOCATIONS[from_square])
+                captures.append((ORDERING_VALUES[type(victim)] * 16 - ORDERING_VALUES[type(attacker)], move))
+
+        # Pick the best capture left each time instead of sorting them all
+        while captures:
+            best_index = 0
+            for index in range(1, len(captures)):
+                if captures[index][0] > captures[best_index][0]:
+                    best_index = index
+            yield captures.pop(best_index)[1]
+
+        killers = self._killers[ply] if ply < MAX_PLY else []
+        for killer in killers:
+            if killer is not None and killer in quiet_moves:
+                quiet_moves.remove(killer)
+                yield killer
+
+        history = self._history
+        scored_moves = None
+        while quiet_moves:
+            if scored_moves is None:
+                scored_moves = [(history[self._history_index(move)], move) for move in quiet_moves]
+                quiet_moves = scored_moves
+            best_index = 0
+            for index in range(1, len(scored_moves)):
+                if scored_moves[index][0] > scored_moves[best_index][0]:
+                    best_index = index
+            yield scored_moves.pop(best_index)[1]
+
+    def record_cutoff(self, move: int, depth: int, ply: int):
+        """
+        Remembers a quiet move that caused a beta cutoff
+        :param move: The move that caused the cutoff
+        :param depth: Remaining depth where the cutoff happened
+        :param ply: Distance from the root
+        :return: Nothing
+        """
+        if ply < MAX_PLY:
+            killers = self._killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self._history[self._history_index(move)] += depth * depth
+
+    def get_killers(self, ply: int) -> list:
+        """
+        Returns the killer moves for a ply
+        :param ply: Distance from the root
+        :return: list of two moves, either may be None
+        """
+        return list(self._killers[ply])
+
+    def get_history(self, move: int) -> int:
+        """
+        Returns the history score of a move
+        :param move: The move
+        :return: History score
+        """
+        return self._history[self._history_index(move)]
+
+
+class JanggiEngine:
+    """
+    The JanggiEngine class picks moves for the side to move in a JanggiGame.
+    It searches one depth at a time until its budget runs out, so a complete
+    answer is always ready when time is up.
+    """
+    def __init__(self, game: JanggiGame, time_limit: float = None, node_limit: int = None,
+                 max_depth: int = 64, transposition_table: TranspositionTable = None,
+                 quiescence: bool = True):
+        """
+        Initializes the engine for a game and a search budget
+        :param game: The JanggiGame to search. Moves are made and taken back on
+                     it during the search, it is left as it was afterwards.
+        :param time_limit: Seconds allowed for a search, or None for no limit
+        :param node_limit: Positions allowed for a search, or None for no limit
+        :param max_depth: Deepest search to try
+        :param transposition_table: Table of earlier results, kept between
+                                    searches. A 16 MB table is made if None.
+        :param quiescence: Whether to follow captures past the search depth
+                           before evaluating
+        """
+        self._game = game
+        self._time_limit = time_limit
+        self._node_limit = node_limit
+        self._max_depth = max_depth
+        if transposition_table is None:
+            transposition_table = TranspositionTable(16)
+        self._transposition_table = transposition_table
+        self._move_ordering = MoveOrdering()
+        self._quiescence = quiescence
+        self._pruned_captures = 0
+        self._iterations = []
+        self._deadline = None
+        self._nodes = 0
+        self._depth = 0
+        self._score = 0
+        self._pv = []
+
+    def search(self, root_moves: list = None, start_depth: int = 1) -> (int, list):
+        """
+        Searches the current position of the game
+        :param root_moves: Legal moves to choose between, in the order to try
+                           them, or None for every legal move
+        :param start_depth: Depth of the first iteration, up to max_depth
+        :return: Tuple of the best move and the principal variation, a list of
+                 moves starting with the best move. The best move is None if the
+                 side to move has no legal moves.
+        """
+        self._iterations = []
+        self._nodes = 0
+        self._pruned_captures = 0
+        self._depth = 0
+        self._score = 0
+        self._pv = []
+        self._deadline = None
+        if self._time_limit is not None:
+            self._deadline = time.perf_counter() + self._time_limit
+
+        if root_moves is None:
+            root_moves = self._game.legal_moves()
+        else:
+            root_moves = list(root_moves)
+        if not root_moves:
+            return None, []
+
+        for depth in range(max(1, min(start_depth, self._max_depth)), self._max_depth + 1):
+            try:
+                score, pv = self._search_root(root_moves, depth)
+            except SearchTimeout:
+                break
+            self._depth = depth
+            self._score = score
+            self._pv = pv
+            self._iterations.append((depth, score, pv))
+            # Search the best move first at the next depth
+            root_moves.remove(pv[0])
+            root_moves.insert(0, pv[0])
+            # No need to go deeper once a forced mate is found
+            if abs(score) >= MATE_SCORE - self._max_depth:
+                break
+
+        # Fall back to any legal move if not even depth 1 finished
+        if not self._pv:
+            self._pv = [root_moves[0]]
+        return self._pv[0], list(self._pv)
+
+    def get_nodes(self) -> int:
+        """
+        Returns the number of positions visited by the last search
+        :return: Node count
+        """
+        return self._nodes
+
+    def get_depth(self) -> int:
+        """
+        Returns the deepest search that finished in the last search
+        :return: Depth in moves
+        """
+        return self._depth
+
+    def get_score(self) -> int:
+        """
+        Returns the score of the best move from the side to move's point of view
+        :return: Score in hundredths of a soldier
+        """
+        return self._score
+
+    def get_iterations(self) -> list:
+        """
+        Returns the result of every depth that finished in the last search
+        :return: list of (depth, score, principal variation) tuples
+        """
+        return list(self._iterations)
+
+    def get_pruned_captures(self) -> int:
+        """
+        Returns the number of losing captures skipped by the last search
+        :return: Count of captures skipped in the quiescence search
+        """
+        return self._pruned_captures
+
+    def get_transposition_table(self) -> TranspositionTable:
+        """
+        Returns the transposition table used by the search
+        :return: TranspositionTable object
+        """
+        return self._transposition_table
+
+    def evaluate(self) -> int:
+        """
+        Scores the current position for the side to move
+        :return: Score in hundredths of a soldier
+        """
+        return evaluate_position(self._game)
+
+    def _check_budget(self):
+        """
+        Counts a node and stops the search if the budget has run out
+        :return: Nothing
+        """
+        self._nodes += 1
+        if self._node_limit is not None and self._nodes > self._node_limit:
+            raise SearchTimeout()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchTimeout()
+
+    def _search_root(self, root_moves: list, depth: int) -> (int, list):
+        """
+        Searches every root move to the given depth
+        :param root_moves: Legal moves at the root, best guess first
+        :param depth: Depth to search
+        :return: Tuple of the best score and principal variation
+        """
+        alpha = -MATE_SCORE - 1
+        beta = MATE_SCORE + 1
+        best_pv = []
+        for move in root_moves:
+            self._game.push_move(move)
+            try:
+                score, pv = self._negamax(depth - 1, -beta, -alpha, 1)
+            finally:
+                self._game.pop_move()
+            score = -score
+            if score > alpha or not best_pv:
+                alpha = score
+                best_pv = [move] + pv
+        return alpha, best_pv
+
+    def _negamax(self, depth: int, alpha: int, beta: int, ply: int) -> (int, list):
+        """
+        Searches the current position with alpha-beta pruning
+        :param depth: Remaining depth
+        :param alpha: Lower bound of the scores of interest
+        :param beta: Upper bound of the scores of interest
+        :param ply: Distance from the root
+        :return: Tuple of the score and principal variation from this position
+        """
+        self._check_budget()
+        if depth <= 0:
+            if self._quiescence:
+                return self._quiescence_search(alpha, beta, ply), []
+            return self.evaluate(), []
+
+        # Use an earlier result for this position if it was searched deep enough
+        key = self._game.position_key()
+        entry = self._transposition_table.probe(key)
+        hash_move = None
+        if entry is not None:
+            entry_depth, bound, score, hash_move = entry
+            if entry_depth >= depth:
+                score = self._score_from_table(score, ply)
+                if bound == BOUND_EXACT:
+                    return score, [hash_move] if hash_move is not None else []
+                if bound == BOUND_LOWER and score >= beta:
+                    return score, []
+                if bound == BOUND_UPPER and score <= alpha:
+                    return score, []
+
+        moves = self._game.legal_moves()
+        if not moves:
+            if self._game.is_in_check(self._game.get_current_side().get_color()):
+                return -MATE_SCORE + ply, []
+            # A side with no moves that is not in check passes its turn
+            general_row, general_column = self._game.get_current_side().get_general().get_location()
+            general_square = general_row * 9 + general_column
+            moves = [encode_move(general_square, general_square)]
+
+        original_alpha = alpha
+        best_pv = []
+        board = self._game.get_board()
+        for move in self._move_ordering.order_moves(board, moves, hash_move, ply):
+            self._game.push_move(move)
+            try:
+                score, pv = self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                self._game.pop_move()
+            score = -score
+            if score > alpha:
+                alpha = score
+                best_pv = [move] + pv
+                if alpha >= beta:
+                    if not move & CAPTURE_FLAG:
+                        self._move_ordering.record_cutoff(move, depth, ply)
+                    break
+
+        if alpha >= beta:
+            bound = BOUND_LOWER
+        elif alpha > original_alpha:
+            bound = BOUND_EXACT
+        else:
+            bound = BOUND_UPPER
+        self._transposition_table.store(key, depth, bound, self._score_to_table(alpha, ply),
+                                        best_pv[0] if best_pv else None)
+        return alpha, best_pv
+
+    @staticmethod
+    def _score_to_table(score: int, ply: int) -> int:
+        """
+        Converts a mate score from distance to the root to distance to this position
+        :param score: Score from the search
+        :param ply: Distance from the root
+        :return: Score to store
+        """
+        if score >= MATE_BOUND:
+            return score + ply
+        if score <= -MATE_BOUND:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _score_from_table(score: int, ply: int) -> int:
+        """
+        Converts a stored mate score back to distance from the root
+        :param score: Stored score
+        :param ply: Distance from the root
+        :return: Score for the search
+        """
+        if score >= MATE_BOUND:
+            return score - ply
+        if score <= -MATE_BOUND:
+            return score + ply
+        return score
+
+    def static_exchange(self, move: int) -> int:
+        """
+        Works out the material won or lost by a capture if both sides keep
+        taking back on the same space with their least valuable piece, and
+        either side may stop when it is ahead. The captures are made on the
+        board, so Chariot lines opened behind a taken piece, Cannon screens
+        that appear or disappear, and Horse and Elephant legs are all counted.
+        Whether a piece is pinned is not considered.
+        :param move: The capture to test
+        :return: Material gained by the side making the capture, can be negative
+        """
+        board = self._game.get_board()
+        square = get_move_squares(move)[1]
+        row, column = SQUARE_LOCATIONS[square]
+        victim = board.get_space_info(row, column)
+        if victim is None:
+            return 0
+        gains = [self._exchange_value(victim)]
+        board.push(move)
+        pushed = 1
+        try:
+            while True:
+                target = board.get_space_info(row, column)
+                attackers = board.find_attackers(row, column, target.get_color())
+                if not attackers:
+                    break
+                attacker = min(attackers, key=self._exchange_value)
+                # The General cannot take back while the space is still defended
+                if type(attacker) is General:
+                    board.push(self._capture_move(attacker, square))
+                    defended = board.find_attackers(row, column, attacker.get_color())
+                    board.pop()
+                    if defended:
+                        break
+                gains.append(self._exchange_value(target) - gains[-1])
+                board.push(self._capture_move(attacker, square))
+                pushed += 1
+        finally:
+            for count in range(pushed):
+                board.pop()
+
+        # Each side picks the better of taking back or stopping
+        for index in range(len(gains) - 1, 0, -1):
+            gains[index - 1] = -max(-gains[index - 1], gains[index])
+        return gains[0]
+
+    @staticmethod
+    def _capture_move(piece, square: int) -> int:
+        """
+        Encodes a piece taking whatever is on a square
+        :param piece: The JanggiPiece making the capture
+        :param square: row * 9 + column of the space it takes on
+        :return: The move
+        """
+        row, column = piece.get_location()
+        return encode_move(row * 9 + column, square, True)
+
+    @staticmethod
+    def _exchange_value(piece) -> int:
+        """
+        Returns the value of a piece when working out exchanges
+        :param piece: The JanggiPiece
+        :return: Piece value
+        """
+        if type(piece) is General:
+            return EXCHANGE_GENERAL_VALUE
+        return PIECE_VALUES[type(piece)]
+
+    def _find_captures(self) -> list:
+        """
+        Finds the legal captures for the side to move
+        :return: list of moves
+        """
+        board = self._game.get_board()
+        color = self._game.get_current_side().get_color()
+        captures = []
+        for piece in self._game.get_current_side().get_pieces(True):
+            from_row, from_column = piece.get_location()
+            from_square = from_row * 9 + from_column
+            for row, column in board.find_valid_moves(piece):
+                if board.get_space_info(row, column) is None:
+                    continue
+                move = encode_move(from_square, row * 9 + column, True)
+                board.push(move)
+                moved_into_check = self._game.is_in_check(color, board)
+                board.pop()
+                if not moved_into_check:
+                    captures.append(move)
+        return captures
+
+    def _quiescence_search(self, alpha: int, beta: int, ply: int) -> int:
+        """
+        Searches captures only until the position is quiet, so positions in the
+        middle of an exchange are not evaluated. The side to move may stand pat
+        on the evaluation instead of capturing, unless it is in check. Captures
+        that lose material by static exchange are skipped.
+        :param alpha: Lower bound of the scores of interest
+        :param beta: Upper bound of the scores of interest
+        :param ply: Distance from the root
+        :return: Score of the position
+        """
+        self._check_budget()
+        if ply >= MAX_PLY:
+            return self.evaluate()
+
+        in_check = self._game.is_in_check(self._game.get_current_side().get_color())
+        if in_check:
+            # Every answer to the check has to be looked at
+            moves = self._game.legal_moves()
+            if not moves:
+                return -MATE_SCORE + ply
+        else:
+            stand_pat = self.evaluate()
+            if stand_pat >= beta:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+            moves = self._find_captures()
+
+        board = self._game.get_board()
+        for move in self._move_ordering.order_moves(board, moves, None, ply):
+            if not in_check and self.static_exchange(move) < 0:
+                self._pruned_captures += 1
+                continue
+            self._game.push_move(move)
+            try:
+                score = -self._quiescence_search(-beta, -alpha, ply + 1)
+            finally:
+                self._game.pop_move()
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
@@ -0,0 +1,173 @@
+import itertools
+import unittest
+from unittest import mock
+from JanggiGame import JanggiGame, Chariot, Cannon, Horse, Soldier, General, encode_move
+from JanggiEngine import JanggiEngine, MoveOrdering, MATE_SCORE
+
+
+class JanggiEngineTest(unittest.TestCase):
+    """Janggi engine tests"""
+
+    def setUp(self) -> None:
+        self.my_game = JanggiGame()
+
+    def play(self, moves: list):
+        """Makes a list of moves on the test game"""
+        for from_space, to_space in moves:
+            self.assertTrue(self.my_game.make_move(from_space, to_space), (from_space, to_space))
+
+    def clear_board(self):
+        """Takes every piece but the generals off the board"""
+        board = self.my_game.get_board()
+        for row in range(10):
+            for column in range(9):
+                piece = board.get_space_info(row, column)
+                if piece is not None and not isinstance(piece, General):
+                    board.clear_space(row, column)
+                    piece.remove()
+
+    def place(self, color: str, piece_class: type, location: (int, int)):
+        """Puts a piece that is off the board on a space"""
+        for piece in self.my_game.get_side(color).get_pieces(False):
+            if type(piece) is piece_class:
+                self.my_game.get_board().update_location(location[0], location[1], piece)
+                return
+        self.fail("No " + piece_class.__name__ + " left")
+
+    def test_finds_mate(self):
+        """Tests that the engine finds a mate in one"""
+        self.play([("i10", "i9"), ("a1", "a1"), ("i9", "f9"), ("a1", "a1"), ("f9", "f4"),
+                   ("a1", "a1"), ("f4", "g4"), ("a1", "a1"), ("g4", "g2"), ("f1", "f2"),
+                   ("a1", "a1"), ("e2", "e1"), ("e7", "e6"), ("a1", "a1"), ("e6", "e5"),
+                   ("a1", "a1"), ("e5", "e4"), ("a1", "a1"), ("e4", "e3"), ("a1", "a1"),
+                   ("h10", "g8"), ("a1", "a1"), ("h8", "e8"), ("e1", "f1")])
+        engine = JanggiEngine(self.my_game, max_depth=2)
+        best_move, pv = engine.search()
+        self.assertEqual(MATE_SCORE - 1, engine.get_score())
+        self.assertEqual(best_move, pv[0])
+        self.my_game.make_move(best_move)
+        self.assertEqual("BLUE_WON", self.my_game.get_game_state())
+
+    def test_takes_free_piece(self):
+        """Tests that a one move search takes the enemy chariot"""
+        self.play([("i10", "i9"), ("a1", "a1"), ("i9", "f9"), ("a1", "a1"), ("f9", "f5"),
+                   ("i1", "i2"), ("a7", "a6"), ("i2", "f2")])
+        engine = JanggiEngine(self.my_game, max_depth=1, quiescence=False)
+        best_move, pv = engine.search()
+        self.assertEqual(encode_move(41, 14, True), best_move)
+        self.assertEqual(1, engine.get_depth())
+
+    def test_start_depth(self):
+        """Tests that iterative deepening can start deeper than one move"""
+        engine = JanggiEngine(self.my_game, max_depth=3)
+        engine.search(start_depth=2)
+        self.assertEqual([2, 3], [depth for depth, score, pv in engine.get_iterations()])
+        engine.search(start_depth=5)
+        self.assertEqual([3], [depth for depth, score, pv in engine.get_iterations()])
+
+    def test_budgets(self):
+        """Tests that the search stops within its time and node budgets"""
+        key = self.my_game.position_key()
+        # A clock that moves on a millisecond each time it is read, so the
+        # deadline passes after about 200 nodes however fast the machine is
+        engine = JanggiEngine(self.my_game, time_limit=0.2)
+        with mock.patch("JanggiEngine.time.perf_counter", side_effect=itertools.count(step=0.001)):
+            best_move, pv = engine.search()
+        self.assertLessEqual(engine.get_nodes(), 201)
+        self.assertIn(best_move, self.my_game.legal_moves())
+        self.assertGreaterEqual(engine.get_depth(), 1)
+        self.assertEqual(key, self.my_game.position_key())
+        self.assertEqual("blue", self.my_game.get_current_side().get_color())
+
+        engine = JanggiEngine(self.my_game, node_limit=50)
+        engine.search()
+        self.assertLessEqual(engine.get_nodes(), 51)
+        self.assertEqual(key, self.my_game.position_key())
+
+    def test_move_ordering(self):
+        """Tests the order moves are searched in"""
+        # Blue chariot on f4 can take the red chariot on f2 or the soldiers on e4 and g4
+        self.play([("i10", "i9"), ("a1", "a1"), ("i9", "f9"), ("a1", "a1"), ("f9", "f5"),
+                   ("i1", "i2"), ("a7", "a6"), ("i2", "f2"), ("f5", "f4"), ("a1", "a1")])
+        board = self.my_game.get_board()
+        moves = self.my_game.legal_moves()
+        ordering = MoveOrdering()
+        hash_move = encode_move(56, 47)
+        killer = encode_move(62, 53)
+        history_move = encode_move(60, 51)
+        ordering.record_cutoff(killer, 1, 2)
+        ordering.record_cutoff(history_move, 3, 5)
+        self.assertEqual([killer, None], ordering.get_killers(2))
+        self.assertEqual(9, ordering.get_history(history_move))
+
+        ordered = list(ordering.order_moves(board, moves, hash_move, 2))
+        self.assertCountEqual(moves, ordered)
+        self.assertEqual(hash_move, ordered[0])
+        self.assertEqual(encode_move(32, 14, True), ordered[1])
+        self.assertCountEqual([encode_move(32, 31, True), encode_move(32, 33, True)], ordered[2:4])
+        self.assertEqual(killer, ordered[4])
+        self.assertEqual(history_move, ordered[5])
+
+    def test_move_ordering_is_lazy(self):
+        """Tests that quiet moves are not scored until they are needed"""
+        ordering = MoveOrdering()
+        moves = self.my_game.legal_moves()
+        generator = ordering.order_moves(self.my_game.get_board(), moves, moves[3], 0)
+        self.assertEqual(moves[3], next(generator))
+        ordering.record_cutoff(moves[5], 4, 1)
+        # History recorded after the first move is still used for the rest
+        self.assertEqual(moves[5], next(generator))
+
+    def test_static_exchange(self):
+        """Tests exchanges with Chariot lines, Cannon screens and Horse legs"""
+        engine = JanggiEngine(self.my_game)
+        self.clear_board()
+        self.place("red", Soldier, (4, 0))
+        self.place("red", Chariot, (0, 0))
+        self.place("blue", Chariot, (6, 0))
+        capture = encode_move(54, 36, True)
+        # The red chariot takes back
+        self.assertEqual(200 - 1300, engine.static_exchange(capture))
+
+        # A blue cannon behind a screen can take back once the chariot has left
+        self.place("blue", Soldier, (7, 0))
+        self.place("blue", Cannon, (8, 0))
+        self.assertEqual(200, engine.static_exchange(capture))
+        self.assertEqual(0, engine.static_exchange(encode_move(54, 45)))
+
+    def test_static_exchange_horse_leg(self):
+        """Tests that a blocked Horse cannot take back"""
+        engine = JanggiEngine(self.my_game)
+        self.clear_board()
+        self.place("red", Soldier, (4, 0))
+        self.place("red", Horse, (2, 1))
+        self.place("blue", Chariot, (4, 4))
+        capture = encode_move(40, 36, True)
+        self.assertEqual(200 - 1300, engine.static_exchange(capture))
+        self.place("blue", Soldier, (3, 1))
+        self.assertEqual(200, engine.static_exchange(capture))
+        key = self.my_game.position_key()
+        engine.static_exchange(capture)
+        self.assertEqual(key, self.my_game.position_key())
+
+    def test_quiescence(self):
+        """Tests that the quiescence search sees the recapture"""
+        self.play([("i10", "i9"), ("a1", "a1"), ("i9", "f9"), ("a1", "a1"), ("f9", "f5"),
+                   ("i1", "i2"), ("a7", "a6"), ("i2", "f2")])
+        # Without quiescence a one move search thinks the chariot is won
+        engine = JanggiEngine(self.my_game, max_depth=1, quiescence=False)
+        engine.search()
+        self.assertEqual(1300, engine.get_score())
+        # Taking the chariot is answered by the guard, so nothing is won
+        engine = JanggiEngine(self.my_game, max_depth=1)
+        engine.search()
+        self.assertEqual(0, engine.get_score())
+        # Losing captures are skipped deeper in the tree
+        engine = JanggiEngine(self.my_game, max_depth=2)
+        engine.search()
+        self.assertGreater(engine.get_pruned_captures(), 0)
+
+
+if __name__ == "__main__":
+    """Runs the unit test"""
+    unittest.main()
@@ -8,7 +8,8 @@
 # Future Plans -    Complete rules for draws
 #                   Add AI implementation
 #                   Improve AI by having learning by playing another AI
-from copy import deepcopy
+import random
+from array import array
 
 
 class JanggiPiece:
@@ -16,7 +17,14 @@ class JanggiPiece:
     This is a super class for all Janggi pieces. The JanggiPiece class and its
     subclasses interact with the JanggiBoard to assist in determining whether or
     not moves are valid.
+    Pieces have no attribute dictionary, which is most of the size of a small
+    object, because every game holds thirty two of them. For the same reason
+    the piece type is a class attribute, and a piece is on the board when it
+    has a row.
     """
+    __slots__ = ("_row", "_column", "_color")
+    _piece_type = None
+
     def __init__(self, color: str):
         """
         Initializes a JanggiPiece with color
@@ -24,8 +32,6 @@ class JanggiPiece:
         """
         self._row = None
         self._column = None
-        self._piece_type = None
-        self._on_board = False
         self._color = color
 
     def __str__(self):
@@ -51,7 +57,6 @@ class JanggiPiece:
         """
         self._row = row
         self._column = column
-        self._on_board = True
 
     def remove(self):
         """
@@ -60,14 +65,13 @@ class JanggiPiece:
         """
         self._row = None
         self._column = None
-        self._on_board = False
 
     def check_piece_on_board(self) -> bool:
         """
         Checks whether a piece is currently on the board
         :return: True or False
         """
-        return self._on_board
+        return self._row is not None
 
     def get_color(self) -> str:
         """
@@ -85,7 +89,9 @@ class JanggiPiece:
 
     def check_move(self, row, column, board: "JanggiBoard") -> bool:
         """
-        Determine whether or not the requested move is valid
+        Determine whether or not the requested move is valid by searching the
+        list of valid moves. The piece classes check a single move directly,
+        and this stays as the reference they must agree with.
         :param row: Row of move destination
         :param column: Column of move destination
         :param board: Board that move is happening on
@@ -97,13 +103,25 @@ class JanggiPiece:
                 return True
         return False
 
+    def _check_destination(self, row: int, column: int, board: "JanggiBoard") -> bool:
+        """
+        Checks that a destination is on the board and does not hold a piece
+        of the same side
+        :param row: Row of move destination
+        :param column: Column of move destination
+        :param board: Board that move is happening on
+        :return: True or False
+        """
+        if row < 0 or row > 9 or column < 0 or column > 8:
+            return False
+        target_piece = board.get_space_info(row, column)
+        return target_piece is None or target_piece.get_color() != self._color
+
 
 class General(JanggiPiece):
     """This is the class for the general piece. It inherits from JanggiPiece"""
-    def __init__(self, color: str):
-        """Initializes the General piece with color"""
-        super().__init__(color)
-        self._piece_type = "General"
+    __slots__ = ()
+    _piece_type = "General"
 
     def __repr__(self):
         """
@@ -114,38 +132,41 @@ class General(JanggiPiece):
 
     def find_valid_moves(self, board: "JanggiBoard") -> list:
         """
-        Creates a list of all valid moves
+        Creates a list of all valid moves from the precomputed palace table
         :param board: The JanggiBoard object to find moves on
         :return: list of moves that are valid
         """
         valid_move_list = []
-        current_position = self.get_location()
+        row, column = self.get_location()
         current_side = self.get_color()
 
-        # Set up the palace row range for either red or blue side
-        if current_side == "red":
-            palace_range = [0, 3]
-        else:
-            palace_range = [7, 10]
-
-        # Iterate over the palace spaces
-        for row in range(palace_range[0], palace_range[1]):
-            for column in range(3, 6):
-                # Check if the space in question is only a move of 1 away
-                if abs(row - current_position[0]) < 2 and abs(column - current_position[1]) < 2:
-                    # Make sure the space is empty or an enemy piece
-                    if board.check_empty_or_enemy_or_off_board(row, column, current_side):
-                        valid_move_list.append((row, column))
+        # Every space next to this one inside the side's own palace
+        for target_position in PALACE_MOVES[current_side][row * 9 + column]:
+            target_piece = board.get_space_info(target_position[0], target_position[1])
+            # Make sure the space is empty or an enemy piece
+            if target_piece is None or target_piece.get_color() != current_side:
+                valid_move_list.append(target_position)
 
         return valid_move_list
 
+    def check_move(self, row, column, board: "JanggiBoard") -> bool:
+        """
+        Determine whether or not the requested move is valid without listing
+        every move: the destination has to be next to the piece in its own palace
+        :param row: Row of move destination
+        :param column: Column of move destination
+        :param board: Board that move is happening on
+        :return: True or False
+        """
+        if (row, column) not in PALACE_MOVES[self._color][self._row * 9 + self._column]:
+            return False
+        return self._check_destination(row, column, board)
+
 
 class Guard(JanggiPiece):
     """This is the class for the Guard piece. It inherits from JanggiPiece"""
-    def __init__(self, color: str):
-        """Initializes the Guard piece with color"""
-        super().__init__(color)
-        self._piece_type = "Guard"
+    __slots__ = ()
+    _piece_type = "Guard"
 
     def __repr__(self):
         """
@@ -156,38 +177,41 @@ class Guard(JanggiPiece):
 
     def find_valid_moves(self, board: "JanggiBoard") -> list:
         """
-        Creates a list of all valid moves
+        Creates a list of all valid moves from the precomputed palace table
         :param board: The JanggiBoard object to find moves on
         :return: list of moves that are valid
         """
         valid_move_list = []
-        current_position = self.get_location()
+        row, column = self.get_location()
         current_side = self.get_color()
 
-        # Set up the palace row range for either red or blue side
-        if current_side == "red":
-            palace_range = [0, 3]
-        else:
-            palace_range = [7, 10]
-
-        # Iterate over the palace spaces
-        for row in range(palace_range[0], palace_range[1]):
-            for column in range(3, 6):
-                # Check if the space in question is only a move of 1 away
-                if abs(row - current_position[0]) < 2 and abs(column - current_position[1]) < 2:
-                    # Make sure the space is empty or an enemy piece
-                    if board.check_empty_or_enemy_or_off_board(row, column, current_side):
-                        valid_move_list.append((row, column))
+        # Every space next to this one inside the side's own palace
+        for target_position in PALACE_MOVES[current_side][row * 9 + column]:
+            target_piece = board.get_space_info(target_position[0], target_position[1])
+            # Make sure the space is empty or an enemy piece
+            if target_piece is None or target_piece.get_color() != current_side:
+                valid_move_list.append(target_position)
 
         return valid_move_list
 
+    def check_move(self, row, column, board: "JanggiBoard") -> bool:
+        """
+        Determine whether or not the requested move is valid without listing
+        every move: the destination has to be next to the piece in its own palace
+        :param row: Row of move destination
+        :param column: Column of move destination
+        :param board: Board that move is happening on
+        :return: True or False
+        """
+        if (row, column) not in PALACE_MOVES[self._color][self._row * 9 + self._column]:
+            return False
+        return self._check_destination(row, column, board)
+
 
 class Horse(JanggiPiece):
     """This is the class for the Horse piece. It inherits from JanggiPiece"""
-    def __init__(self, color: str):
-        """Initializes the Horse piece with color"""
-        super().__init__(color)
-        self._piece_type = "Horse"
+    __slots__ = ()
+    _piece_type = "Horse"
 
     def __repr__(self):
         """
@@ -198,51 +222,48 @@ class Horse(JanggiPiece):
 
     def find_valid_moves(self, board: "JanggiBoard") -> list:
         """
-        Creates a list of all valid moves
+        Creates a list of all valid moves from the precomputed Horse table
         :param board: The JanggiBoard object to find moves on
         :return: list of moves that are valid
         """
         valid_move_list = []
-        current_position = self.get_location()
+        row, column = self.get_location()
         current_side = self.get_color()
-        moves_and_spaces = [[(1, 0), (2, 1)],       # South East
-                            [(1, 0), (2, -1)],      # South West
-                            [(-1, 0), (-2, 1)],     # North East
-                            [(-1, 0), (-2, -1)],    # North West
-                            [(0, -1), (1, -2)],     # West South
-                            [(0, -1), (-1, -2)],    # West North
-                            [(0, 1), (1, 2)],       # East South
-                            [(0, 1), (-1, 2)]]      # East North
-
-        # Go through each possible move
-        for move_direction in moves_and_spaces:
-            # This tracks whether an invalid condition has been found
-            valid_move = True
-
-            # Check each space the piece will move through
-            for row_move, column_move in move_direction:
-                target_position = current_position[0] + row_move, current_position[1] + column_move
-                # If it's the target space of the move, check if it's empty or enemy
-                if (row_move, column_move) == move_direction[-1]:
-                    if not board.check_empty_or_enemy_or_off_board(target_position[0], target_position[1], current_side):
-                        valid_move = False
-                # Check if the space is empty if the piece is just moving through
-                else:
-                    if not board.check_empty_or_off_board(target_position[0], target_position[1], current_side):
-                        valid_move = False
 
-            if valid_move:
-                valid_move_list.append((target_position[0], target_position[1]))
+        # Each move on the board with the space the piece moves through
+        for leg_position, target_position in HORSE_MOVES[row * 9 + column]:
+            if board.get_space_info(leg_position[0], leg_position[1]) is None:
+                target_piece = board.get_space_info(target_position[0], target_position[1])
+                if target_piece is None or target_piece.get_color() != current_side:
+                    valid_move_list.append(target_position)
 
         return valid_move_list
 
+    def check_move(self, row, column, board: "JanggiBoard") -> bool:
+        """
+        Determine whether or not the requested move is valid without listing
+        every move: the destination has to be one step straight and one step
+        diagonal away, and only the leg space it passes is looked at
+        :param row: Row of move destination
+        :param column: Column of move destination
+        :param board: Board that move is happening on
+        :return: True or False
+        """
+        row_move = row - self._row
+        column_move = column - self._column
+        if abs(row_move) == 2 and abs(column_move) == 1:
+            leg_row, leg_column = self._row + row_move // 2, self._column
+        elif abs(row_move) == 1 and abs(column_move) == 2:
+            leg_row, leg_column = self._row, self._column + column_move // 2
+        else:
+            return False
+        return self._check_destination(row, column, board) and board.get_space_info(leg_row, leg_column) is None
+
 
 class Elephant(JanggiPiece):
     """This is the class for the Elephant piece. It inherits from JanggiPiece"""
-    def __init__(self, color: str):
-        """Initializes the Elephant piece with color"""
-        super().__init__(color)
-        self._piece_type = "Elephant"
+    __slots__ = ()
+    _piece_type = "Elephant"
 
     def __repr__(self):
         """
@@ -253,50 +274,53 @@ class Elephant(JanggiPiece):
 
     def find_valid_moves(self, board: "JanggiBoard") -> list:
         """
-        Creates a list of all valid moves
+        Creates a list of all valid moves from the precomputed Elephant table
         :param board: The JanggiBoard object to find moves on
         :return: list of moves that are valid
         """
         valid_move_list = []
-        current_position = self.get_location()
+        row, column = self.get_location()
         current_side = self.get_color()
-        moves_and_spaces = [[(1, 0), (2, 1), (3, 2)],       # South East
-                            [(1, 0), (2, -1), (3, -2)],      # South West
-                            [(-1, 0), (-2, 1), (-3, 2)],     # North East
-                            [(-1, 0), (-2, -1), (-3, -2)],    # North West
-                            [(0, -1), (1, -2), (2, -3)],     # West South
-                            [(0, -1), (-1, -2), (-2, -3)],    # West North
-                            [(0, 1), (1, 2), (2, 3)],       # East South
-                            [(0, 1), (-1, 2), (-2, 3)]]      # East North
-
-        # Go through each possible move
-        for move_direction in moves_and_spaces:
-            # This tracks whether an invalid condition has been found
-            valid_move = True
-
-            # Check each space the piece will move through
-            for row_move, column_move in move_direction:
-                target_position = current_position[0] + row_move, current_position[1] + column_move
-                # If it's the target space of the move, check if it's empty or enemy
-                if (row_move, column_move) == move_direction[-1]:
-                    if not board.check_empty_or_enemy_or_off_board(target_position[0], target_position[1], current_side):
-                        valid_move = False
-                # Check if the space is empty if the piece is just moving through
-                else:
-                    if not board.check_empty_or_off_board(target_position[0], target_position[1], current_side):
-                        valid_move = False
 
-            if valid_move:
-                valid_move_list.append(target_position)
+        # Each move on the board with the two spaces the piece moves through
+        for first_position, second_position, target_position in ELEPHANT_MOVES[row * 9 + column]:
+            if board.get_space_info(first_position[0], first_position[1]) is None and \
+                    board.get_space_info(second_position[0], second_position[1]) is None:
+                target_piece = board.get_space_info(target_position[0], target_position[1])
+                if target_piece is None or target_piece.get_color() != current_side:
+                    valid_move_list.append(target_position)
         return valid_move_list
 
+    def check_move(self, row, column, board: "JanggiBoard") -> bool:
+        """
+        Determine whether or not the requested move is valid without listing
+        every move: the destination has to be one step straight and two steps
+        diagonal away, and only the two spaces it passes are looked at
+        :param row: Row of move destination
+        :param column: Column of move destination
+        :param board: Board that move is happening on
+        :return: True or False
+        """
+        row_move = row - self._row
+        column_move = column - self._column
+        row_step = 1 if row_move > 0 else -1
+        column_step = 1 if column_move > 0 else -1
+        if abs(row_move) == 3 and abs(column_move) == 2:
+            first_position = (self._row + row_step, self._column)
+        elif abs(row_move) == 2 and abs(column_move) == 3:
+            first_position = (self._row, self._column + column_step)
+        else:
+            return False
+        if not self._check_destination(row, column, board):
+            return False
+        return board.get_space_info(first_position[0], first_position[1]) is None and \
+            board.get_space_info(first_position[0] + row_step, first_position[1] + column_step) is None
+
 
 class Chariot(JanggiPiece):
     """This is the class for the Chariot piece. It inherits from JanggiPiece"""
-    def __init__(self, color: str):
-        """Initializes the Chariot piece with color"""
-        super().__init__(color)
-        self._piece_type = "Chariot"
+    __slots__ = ()
+    _piece_type = "Chariot"
 
     def __repr__(self):
         """
@@ -307,57 +331,58 @@ class Chariot(JanggiPiece):
 
     def find_valid_moves(self, board: "JanggiBoard") -> list:
         """
-        Creates a list of all valid moves
+        Creates a list of all valid moves. The end of each line of movement is
+        looked up from the occupancy of the row, column or palace diagonal.
         :param board: The JanggiBoard object to find moves on
         :return: list of moves that are valid
         """
         valid_move_list = []
-        current_position = self.get_location()
+        row, column = self.get_location()
         current_side = self.get_color()
-        moves_directions = [(1, 0),     # South
-                            (-1, 0),    # North
-                            (0, 1),     # East
-                            (0, -1)]    # West
-
-        # Check each move direction
-        for row_move, column_move in moves_directions:
-            target_position = current_position[0] + row_move, current_position[1] + column_move
-            # Continue adding moves until piece would be off the board or a piece blocks
-            piece_found = False
-            while board.check_empty_or_enemy_or_off_board(target_position[0], target_position[1], current_side) \
-                    and not piece_found:
-                if board.get_space_info(target_position[0], target_position[1]) is not None:
-                    piece_found = True
+
+        # South, north, east and west, then the palace diagonals
+        for line, index, increasing in SLIDER_RAYS[row * 9 + column]:
+            locations = LINE_LOCATIONS[line]
+            blocker = LINE_REACH[line][index][board.get_line_occupancy(line)][0 if increasing else 1]
+            if increasing:
+                valid_move_list.extend(locations[index + 1:blocker])
+                if blocker == len(locations):
+                    continue
+            else:
+                valid_move_list.extend(locations[blocker + 1:index][::-1])
+                if blocker < 0:
+                    continue
+            # The first piece on the line can be taken if it is an enemy
+            target_position = locations[blocker]
+            if board.get_space_info(target_position[0], target_position[1]).get_color() != current_side:
                 valid_move_list.append(target_position)
-                target_position = target_position[0] + row_move, target_position[1] + column_move
-
-        # Check for valid moves in the place
-        if board.check_space_in_palace(current_position[0], current_position[1]):
-            moves_directions = [(1, 1),  # South East
-                                (-1, 1),  # North East
-                                (-1, -1),  # North West
-                                (1, -1)]  # South West
-
-            for row_move, column_move in moves_directions:
-                target_position = current_position[0] + row_move, current_position[1] + column_move
-                # Continue adding moves until piece would be off the board or a piece blocks
-                piece_found = False
-                while board.check_empty_or_enemy_or_off_board(target_position[0], target_position[1], current_side) \
-                        and not piece_found and board.check_space_in_palace(target_position[0], target_position[1]):
-                    if board.get_space_info(target_position[0], target_position[1]) is not None:
-                        piece_found = True
-                    valid_move_list.append(target_position)
-                    target_position = target_position[0] + row_move, target_position[1] + column_move
 
         return valid_move_list
 
+    def check_move(self, row, column, board: "JanggiBoard") -> bool:
+        """
+        Determine whether or not the requested move is valid without listing
+        every move: the destination has to share a row, column or palace
+        diagonal with the piece and the spaces between have to be empty
+        :param row: Row of move destination
+        :param column: Column of move destination
+        :param board: Board that move is happening on
+        :return: True or False
+        """
+        if not self._check_destination(row, column, board):
+            return False
+        shared_line = find_shared_line(self._row * 9 + self._column, row * 9 + column)
+        if shared_line is None:
+            return False
+        line, index, target_index = shared_line
+        low, high = min(index, target_index), max(index, target_index)
+        return board.get_line_occupancy(line) & ((1 << high) - (1 << (low + 1))) == 0
+
 
 class Cannon(JanggiPiece):
     """This is the class for the Cannon piece. It inherits from JanggiPiece"""
-    def __init__(self, color: str):
-        """Initializes the Cannon piece with color"""
-        super().__init__(color)
-        self._piece_type = "Cannon"
+    __slots__ = ()
+    _piece_type = "Cannon"
 
     def __repr__(self):
         """
@@ -368,111 +393,78 @@ class Cannon(JanggiPiece):
 
     def find_valid_moves(self, board: "JanggiBoard") -> list:
         """
-        Creates a list of all valid moves
+        Creates a list of all valid moves. The piece to jump and the end of
+        the jump are looked up from the occupancy of the row, column or palace
+        diagonal.
         :param board: The JanggiBoard object to find moves on
         :return: list of moves that are valid
         """
         valid_move_list = []
-        current_position = self.get_location()
+        row, column = self.get_location()
         current_side = self.get_color()
-        moves_directions = [(1, 0),     # South
-                            (-1, 0),    # North
-                            (0, 1),     # East
-                            (0, -1)]    # West
-
-        # Check each move direction
-        for row_move, column_move in moves_directions:
-            target_position = current_position[0] + row_move, current_position[1] + column_move
-
-            # Check number of pieces jumped and whether or not to stop checking for moves
-            pieces_jumped = 0
-            end_of_direction = False
-            while board.check_location_on_board(target_position[0], target_position[1]) and not end_of_direction:
-                # Get the status of the space being examined (piece object or None)
-                target_space_info = board.get_space_info(target_position[0], target_position[1])
-                # If the space is not empty
-                if target_space_info is not None:
-                    # A cannon cannot be jumped over
-                    if isinstance(target_space_info, Cannon):
-                        end_of_direction = True
-                    # If we've already jumped a piece and encounter a friendly piece, no more valid moves
-                    elif pieces_jumped > 0 and target_space_info.get_color() == current_side:
-                        end_of_direction = True
-                    # This is an enemy piece and not a cannon
-                    else:
-                        # If we've jumped a piece we can take the piece
-                        if pieces_jumped == 1:
-                            valid_move_list.append(target_position)
-                            end_of_direction = True
-                    # Set the piece as jumped
-                    pieces_jumped += 1
-
-                    # Cannot jump more than one piece
-                    if pieces_jumped > 1:
-                        end_of_direction = True
-                # Handles the case of an empty space
-                else:
-                    # Add this as a valid move space if one piece has been jumped
-                    if pieces_jumped == 1:
-                        valid_move_list.append(target_position)
-
-                # Move target to next position
-                target_position = target_position[0] + row_move, target_position[1] + column_move
-
-        # Check for valid moves in the palace
-        if board.check_space_in_palace(current_position[0], current_position[1]):
-            moves_directions = [(1, 1),  # South East
-                                (-1, 1),  # North East
-                                (-1, -1),  # North West
-                                (1, -1)]  # South West
-            # Check each move direction
-            for row_move, column_move in moves_directions:
-                target_position = current_position[0] + row_move, current_position[1] + column_move
-
-                # Check number of pieces jumped and whether or not to stop checking for moves
-                pieces_jumped = 0
-                end_of_direction = False
-                while board.check_space_in_palace(target_position[0], target_position[1]) and not end_of_direction:
-                    # Get the status of the space being examined (piece object or None)
-                    target_space_info = board.get_space_info(target_position[0], target_position[1])
-                    # If the space is not empty
-                    if target_space_info is not None:
-                        # A cannon cannot be jumped over
-                        if isinstance(target_space_info, Cannon):
-                            end_of_direction = True
-                        # If we've already jumped a piece and encounter a friendly piece, no more valid mores
-                        elif pieces_jumped > 0 and target_space_info.get_color() == current_side:
-                            end_of_direction = True
-                        # This is an enemy piece and no a cannon
-                        else:
-                            # If we've jumped a piece we can take the piece
-                            if pieces_jumped == 1:
-                                valid_move_list.append(target_position)
-                                end_of_direction = True
-                        # Set the piece as jumped
-                        pieces_jumped += 1
-
-                        # Cannot jump more than one piece
-                        if pieces_jumped > 1:
-                            end_of_direction = True
-                    # Handles the case of an empty space
-                    else:
-                        # Add this as a valid move space if one piece has been jumped
-                        if pieces_jumped == 1:
-                            valid_move_list.append(target_position)
-
-                    # Move target to next position
-                    target_position = target_position[0] + row_move, target_position[1] + column_move
+
+        # South, north, east and west, then the palace diagonals
+        for line, index, increasing in SLIDER_RAYS[row * 9 + column]:
+            locations = LINE_LOCATIONS[line]
+            reach = LINE_REACH[line]
+            occupancy = board.get_line_occupancy(line)
+            direction = 0 if increasing else 1
+            screen = reach[index][occupancy][direction]
+            # There has to be a piece to jump, and a cannon cannot be jumped over
+            if screen == len(locations) or screen < 0:
+                continue
+            screen_position = locations[screen]
+            if isinstance(board.get_space_info(screen_position[0], screen_position[1]), Cannon):
+                continue
+
+            blocker = reach[screen][occupancy][direction]
+            if increasing:
+                valid_move_list.extend(locations[screen + 1:blocker])
+                if blocker == len(locations):
+                    continue
+            else:
+                valid_move_list.extend(locations[blocker + 1:screen][::-1])
+                if blocker < 0:
+                    continue
+            # The piece after the jump can be taken if it is an enemy and not a cannon
+            target_position = locations[blocker]
+            target_piece = board.get_space_info(target_position[0], target_position[1])
+            if target_piece.get_color() != current_side and not isinstance(target_piece, Cannon):
+                valid_move_list.append(target_position)
 
         return valid_move_list
 
+    def check_move(self, row, column, board: "JanggiBoard") -> bool:
+        """
+        Determine whether or not the requested move is valid without listing
+        every move: the destination has to share a row, column or palace
+        diagonal with the piece, with exactly one piece between that is not
+        a Cannon, and it cannot hold a Cannon
+        :param row: Row of move destination
+        :param column: Column of move destination
+        :param board: Board that move is happening on
+        :return: True or False
+        """
+        if not self._check_destination(row, column, board) or \
+                isinstance(board.get_space_info(row, column), Cannon):
+            return False
+        shared_line = find_shared_line(self._row * 9 + self._column, row * 9 + column)
+        if shared_line is None:
+            return False
+        line, index, target_index = shared_line
+        low, high = min(index, target_index), max(index, target_index)
+        between = board.get_line_occupancy(line) & ((1 << high) - (1 << (low + 1)))
+        # Exactly one bit set
+        if between == 0 or between & (between - 1):
+            return False
+        screen_position = LINE_LOCATIONS[line][between.bit_length() - 1]
+        return not isinstance(board.get_space_info(screen_position[0], screen_position[1]), Cannon)
+
 
 class Soldier(JanggiPiece):
     """This is the class for the Soldier piece. It inherits from JanggiPiece"""
-    def __init__(self, color: str):
-        """Initializes the Soldier piece with color"""
-        super().__init__(color)
-        self._piece_type = "Solider"
+    __slots__ = ()
+    _piece_type = "Solider"
 
     def __repr__(self):
         """
@@ -483,50 +475,427 @@ class Soldier(JanggiPiece):
 
     def find_valid_moves(self, board: "JanggiBoard") -> list:
         """
-        Creates a list of all valid moves
+        Creates a list of all valid moves from the precomputed Soldier table,
+        which has the sideways and forward moves and the forward diagonals
+        inside the palace
         :param board: The JanggiBoard object to find moves on
         :return: list of moves that are valid
         """
         valid_move_list = []
-        current_position = self.get_location()
-        move_direction = -1
+        row, column = self.get_location()
         current_side = self.get_color()
 
-        # Red soldier can only move "down" the board, or increasing row
-        if self.get_color() == "red":
-            move_direction = 1
-
-        # Check moves in basic three directions
-        move_list = [(0, -1), (0, 1), (move_direction, 0)]
-        for move_row, move_column in move_list:
-            target_position = current_position[0] + move_row, current_position[1] + move_column
+        for target_position in SOLDIER_MOVES[current_side][row * 9 + column]:
             # Confirm the space is empty or contains an enemy piece
-            if board.check_empty_or_enemy_or_off_board(target_position[0], target_position[1], current_side):
+            target_piece = board.get_space_info(target_position[0], target_position[1])
+            if target_piece is None or target_piece.get_color() != current_side:
                 valid_move_list.append(target_position)
 
-        # Check for valid moves in the place
-        if board.check_space_in_palace(current_position[0], current_position[1]):
-            move_list = [(move_direction, -1), (move_direction, 1)]
-            for move_row, move_column in move_list:
-                target_position = current_position[0] + move_row, current_position[1] + move_column
-            # Check if the space to be moved to is in the palace
-                if board.check_space_in_palace(target_position[0], target_position[1]):
-                    # Confirm the space is empty or contains an enemy piece
-                    if board.check_empty_or_enemy_or_off_board(target_position[0], target_position[1], current_side):
-                        valid_move_list.append(target_position)
-
         # All valid moves listed, return the list
         return valid_move_list
 
+    def check_move(self, row, column, board: "JanggiBoard") -> bool:
+        """
+        Determine whether or not the requested move is valid without listing
+        every move: the destination has to be in the Soldier table
+        :param row: Row of move destination
+        :param column: Column of move destination
+        :param board: Board that move is happening on
+        :return: True or False
+        """
+        if (row, column) not in SOLDIER_MOVES[self._color][self._row * 9 + self._column]:
+            return False
+        return self._check_destination(row, column, board)
+
+
+# Piece classes in the order each side keeps them
+PIECE_CLASSES = (General, Guard, Horse, Elephant, Chariot, Cannon, Soldier)
+# Letters used for pieces in position strings, blue pieces in upper case
+PIECE_LETTERS = {General: "k", Guard: "a", Elephant: "e", Horse: "h",
+                 Chariot: "r", Cannon: "c", Soldier: "p"}
+LETTER_PIECES = {letter: piece_class for piece_class, letter in PIECE_LETTERS.items()}
+# Elephants and Horses on the b, c, g and h columns of the back row, red's then blue's
+STANDARD_SETUP = "EHEH/EHEH"
+# Position string of a new game: the rows from "1" to "10" with the number
+# of empty spaces as a digit, the side to move, plies since the last capture,
+# the move number, and the setup
+START_POSITION = "reha1aehr/4k4/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/4K4/REHA1AEHR b 0 1 " + STANDARD_SETUP
+
+# Spaces are numbered row * 9 + column. These give each number's (row,
+# column) tuple and "a1" style name, and each name's number.
+SQUARE_LOCATIONS = tuple((square // 9, square % 9) for square in range(90))
+SQUARE_NAMES = tuple(chr(column + 97) + str(row + 1) for row, column in SQUARE_LOCATIONS)
+SQUARE_NUMBERS = {name: square for square, name in enumerate(SQUARE_NAMES)}
+# A move is the from square * 90 + the to square in the low bits, with a
+# flag above them for a capture and another for a pass, which has the same
+# from and to square. Moves found by the game carry the flags, so compare
+# moves from elsewhere with move & MOVE_MASK.
+MOVE_MASK = (1 << 13) - 1
+CAPTURE_FLAG = 1 << 13
+PASS_FLAG = 1 << 14
+# How much replay checks a recorded game, from least to most
+REPLAY_CHECKS = ("none", "legality", "full")
+
+
+def encode_move(from_square: int, to_square: int, capture: bool = False) -> int:
+    """
+    Encodes a move as an integer
+    :param from_square: row * 9 + column of the from space
+    :param to_square: row * 9 + column of the to space, the same as
+                      from_square for a pass
+    :param capture: Whether the move takes a piece
+    :return: The move
+    """
+    move = from_square * 90 + to_square
+    if from_square == to_square:
+        return move | PASS_FLAG
+    if capture:
+        return move | CAPTURE_FLAG
+    return move
+
+
+def get_move_squares(move: int) -> (int, int):
+    """
+    Decodes a move
+    :param move: The move
+    :return: Tuple of the from square and to square
+    """
+    return divmod(move & MOVE_MASK, 90)
+
+
+def move_to_spaces(move: int) -> (str, str):
+    """
+    Writes a move as the names of its spaces, as make_move takes them
+    :param move: The move
+    :return: Tuple of the from space and to space, for example ("c7", "c6")
+    """
+    from_square, to_square = divmod(move & MOVE_MASK, 90)
+    return SQUARE_NAMES[from_square], SQUARE_NAMES[to_square]
+
+
+def spaces_to_move(from_space: str, to_space: str) -> int:
+    """
+    Encodes a move given by the names of its spaces. The capture flag is
+    not set, as that needs the board.
+    :param from_space: Name of the from space, for example "c7"
+    :param to_space: Name of the to space, the same as from_space for a pass
+    :return: The move
+    """
+    if from_space not in SQUARE_NUMBERS or to_space not in SQUARE_NUMBERS:
+        raise ValueError("Not a space on the board: " + from_space + " " + to_space)
+    return encode_move(SQUARE_NUMBERS[from_space], SQUARE_NUMBERS[to_space])
+
+
+def _build_zobrist_keys() -> (dict, int):
+    """
+    Creates the random 64 bit numbers used to hash positions. A fixed seed is
+    used so keys are the same every run and can be stored.
+    :return: Tuple of a dictionary of (color, piece class) to a list of keys
+             indexed by row * 9 + column, and the key for red to move
+    """
+    rng = random.Random(20210309)
+    keys = {}
+    for color in ("red", "blue"):
+        for piece_class in PIECE_CLASSES:
+            keys[color, piece_class] = [rng.getrandbits(64) for square in range(90)]
+    return keys, rng.getrandbits(64)
+
+
+ZOBRIST_PIECE_KEYS, ZOBRIST_RED_TO_MOVE = _build_zobrist_keys()
+
+# Spaces a Horse moves through, the last one is the destination:
+# south east, south west, north east, north west, west south, west north, east south, east north
+HORSE_PATHS = (((1, 0), (2, 1)), ((1, 0), (2, -1)), ((-1, 0), (-2, 1)), ((-1, 0), (-2, -1)),
+               ((0, -1), (1, -2)), ((0, -1), (-1, -2)), ((0, 1), (1, 2)), ((0, 1), (-1, 2)))
+# Spaces an Elephant moves through, in the same directions as the Horse
+ELEPHANT_PATHS = (((1, 0), (2, 1), (3, 2)), ((1, 0), (2, -1), (3, -2)),
+                  ((-1, 0), (-2, 1), (-3, 2)), ((-1, 0), (-2, -1), (-3, -2)),
+                  ((0, -1), (1, -2), (2, -3)), ((0, -1), (-1, -2), (-2, -3)),
+                  ((0, 1), (1, 2), (2, 3)), ((0, 1), (-1, 2), (-2, 3)))
+# Palace rows of each side
+PALACE_ROWS = {"red": range(0, 3), "blue": range(7, 10)}
+
+
+def _in_palace(row: int, column: int) -> bool:
+    """
+    Checks whether a location is inside either palace
+    :param row: row of space to check
+    :param column: column of space to check
+    :return: True or False
+    """
+    return 3 <= column <= 5 and (0 <= row <= 2 or 7 <= row <= 9)
+
+
+def _in_same_palace(row: int, column: int, other_row: int, other_column: int) -> bool:
+    """
+    Checks whether two locations are inside the same palace
+    :param row: row of the first space
+    :param column: column of the first space
+    :param other_row: row of the second space
+    :param other_column: column of the second space
+    :return: True or False
+    """
+    return _in_palace(row, column) and _in_palace(other_row, other_column) and (row <= 2) == (other_row <= 2)
+
+
+def _build_leaper_moves(paths: tuple) -> list:
+    """
+    Builds the Horse or Elephant table
+    :param paths: Offsets the piece passes through, the last one is the destination
+    :return: List indexed by row * 9 + column of tuples of the moves that stay
+             on the board, each a tuple of the spaces passed through and then
+             the destination
+    """
+    table = []
+    for row in range(10):
+        for column in range(9):
+            moves = []
+            for path in paths:
+                locations = tuple((row + row_move, column + column_move) for row_move, column_move in path)
+                if all(0 <= r <= 9 and 0 <= c <= 8 for r, c in locations):
+                    moves.append(locations)
+            table.append(tuple(moves))
+    return table
+
+
+def _build_palace_moves() -> dict:
+    """
+    Builds the General and Guard table, the spaces next to a space that are
+    inside the side's own palace
+    :return: Dictionary of color to a list indexed by row * 9 + column of
+             tuples of destinations
+    """
+    tables = {}
+    for color, palace_rows in PALACE_ROWS.items():
+        table = []
+        for row in range(10):
+            for column in range(9):
+                table.append(tuple((target_row, target_column)
+                                   for target_row in palace_rows for target_column in range(3, 6)
+                                   if (target_row, target_column) != (row, column) and
+                                   abs(target_row - row) < 2 and abs(target_column - column) < 2))
+        tables[color] = table
+    return tables
+
+
+def _build_soldier_moves() -> dict:
+    """
+    Builds the Soldier table, the sideways and forward moves and then the
+    forward diagonals that stay inside the palace
+    :return: Dictionary of color to a list indexed by row * 9 + column of
+             tuples of destinations
+    """
+    tables = {}
+    for color, forward in (("red", 1), ("blue", -1)):
+        table = []
+        for row in range(10):
+            for column in range(9):
+                moves = [(row + row_move, column + column_move)
+                         for row_move, column_move in ((0, -1), (0, 1), (forward, 0))]
+                if _in_palace(row, column):
+                    moves += [(row + forward, column + column_move) for column_move in (-1, 1)
+                              if _in_palace(row + forward, column + column_move)]
+                table.append(tuple((r, c) for r, c in moves if 0 <= r <= 9 and 0 <= c <= 8))
+        tables[color] = table
+    return tables
+
+
+def build_move_tables() -> (list, list, dict, dict):
+    """
+    Builds every precomputed move table
+    :return: Tuple of the Horse, Elephant, palace and Soldier tables
+    """
+    return (_build_leaper_moves(HORSE_PATHS), _build_leaper_moves(ELEPHANT_PATHS),
+            _build_palace_moves(), _build_soldier_moves())
+
+
+HORSE_MOVES, ELEPHANT_MOVES, PALACE_MOVES, SOLDIER_MOVES = build_move_tables()
+
+
+def _build_lines() -> list:
+    """
+    Builds the lines a Chariot or Cannon moves along: the rows, the columns,
+    and the diagonals inside each palace
+    :return: list of tuples of locations, each in increasing row and then
+             column order
+    """
+    lines = [tuple((row, column) for column in range(9)) for row in range(10)]
+    lines += [tuple((row, column) for row in range(10)) for column in range(9)]
+    for row in range(10):
+        for column in range(9):
+            for column_move in (1, -1):
+                # Start a diagonal at its first space inside the palace
+                if not _in_palace(row, column) or _in_same_palace(row, column, row - 1, column - column_move):
+                    continue
+                line = []
+                target_row, target_column = row, column
+                while _in_same_palace(row, column, target_row, target_column):
+                    line.append((target_row, target_column))
+                    target_row, target_column = target_row + 1, target_column + column_move
+                if len(line) > 1:
+                    lines.append(tuple(line))
+    return lines
+
+
+def _build_reach_table(length: int) -> list:
+    """
+    Builds the table of where a line's first piece in each direction is
+    :param length: Number of spaces on the line
+    :return: List indexed by position on the line and then occupancy bits of
+             (index of the first piece after the position or length, index of
+             the first piece before the position or -1)
+    """
+    table = []
+    for index in range(length):
+        entries = []
+        below = (1 << index) - 1
+        for occupancy in range(1 << length):
+            above = occupancy >> (index + 1)
+            entries.append(((above & -above).bit_length() + index if above else length,
+                            (occupancy & below).bit_length() - 1))
+        table.append(entries)
+    return table
+
+
+def build_line_tables() -> (list, list, list, list):
+    """
+    Builds the Chariot and Cannon tables
+    :return: Tuple of the lines' locations, each line's reach table, the
+             (line, bit) pairs of each space, and the rays of each space as
+             (line, position on line, increasing) in the order they are walked:
+             south, north, east, west, south east, north east, north west, south west
+    """
+    lines = _build_lines()
+    reach_tables = {}
+    line_reach = []
+    square_lines = [[] for square in range(90)]
+    for line_number, line in enumerate(lines):
+        if len(line) not in reach_tables:
+            reach_tables[len(line)] = _build_reach_table(len(line))
+        line_reach.append(reach_tables[len(line)])
+        for index, (row, column) in enumerate(line):
+            square_lines[row * 9 + column].append((line_number, 1 << index))
+
+    slider_rays = []
+    for row in range(10):
+        for column in range(9):
+            rays = [(10 + column, row, True), (10 + column, row, False), (row, column, True), (row, column, False)]
+            diagonals = {}
+            for line_number, bit in square_lines[row * 9 + column]:
+                if line_number >= 19:
+                    line = lines[line_number]
+                    going_right = line[1][1] > line[0][1]
+                    diagonals[going_right] = (line_number, line.index((row, column)))
+            # South east and north west run along the line going right, north east and south west along the other
+            for going_right, increasing in ((True, True), (False, False), (True, False), (False, True)):
+                if going_right in diagonals:
+                    rays.append(diagonals[going_right] + (increasing,))
+            slider_rays.append(tuple(rays))
+    return lines, line_reach, [tuple(pairs) for pairs in square_lines], slider_rays
+
+
+LINE_LOCATIONS, LINE_REACH, SQUARE_LINES, SLIDER_RAYS = build_line_tables()
+# The lines again, as row * 9 + column numbers
+LINE_SQUARES = [tuple(row * 9 + column for row, column in line) for line in LINE_LOCATIONS]
+
+
+def find_shared_line(square: int, target: int) -> (int, int, int):
+    """
+    Finds the row, column or palace diagonal two spaces are both on
+    :param square: row * 9 + column of the first space
+    :param target: row * 9 + column of the second space
+    :return: Tuple of the line in LINE_LOCATIONS and the positions of the two
+             spaces on it, or None if they do not share a line
+    """
+    row, column = divmod(square, 9)
+    target_row, target_column = divmod(target, 9)
+    if row == target_row:
+        return row, column, target_column
+    if column == target_column:
+        return 10 + column, row, target_row
+    for line, bit in SQUARE_LINES[square]:
+        if line >= 19 and target in LINE_SQUARES[line]:
+            return line, bit.bit_length() - 1, LINE_SQUARES[line].index(target)
+    return None
+
+
+def _build_move_dependencies() -> dict:
+    """
+    Builds the spaces whose contents the moves of a General, Guard, Horse,
+    Elephant or Soldier depend on: its own space, the spaces it moves
+    through and its destinations
+    :return: Dictionary of (color, piece class) to a list indexed by
+             row * 9 + column of tuples of row * 9 + column numbers
+    """
+    tables = {}
+    for color in ("red", "blue"):
+        for piece_class, moves in ((General, PALACE_MOVES[color]), (Guard, PALACE_MOVES[color]),
+                                   (Horse, HORSE_MOVES), (Elephant, ELEPHANT_MOVES),
+                                   (Soldier, SOLDIER_MOVES[color])):
+            table = []
+            for square in range(90):
+                squares = {square}
+                for move in moves[square]:
+                    # Leaper moves list the spaces passed through, the others are just the destination
+                    for row, column in (move if isinstance(move[0], tuple) else (move,)):
+                        squares.add(row * 9 + column)
+                table.append(tuple(sorted(squares)))
+            tables[color, piece_class] = table
+    return tables
+
+
+MOVE_DEPENDENCIES = _build_move_dependencies()
+
 
 class JanggiBoard:
     """The class that represents the board of the game"""
+    # Offsets from an attacked space back to a Horse and the leg space it moves through
+    _HORSE_ATTACKS = (((-2, -1), (-1, -1)), ((-2, 1), (-1, 1)),
+                      ((2, -1), (1, -1)), ((2, 1), (1, 1)),
+                      ((-1, 2), (-1, 1)), ((1, 2), (1, 1)),
+                      ((-1, -2), (-1, -1)), ((1, -2), (1, -1)))
+    # Offsets from an attacked space back to an Elephant and the two spaces it moves through
+    _ELEPHANT_ATTACKS = (((-3, -2), (-2, -2), (-1, -1)), ((-3, 2), (-2, 2), (-1, 1)),
+                         ((3, -2), (2, -2), (1, -1)), ((3, 2), (2, 2), (1, 1)),
+                         ((-2, 3), (-2, 2), (-1, 1)), ((2, 3), (2, 2), (1, 1)),
+                         ((-2, -3), (-2, -2), (-1, -1)), ((2, -3), (2, -2), (1, -1)))
+
     def __init__(self, spaces: list=None):
         """Initializes the board with a blank slate"""
         if spaces is None:
-            self._spaces = [[None for x in range(0, 9)] for x in range(0, 10)]
+            self._spaces = [[None] * 9 for x in range(0, 10)]
         else:
             self._spaces = spaces
+        # Each entry is (moving piece, move, captured piece)
+        self._move_stack = []
+        # Zobrist hash of the pieces and side to move, kept up to date on every change
+        self._key = self.compute_key()
+        # Bit mask of the occupied spaces on each line in LINE_LOCATIONS, in
+        # 16 bit slots so the masks do not each need an integer object
+        self._line_occupancy = array("H", [0]) * len(LINE_LOCATIONS)
+        for row in range(0, 10):
+            for column in range(0, 9):
+                if self._spaces[row][column] is not None:
+                    for line, bit in SQUARE_LINES[row * 9 + column]:
+                        self._line_occupancy[line] |= bit
+        # Valid moves of each piece that was asked about, and the pieces whose
+        # moves depend on each space so a change only drops the moves it affects
+        self._move_cache = {}
+        self._move_watchers = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+        # Sides told when their pieces are captured or put back, by color
+        self._sides = {}
+
+    def add_side(self, side: "Side"):
+        """
+        Registers a side so its index of pieces on the board is kept up to
+        date when its pieces are captured or put back
+        :param side: The Side object
+        :return: Nothing
+        """
+        self._sides[side.get_color()] = side
+        side.find_live_pieces()
 
     def update_location(self, row: int, column: int, piece: JanggiPiece):
         """
@@ -537,7 +906,8 @@ class JanggiBoard:
         :return: None
         """
         # Take the piece off the board from its current location
-        if piece.check_piece_on_board():
+        placed = not piece.check_piece_on_board()
+        if not placed:
             from_location = piece.get_location()
             self.clear_space(from_location[0], from_location[1])
         piece.remove()
@@ -546,10 +916,291 @@ class JanggiBoard:
         taken_piece = self.get_space_info(row, column)
         if taken_piece is not None:
             taken_piece.remove()
+            if taken_piece.get_color() in self._sides:
+                self._sides[taken_piece.get_color()].remove_live_piece(taken_piece)
 
         # Put the piece back on the board
         self.set_space_info(row, column, piece)
         piece.set_location(row, column)
+        if placed and piece.get_color() in self._sides:
+            self._sides[piece.get_color()].add_live_piece(piece)
+
+    def remove_piece(self, row: int, column: int) -> JanggiPiece:
+        """
+        Takes the piece on a space off the board
+        :param row: row of the space
+        :param column: column of the space
+        :return: The piece that was removed, or None if the space was empty
+        """
+        piece = self.get_space_info(row, column)
+        if piece is not None:
+            self.clear_space(row, column)
+            piece.remove()
+            if piece.get_color() in self._sides:
+                self._sides[piece.get_color()].remove_live_piece(piece)
+        return piece
+
+    def push(self, move: int) -> JanggiPiece:
+        """
+        Makes a move on the board and records what is needed to take it back.
+        No rules are checked, the move is expected to be valid.
+        :param move: The move as encoded by encode_move. A move to the same
+                     space is a pass
+        :return: The piece that was captured, or None
+        """
+        from_square, to_square = divmod(move & MOVE_MASK, 90)
+        from_location = SQUARE_LOCATIONS[from_square]
+        moving_piece = self.get_space_info(from_location[0], from_location[1])
+        captured_piece = None
+        if from_square != to_square:
+            to_location = SQUARE_LOCATIONS[to_square]
+            captured_piece = self.get_space_info(to_location[0], to_location[1])
+            self.update_location(to_location[0], to_location[1], moving_piece)
+        self._move_stack.append((moving_piece, move, captured_piece))
+        return captured_piece
+
+    def pop(self) -> int:
+        """
+        Takes back the last move made with push, restoring any captured piece
+        :return: The move that was taken back
+        """
+        moving_piece, move, captured_piece = self._move_stack.pop()
+        from_square, to_square = divmod(move & MOVE_MASK, 90)
+        if from_square != to_square:
+            from_location = SQUARE_LOCATIONS[from_square]
+            to_location = SQUARE_LOCATIONS[to_square]
+            self.update_location(from_location[0], from_location[1], moving_piece)
+            if captured_piece is not None:
+                self.set_space_info(to_location[0], to_location[1], captured_piece)
+                captured_piece.set_location(to_location[0], to_location[1])
+                if captured_piece.get_color() in self._sides:
+                    self._sides[captured_piece.get_color()].add_live_piece(captured_piece)
+        return move
+
+    def get_move_count(self) -> int:
+        """
+        Returns the number of moves on the undo stack
+        :return: Number of moves that can be taken back with pop
+        """
+        return len(self._move_stack)
+
+    def find_valid_moves(self, piece: JanggiPiece) -> list:
+        """
+        Returns the list of all valid moves for a piece on this board. The
+        list is kept until a space it depends on changes, so asking again
+        about an unchanged piece costs a dictionary lookup. The list is
+        shared and must not be changed by the caller.
+        :param piece: The piece to find moves for
+        :return: list of moves that are valid
+        """
+        moves = self._move_cache.get(piece)
+        if moves is not None:
+            self._cache_hits += 1
+            return moves
+        self._cache_misses += 1
+        moves = self.generate_valid_moves(piece)
+        if piece.check_piece_on_board():
+            self._move_cache[piece] = moves
+            watchers = self._move_watchers
+            for square in self.find_move_dependencies(piece):
+                if square in watchers:
+                    watchers[square].add(piece)
+                else:
+                    watchers[square] = {piece}
+        return moves
+
+    def generate_valid_moves(self, piece: JanggiPiece) -> list:
+        """
+        Creates a list of all valid moves for a piece on this board without
+        using the cache. Other board backends can override this to generate
+        moves their own way.
+        :param piece: The piece to find moves for
+        :return: list of moves that are valid
+        """
+        return piece.find_valid_moves(self)
+
+    def find_move_dependencies(self, piece: JanggiPiece):
+        """
+        Finds the spaces whose contents a piece's valid moves depend on. For
+        a Chariot these are the spaces along each ray up to and including the
+        first piece, and for a Cannon up to and including the piece after the
+        one it jumps.
+        :param piece: The piece on the board to find the spaces for
+        :return: Iterable of row * 9 + column numbers
+        """
+        row, column = piece.get_location()
+        square = row * 9 + column
+        piece_class = type(piece)
+        if piece_class is not Chariot and piece_class is not Cannon:
+            return MOVE_DEPENDENCIES[piece.get_color(), piece_class][square]
+
+        squares = [square]
+        for line, index, increasing in SLIDER_RAYS[square]:
+            line_squares = LINE_SQUARES[line]
+            reach = LINE_REACH[line]
+            occupancy = self._line_occupancy[line]
+            direction = 0 if increasing else 1
+            end = reach[index][occupancy][direction]
+            if piece_class is Cannon and 0 <= end < len(line_squares):
+                end = reach[end][occupancy][direction]
+            if increasing:
+                squares.extend(line_squares[index + 1:end + 1])
+            else:
+                squares.extend(line_squares[max(end, 0):index])
+        return squares
+
+    def _drop_cached_moves(self, row: int, column: int):
+        """
+        Forgets the cached moves of every piece that depends on a space
+        :param row: row of the space that changed
+        :param column: column of the space that changed
+        :return: Nothing
+        """
+        watchers = self._move_watchers.pop(row * 9 + column, None)
+        if watchers:
+            move_cache = self._move_cache
+            for piece in watchers:
+                move_cache.pop(piece, None)
+
+    def clear_move_cache(self):
+        """
+        Forgets every cached move list
+        :return: Nothing
+        """
+        self._move_cache.clear()
+        self._move_watchers.clear()
+
+    def get_cache_stats(self) -> dict:
+        """
+        Returns how often find_valid_moves was answered from the cache
+        :return: Dictionary of hits, misses and the number of cached pieces
+        """
+        return {"hits": self._cache_hits, "misses": self._cache_misses, "entries": len(self._move_cache)}
+
+    def check_move(self, piece: JanggiPiece, row: int, column: int) -> bool:
+        """
+        Determine whether or not the requested move is valid for a piece
+        :param piece: The piece to move
+        :param row: Row of move destination
+        :param column: Column of move destination
+        :return: True or False
+        """
+        # A cached list answers it, otherwise the piece checks the one move
+        moves = self._move_cache.get(piece)
+        if moves is not None:
+            return (row, column) in moves
+        return piece.check_move(row, column, self)
+
+    def find_attackers(self, row: int, column: int, side: str) -> list:
+        """
+        Finds the pieces of the other side that could move to a space. Rather
+        than generating every enemy move, this starts at the space and only
+        looks at the spaces an attacker would have to come from.
+        :param row: Row of the space being attacked
+        :param column: Column of the space being attacked
+        :param side: The side being attacked, "red" or "blue"
+        :return: list of the attacking pieces
+        """
+        attackers = []
+        enemy = "blue" if side == "red" else "red"
+        target_is_cannon = isinstance(self.get_space_info(row, column), Cannon)
+
+        # Chariots and Cannons along the lines, diagonals only inside the palace
+        directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+        if self.check_space_in_palace(row, column):
+            directions += [(1, 1), (-1, 1), (-1, -1), (1, -1)]
+        for row_move, column_move in directions:
+            diagonal = row_move != 0 and column_move != 0
+            target_row, target_column = row + row_move, column + column_move
+            screen_found = False
+            while self.check_location_on_board(target_row, target_column) and \
+                    (not diagonal or self.check_space_in_palace(target_row, target_column)):
+                piece = self.get_space_info(target_row, target_column)
+                if piece is not None:
+                    if screen_found:
+                        # The second piece on the line attacks if it is a Cannon
+                        if isinstance(piece, Cannon) and piece.get_color() == enemy \
+                                and not target_is_cannon:
+                            attackers.append(piece)
+                        break
+                    # A Cannon cannot be jumped over, so it ends the line
+                    if isinstance(piece, Cannon):
+                        break
+                    if isinstance(piece, Chariot) and piece.get_color() == enemy:
+                        attackers.append(piece)
+                    screen_found = True
+                target_row, target_column = target_row + row_move, target_column + column_move
+
+        # Horses whose leg space is empty
+        for (row_move, column_move), (leg_row, leg_column) in self._HORSE_ATTACKS:
+            piece = self.get_enemy_piece(row + row_move, column + column_move, enemy, Horse)
+            if piece is not None and self.get_space_info(row + leg_row, column + leg_column) is None:
+                attackers.append(piece)
+
+        # Elephants whose two spaces in between are empty
+        for (row_move, column_move), first, second in self._ELEPHANT_ATTACKS:
+            piece = self.get_enemy_piece(row + row_move, column + column_move, enemy, Elephant)
+            if piece is not None and self.get_space_info(row + first[0], column + first[1]) is None \
+                    and self.get_space_info(row + second[0], column + second[1]) is None:
+                attackers.append(piece)
+
+        # Soldiers to the side, behind, or diagonally behind inside the palace
+        forward = 1 if enemy == "red" else -1
+        soldier_spaces = [(row, column - 1), (row, column + 1), (row - forward, column)]
+        if self.check_space_in_palace(row, column):
+            for column_move in (-1, 1):
+                if self.check_location_on_board(row - forward, column + column_move) and \
+                        self.check_space_in_palace(row - forward, column + column_move):
+                    soldier_spaces.append((row - forward, column + column_move))
+        for soldier_row, soldier_column in soldier_spaces:
+            piece = self.get_enemy_piece(soldier_row, soldier_column, enemy, Soldier)
+            if piece is not None:
+                attackers.append(piece)
+
+        # The General and Guards can only attack spaces inside their own palace
+        palace_rows = range(0, 3) if enemy == "red" else range(7, 10)
+        if row in palace_rows and 3 <= column <= 5:
+            for neighbor_row in range(row - 1, row + 2):
+                for neighbor_column in range(column - 1, column + 2):
+                    piece = self.get_enemy_piece(neighbor_row, neighbor_column, enemy, (General, Guard))
+                    if piece is not None and (neighbor_row, neighbor_column) != (row, column):
+                        attackers.append(piece)
+
+        return attackers
+
+    @classmethod
+    def get_horse_attacks(cls) -> tuple:
+        """
+        Returns the offsets from an attacked space back to a Horse and its leg space
+        :return: Tuple of (horse offset, leg offset) pairs
+        """
+        return cls._HORSE_ATTACKS
+
+    @classmethod
+    def get_elephant_attacks(cls) -> tuple:
+        """
+        Returns the offsets from an attacked space back to an Elephant and the
+        two spaces it moves through
+        :return: Tuple of (elephant offset, first offset, second offset)
+        """
+        return cls._ELEPHANT_ATTACKS
+
+    def get_enemy_piece(self, row: int, column: int, enemy: str, piece_type) -> JanggiPiece:
+        """
+        Returns the piece at a location if it is on the board, belongs to the
+        enemy and is of the requested type
+        :param row: Row of space to check
+        :param column: Column of space to check
+        :param enemy: Color of the enemy side
+        :param piece_type: Piece class or tuple of classes to match
+        :return: The matching piece, or None
+        """
+        if not self.check_location_on_board(row, column):
+            return None
+        piece = self.get_space_info(row, column)
+        if piece is not None and piece.get_color() == enemy and isinstance(piece, piece_type):
+            return piece
+        return None
 
     def get_board_layout(self) -> list:
         """
@@ -575,6 +1226,16 @@ class JanggiBoard:
         :param piece: Piece to set in space
         :return: Nothing
         """
+        current_piece = self._spaces[row][column]
+        if current_piece is not None:
+            self._key ^= ZOBRIST_PIECE_KEYS[current_piece.get_color(), type(current_piece)][row * 9 + column]
+        if piece is not None:
+            self._key ^= ZOBRIST_PIECE_KEYS[piece.get_color(), type(piece)][row * 9 + column]
+        if (current_piece is None) != (piece is None):
+            for line, bit in SQUARE_LINES[row * 9 + column]:
+                self._line_occupancy[line] ^= bit
+        if current_piece is not piece:
+            self._drop_cached_moves(row, column)
         self._spaces[row][column] = piece
 
     def clear_space(self, row: int, column: int):
@@ -584,8 +1245,50 @@ class JanggiBoard:
         :param column: column of space to clear
         :return: nothing
         """
+        current_piece = self._spaces[row][column]
+        if current_piece is not None:
+            self._key ^= ZOBRIST_PIECE_KEYS[current_piece.get_color(), type(current_piece)][row * 9 + column]
+            for line, bit in SQUARE_LINES[row * 9 + column]:
+                self._line_occupancy[line] ^= bit
+            self._drop_cached_moves(row, column)
         self._spaces[row][column] = None
 
+    def get_line_occupancy(self, line: int) -> int:
+        """
+        Returns which spaces of a line are occupied
+        :param line: Index of the line in LINE_LOCATIONS
+        :return: Bit mask with bit i set if the line's space i holds a piece
+        """
+        return self._line_occupancy[line]
+
+    def get_key(self) -> int:
+        """
+        Returns the Zobrist hash of the position, updated as pieces move
+        :return: 64 bit integer key
+        """
+        return self._key
+
+    def toggle_side_key(self):
+        """
+        Updates the hash when the side to move changes
+        :return: Nothing
+        """
+        self._key ^= ZOBRIST_RED_TO_MOVE
+
+    def compute_key(self) -> int:
+        """
+        Computes the Zobrist hash of the pieces from scratch, without the side
+        to move, for checking the key that is kept up to date
+        :return: 64 bit integer key
+        """
+        key = 0
+        for row in range(0, 10):
+            for column in range(0, 9):
+                piece = self._spaces[row][column]
+                if piece is not None:
+                    key ^= ZOBRIST_PIECE_KEYS[piece.get_color(), type(piece)][row * 9 + column]
+        return key
+
     @staticmethod
     def check_space_in_palace(row, column) -> bool:
         """
@@ -656,6 +1359,8 @@ class JanggiBoard:
 
 class Side:
     """This class represents one of the two sides of the game"""
+    __slots__ = ("_color", "_pieces", "_live_pieces", "_live_type_ends")
+
     def __init__(self, color: str):
         """
         Sets the sides color and creates the piece objects for that side
@@ -679,22 +1384,92 @@ class Side:
         self._pieces.append(Soldier(color))
         self._pieces.append(Soldier(color))
         self._pieces.append(Soldier(color))
+        # The pieces on the board, kept in the order of _pieces by the board as
+        # pieces are captured and put back. _pieces is grouped by type in
+        # PIECE_CLASSES order, so each type is one run of the list, and
+        # _live_type_ends holds where each type's run ends.
+        self._live_pieces = []
+        self._live_type_ends = bytearray(len(PIECE_CLASSES))
 
     def get_pieces(self, on_board: bool) -> list:
         """
-        Returns a list of pieces either on or off the board
+        Returns a list of pieces either on or off the board. The list of
+        pieces on the board is the live index, it must not be changed by the
+        caller and it changes as pieces are captured and put back.
         :param on_board: Specifies whether the function returns pieces on the
                             board (True) or off the board (False)
         :return: a list of JanggiPiece objects
         """
+        if on_board:
+            return self._live_pieces
+
         return_list = []
 
         for piece in self._pieces:
-            if piece.check_piece_on_board() == on_board:
+            if not piece.check_piece_on_board():
                 return_list.append(piece)
 
         return return_list
 
+    def get_pieces_of_type(self, piece_class: type) -> list:
+        """
+        Returns the side's pieces of one type that are on the board
+        :param piece_class: The piece class, for example Chariot
+        :return: a new list of JanggiPiece objects, in the order of get_pieces
+        """
+        type_index = PIECE_CLASSES.index(piece_class)
+        start = self._live_type_ends[type_index - 1] if type_index else 0
+        return self._live_pieces[start:self._live_type_ends[type_index]]
+
+    def count_pieces_of_type(self, piece_class: type) -> int:
+        """
+        Counts the side's pieces of one type that are on the board
+        :param piece_class: The piece class, for example Chariot
+        :return: Number of pieces
+        """
+        type_index = PIECE_CLASSES.index(piece_class)
+        start = self._live_type_ends[type_index - 1] if type_index else 0
+        return self._live_type_ends[type_index] - start
+
+    def add_live_piece(self, piece: JanggiPiece):
+        """
+        Adds a piece that was put on the board to the live indexes
+        :param piece: The piece, already on the board
+        :return: Nothing
+        """
+        index = 0
+        for other_piece in self._pieces:
+            if other_piece is piece:
+                break
+            if other_piece.check_piece_on_board():
+                index += 1
+        self._live_pieces.insert(index, piece)
+        live_type_ends = self._live_type_ends
+        for type_index in range(PIECE_CLASSES.index(type(piece)), len(PIECE_CLASSES)):
+            live_type_ends[type_index] += 1
+
+    def remove_live_piece(self, piece: JanggiPiece):
+        """
+        Removes a piece that was taken off the board from the live indexes
+        :param piece: The piece
+        :return: Nothing
+        """
+        self._live_pieces.remove(piece)
+        live_type_ends = self._live_type_ends
+        for type_index in range(PIECE_CLASSES.index(type(piece)), len(PIECE_CLASSES)):
+            live_type_ends[type_index] -= 1
+
+    def find_live_pieces(self):
+        """
+        Rebuilds the live indexes from the pieces that are on the board
+        :return: Nothing
+        """
+        self._live_pieces[:] = [piece for piece in self._pieces if piece.check_piece_on_board()]
+        end = 0
+        for type_index, piece_class in enumerate(PIECE_CLASSES):
+            end += sum(1 for piece in self._live_pieces if type(piece) is piece_class)
+            self._live_type_ends[type_index] = end
+
     def get_general(self) -> General:
         """
         Returns the general of that side
@@ -732,26 +1507,173 @@ class JanggiGame:
     get a list of pieces on each side and test when a move can be made by the
     side.
     """
-    def __init__(self):
+    def __init__(self, board_class: type = JanggiBoard, eager_game_state: bool = False):
         """
         Initializes the Janggi game board, sets up the board, and sets up
         variables for the two generals
+        :param board_class: The JanggiBoard class or subclass used to store
+                            the position, for example BitboardJanggiBoard
+        :param eager_game_state: True to look for checkmate after every move,
+                                 False to wait until the game state is asked for
         """
-        self._board = JanggiBoard()
-        self._red_side = Side("red")
-        self._blue_side = Side("blue")
-        self._red_general = self._red_side.get_general()
-        self._blue_general = self._blue_side.get_general()
+        self._start(board_class(), Side("red"), Side("blue"))
+        self._eager_game_state = eager_game_state
         self.set_up_board(self._blue_side)
         self.set_up_board(self._red_side)
+
+    def _start(self, board: JanggiBoard, red_side: Side, blue_side: Side):
+        """
+        Sets up the game variables around a board and sides, with blue to
+        move at the start of the game
+        :param board: The JanggiBoard, holding any pieces already placed
+        :param red_side: The red Side object
+        :param blue_side: The blue Side object
+        :return: Nothing
+        """
+        self._board = board
+        self._red_side = red_side
+        self._blue_side = blue_side
+        self._red_general = self._red_side.get_general()
+        self._blue_general = self._blue_side.get_general()
+        self._board.add_side(self._red_side)
+        self._board.add_side(self._blue_side)
         self._current_side = self._blue_side
         self._game_state = "UNFINISHED"
+        # Whether checkmate still has to be looked for before the game state
+        # is known, and whether to look after every move instead
+        self._state_pending = False
+        self._eager_game_state = False
+        # Plies played, counting from the start of the game, and plies since
+        # the last capture, with its value before each push_move
+        self._ply_count = 0
+        self._quiet_plies = 0
+        self._quiet_history = []
+        self._setup = STANDARD_SETUP
+
+    @classmethod
+    def from_position(cls, position: str, board_class: type = JanggiBoard,
+                      eager_game_state: bool = False) -> "JanggiGame":
+        """
+        Sets up a game from a position string written by to_position, placing
+        the pieces directly instead of playing moves
+        :param position: The position string, for example START_POSITION
+        :param board_class: The JanggiBoard class or subclass to use
+        :param eager_game_state: True to look for checkmate after every move,
+                                 False to wait until the game state is asked for
+        :return: JanggiGame at the position, with no moves to take back
+        """
+        fields = position.split()
+        if len(fields) != 5:
+            raise ValueError("Position needs 5 fields: " + position)
+        rows = fields[0].split("/")
+        if len(rows) != 10:
+            raise ValueError("Position needs 10 rows: " + fields[0])
+        if fields[1] not in ("b", "r"):
+            raise ValueError("Side to move must be b or r: " + fields[1])
+        if not fields[2].isdigit() or not fields[3].isdigit() or int(fields[3]) < 1:
+            raise ValueError("Bad move counters: " + fields[2] + " " + fields[3])
+        setups = fields[4].split("/")
+        if len(setups) != 2 or any(sorted(setup) != ["E", "E", "H", "H"] for setup in setups):
+            raise ValueError("Bad setup: " + fields[4])
+
+        sides = {"red": Side("red"), "blue": Side("blue")}
+        # Pieces not placed yet by color and letter, the last one is placed first
+        spare_pieces = {}
+        for color, side in sides.items():
+            for piece in reversed(side.get_pieces(False)):
+                spare_pieces.setdefault((color, PIECE_LETTERS[type(piece)]), []).append(piece)
+        spaces = [[None] * 9 for x in range(0, 10)]
+        for row, row_text in enumerate(rows):
+            column = 0
+            for letter in row_text:
+                if letter.isdigit():
+                    column += int(letter)
+                    continue
+                if column > 8 or letter.lower() not in LETTER_PIECES:
+                    raise ValueError("Bad row " + str(row + 1) + ": " + row_text)
+                color = "blue" if letter.isupper() else "red"
+                pieces = spare_pieces[color, letter.lower()]
+                if not pieces:
+                    raise ValueError("Too many " + color + " " + LETTER_PIECES[letter.lower()].__name__ +
+                                     " pieces in position")
+                piece = pieces.pop()
+                piece.set_location(row, column)
+                spaces[row][column] = piece
+                column += 1
+            if column != 9:
+                raise ValueError("Bad row " + str(row + 1) + ": " + row_text)
+        for side in sides.values():
+            if not side.get_general().check_piece_on_board():
+                raise ValueError("Position has no " + side.get_color() + " General")
+
+        game = cls.__new__(cls)
+        game._start(board_class(spaces), sides["red"], sides["blue"])
+        if fields[1] == "r":
+            game.set_current_side("red")
+        game._ply_count = (int(fields[3]) - 1) * 2 + (fields[1] == "r")
+        game._quiet_plies = int(fields[2])
+        game._setup = fields[4]
+        game._eager_game_state = eager_game_state
+        game._update_game_state()
+        return game
+
+    def to_position(self) -> str:
+        """
+        Writes the position as a string that from_position can read
+        :return: The position string
+        """
+        rows = []
+        for row in range(0, 10):
+            row_text = ""
+            empty = 0
+            for column in range(0, 9):
+                piece = self._board.get_space_info(row, column)
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row_text += str(empty)
+                    empty = 0
+                letter = PIECE_LETTERS[type(piece)]
+                row_text += letter.upper() if piece.get_color() == "blue" else letter
+            if empty:
+                row_text += str(empty)
+            rows.append(row_text)
+        return " ".join(("/".join(rows), self._current_side.get_color()[0], str(self._quiet_plies),
+                         str(self.get_move_number()), self._setup))
+
+    def get_move_number(self) -> int:
+        """
+        Returns the number of the move being played, which goes up after red moves
+        :return: Move number, starting at 1
+        """
+        return self._ply_count // 2 + 1
+
+    def get_quiet_plies(self) -> int:
+        """
+        Returns the number of plies played since the last capture
+        :return: Number of plies
+        """
+        return self._quiet_plies
+
+    def get_setup(self) -> str:
+        """
+        Returns the Elephant and Horse setup the game started with
+        :return: Setup string such as "EHEH/EHEH", red's and then blue's
+                 pieces on the b, c, g and h columns
+        """
+        return self._setup
 
     def get_game_state(self) -> str:
         """
-        Returns the state of the game: UNFINISHED, RED_WON, BLUE_WON
+        Returns the state of the game: UNFINISHED, RED_WON, BLUE_WON. Unless
+        the game is eager, checkmate is looked for on the first call after a
+        move, and the result is kept until the next move.
         :return: State of game - UNFINISHED, RED_WON, BLUE_WON
         """
+        if self._state_pending:
+            self._state_pending = False
+            self._check_for_mate()
         return self._game_state
 
     def set_game_state(self, new_state: str):
@@ -760,8 +1682,27 @@ class JanggiGame:
         :param new_state: New state to update
         :return: Nothing
         """
+        self._state_pending = False
         self._game_state = new_state
 
+    def get_eager_game_state(self) -> bool:
+        """
+        Returns whether checkmate is looked for after every move
+        :return: True if it is, False if it waits until get_game_state
+        """
+        return self._eager_game_state
+
+    def set_eager_game_state(self, eager: bool):
+        """
+        Sets whether checkmate is looked for after every move, as interactive
+        play may want, or only when get_game_state is called
+        :param eager: True to look after every move
+        :return: Nothing
+        """
+        self._eager_game_state = eager
+        if eager:
+            self.get_game_state()
+
     def is_in_check(self, side: str, board: JanggiBoard=None):
         """
         Determines whether or not the specified side is in check.
@@ -769,71 +1710,91 @@ class JanggiGame:
         :param board: The JanggiBoard to use to test for check
         :return: True if in check, False if not in check
         """
-        # get general and position for side being checked
-        target_general = self.get_side(side).get_general()
-        general_position = target_general.get_location()
-        general_in_check = False
+        return self.get_check_status(side, board)[0]
 
+    def get_check_status(self, side: str, board: JanggiBoard=None) -> (bool, list):
+        """
+        Determines whether or not the specified side is in check and which
+        pieces are giving check. The search starts from the general's space and
+        only looks where an attacker could be.
+        :param side: The side to check for check status ("red" or "blue")
+        :param board: The JanggiBoard to use to test for check
+        :return: Tuple of True if in check, and the list of checking pieces
+        """
         # Use the passed board or the current game board
         if board is None:
             board = self.get_board()
 
-        # Get other side
-        if side == "red":
-            other_side = self.get_side("blue")
-        else:
-            other_side = self.get_side("red")
-
-        # Get all the pieces on the board for the other side
-        pieces_on_board = other_side.get_pieces(True)
-
-        # This will hold all moves on the other side
-        all_moves = []
-
-        # Find all valid moves for the other side
-        for piece in pieces_on_board:
-            all_moves.append((piece, piece.find_valid_moves(board)))
-
-        # Compare Generals location with valid moves
-
-        for piece, moves in all_moves:
-            for move in moves:
-                if general_position == move:
-                    general_in_check = True
+        # get general and position for side being checked
+        target_general = self.get_side(side).get_general()
+        if not target_general.check_piece_on_board():
+            return False, []
+        general_position = target_general.get_location()
 
-        return general_in_check
+        checking_pieces = board.find_attackers(general_position[0], general_position[1], side)
+        return len(checking_pieces) > 0, checking_pieces
 
-    def make_move(self, from_space: str, to_space: str) -> bool:
+    def make_move(self, from_space, to_space: str = None) -> bool:
         """
         Moves a piece from the specified location to the specified location
         if the move is valid. Passing the same to and from space will result in
         a passed turn.
         :param from_space: The column, row reference of the from space
-                            for example "a2"
+                            for example "a2", or a move encoded by
+                            encode_move with to_space left out
         :param to_space: The column, row reference of the to space
                             for example "a2"
         :return: True if the move is successful, False if the move is
                         invalid.
         """
+        # Get the row, column index of the to and from spaces
+        if to_space is None:
+            from_square, to_square = get_move_squares(from_space)
+            from_location = SQUARE_LOCATIONS[from_square]
+            to_location = SQUARE_LOCATIONS[to_square]
+            from_space, to_space = SQUARE_NAMES[from_square], SQUARE_NAMES[to_square]
+        else:
+            from_location = self.translate_space(from_space)
+            to_location = self.translate_space(to_space)
+
+        # Any pass is allowed when not in check, even one named off the board
+        if from_space == to_space:
+            return self._play_checked(from_location, from_location)
+
+        # The from space has to be on the board too
+        if from_location[0] == -1:
+            return False
+
+        # Play the move, the game state is worked out when it is needed
+        if self._play_checked(from_location, to_location):
+            self._update_game_state()
+            return True
+        return False
+
+    def _play_checked(self, from_location: (int, int), to_location: (int, int)) -> bool:
+        """
+        Plays a move if it is legal, without looking for checkmate afterwards.
+        A move to the same space is a pass.
+        :param from_location: Tuple of the row, column of the from space
+        :param to_location: Tuple of the row, column of the to space
+        :return: True if the move was played, False if it is not legal
+        """
         # Get the current board state
         current_board = self.get_board()
 
-        # Get the row, column index of the to and from spaces
-        from_location = self.translate_space(from_space)
-        to_location = self.translate_space(to_space)
-
         # Get the current side
         current_side = self.get_current_side()
 
-        # Determine whether the General is currently in check
-        general_in_check = self.is_in_check(current_side.get_color(), current_board)
-
-        # Check if the to and from spaces and not in check are the same and pass turn if so.
-        if from_space == to_space and not general_in_check:
-            self.change_current_side()
+        # Passing is only allowed when the General is not in check. It is
+        # pushed as the General moving to its own space so pop_move can take
+        # it back like any other move.
+        if from_location == to_location:
+            if self.is_in_check(current_side.get_color(), current_board):
+                return False
+            general_row, general_column = current_side.get_general().get_location()
+            general_square = general_row * 9 + general_column
+            self.push_move(encode_move(general_square, general_square))
             return True
-        elif from_space == to_space and general_in_check:
-            return False
 
         # This is the peice that is going to move
         moving_piece = current_board.get_space_info(from_location[0], from_location[1])
@@ -846,8 +1807,9 @@ class JanggiGame:
         if moving_piece.get_color() != current_side.get_color():
             return False
 
-        # Make sure the game isn't over already
-        if self.get_game_state() != "UNFINISHED":
+        # Make sure the game isn't over already. A checkmate that has not been
+        # looked for yet does not matter, as the side has no legal move anyway.
+        if self._game_state != "UNFINISHED":
             return False
 
         # Make sure the specified space was on the board
@@ -855,93 +1817,307 @@ class JanggiGame:
             return False
 
         # Confirm that the move is valid, move the piece, and update the side
-        if moving_piece.check_move(to_location[0], to_location[1], current_board):
-            # Create a test board and test the move for check
-            test_board = deepcopy(current_board)
-            target_piece = current_board.get_space_info(to_location[0], to_location[1])
-            if target_piece is not None:
-                target_piece.remove()
-            test_board.clear_space(from_location[0], from_location[1])
-            test_board.set_space_info(to_location[0], to_location[1], moving_piece)
-
-            # Save the pieces old location and update it's new location to check for check
-            old_location = moving_piece.get_location()
-            moving_piece.set_location(to_location[0], to_location[1])
-
-            # Test that the move doesn't move into check on the test board
-            if not self.is_in_check(current_side.get_color(), test_board):
-                # Restore old location
-                moving_piece.set_location(old_location[0], old_location[1])
-                if target_piece is not None:
-                    target_piece.set_location(to_location[0], to_location[1])
-                current_side.move_piece(current_board, (to_location[0], to_location[1]), moving_piece)
-                self.change_current_side()
-
-                # Check for check mate by first checking for check
-                current_side = self.get_current_side()
-                if self.is_in_check(current_side.get_color()):
-                    possible_moves = []
-                    pieces_on_board = current_side.get_pieces(True)
-                    check_mate = True
-
-                    # Get all valid moves on the checked side
-                    for piece in pieces_on_board:
-                        possible_moves.append((piece, piece.find_valid_moves(current_board)))
-
-                    # Check if any moves can be taken where the general is not in check
-                    for piece, moves in possible_moves:
-                        # Ends the loop if a valid move is found
-                        if not check_mate:
-                            break
-
-                        # Loop through all the valid moves for the piece and see if any resolve the check
-                        from_location = piece.get_location()
-                        for move in moves:
-                            test_board = deepcopy(current_board)
-                            test_board.clear_space(from_location[0], from_location[1])
-                            # Get info on move to location and remove piece if required
-                            target_piece = test_board.get_space_info(move[0], move[1])
-                            if target_piece is not None:
-                                target_piece.remove()
-                            test_board.set_space_info(move[0], move[1], piece)
-
-                            # Save the pieces old location and update it's new location to check for check
-                            old_location = piece.get_location()
-                            piece.set_location(move[0], move[1])
-
-                            # Test for check in the test board
-                            if not self.is_in_check(current_side.get_color(), test_board):
-                                # Restore old location
-                                piece.set_location(old_location[0], old_location[1])
-                                if target_piece is not None:
-                                    target_piece.set_location(move[0], move[1])
-                                check_mate = False
-                                # No need to search farther so break out of this for loop
-                                break
-
-                            # Restore old location
-                            piece.set_location(old_location[0], old_location[1])
-                            if target_piece is not None:
-                                target_piece.set_location(move[0], move[1])
-
-                    # Test for checkmate and declare a winner as required
-                    if check_mate:
-                        if current_side.get_color() == "red":
-                            self.set_game_state("BLUE_WON")
-                        else:
-                            self.set_game_state("RED_WON")
-
-                # The move did not result in moving into check, return True
-                return True
+        if current_board.check_move(moving_piece, to_location[0], to_location[1]):
+            # Make the move and take it back if it leaves the general in check
+            captured_piece = current_board.push((from_location[0] * 9 + from_location[1]) * 90 +
+                                                to_location[0] * 9 + to_location[1])
+            if self.is_in_check(current_side.get_color(), current_board):
+                current_board.pop()
+                return False
+            self.change_current_side()
+            self._record_ply(captured_piece)
 
-            # Reset the pieces location after testing for move into check
-            moving_piece.set_location(old_location[0], old_location[1])
-            if target_piece is not None:
-                target_piece.set_location(to_location[0], to_location[1])
+            # The move did not result in moving into check, return True
+            return True
 
         # If the move isn't valid, return false
         return False
 
+    def replay(self, moves, verify: str = "none") -> int:
+        """
+        Plays a recorded game from the current position, faster than calling
+        make_move for each move. Checkmate is only looked for after the last
+        move, and then only if the game is eager.
+        :param moves: Iterable of moves encoded by encode_move, where a move to
+                      the same space is a pass
+        :param verify: "none" to trust the record and only update the board,
+                       "legality" to check each move like make_move does, or
+                       "full" to also look for checkmate after every move
+        :return: Number of moves played
+        """
+        if verify not in REPLAY_CHECKS:
+            raise ValueError("Unknown verify mode: " + str(verify))
+        count = 0
+        if verify == "none":
+            for move in moves:
+                self.push_move(move)
+                count += 1
+        else:
+            for move in moves:
+                if verify == "full":
+                    played = self.make_move(move)
+                    self.get_game_state()
+                else:
+                    from_square, to_square = get_move_squares(move)
+                    played = self._play_checked(SQUARE_LOCATIONS[from_square], SQUARE_LOCATIONS[to_square])
+                if not played:
+                    raise ValueError("Illegal move " + "".join(move_to_spaces(move)) + " at ply " + str(count + 1))
+                count += 1
+        if verify != "full":
+            self._update_game_state()
+        return count
+
+    def _update_game_state(self):
+        """
+        Looks for checkmate now if the game is eager, or marks the game state
+        to be worked out by the next get_game_state call
+        :return: Nothing
+        """
+        if self._eager_game_state:
+            self._state_pending = False
+            self._check_for_mate()
+        else:
+            self._state_pending = True
+
+    def _check_for_mate(self):
+        """
+        Ends the game if the side to move is in check and cannot get out of it
+        :return: Nothing
+        """
+        # Check for check mate by first checking for check
+        current_side = self.get_current_side()
+        in_check, checking_pieces = self.get_check_status(current_side.get_color())
+        if in_check:
+            # Stop at the first move that gets the general out of check
+            evasion = next(self._generate_evasions(checking_pieces), None)
+
+            # Test for checkmate and declare a winner as required
+            if evasion is None:
+                if current_side.get_color() == "red":
+                    self.set_game_state("BLUE_WON")
+                else:
+                    self.set_game_state("RED_WON")
+
+    def _record_ply(self, captured_piece: JanggiPiece):
+        """
+        Counts a move that was pushed on the board, remembering the plies since
+        the last capture so pop_move can put the count back
+        :param captured_piece: The piece the move captured, or None
+        :return: Nothing
+        """
+        self._quiet_history.append(self._quiet_plies)
+        self._ply_count += 1
+        self._quiet_plies = 0 if captured_piece is not None else self._quiet_plies + 1
+
+    def push_move(self, move: int):
+        """
+        Makes a move without checking it and hands the turn to the other
+        side. Used by search code together with pop_move.
+        :param move: The move as encoded by encode_move
+        :return: The piece that was captured, or None
+        """
+        captured_piece = self._board.push(move)
+        self.change_current_side()
+        self._record_ply(captured_piece)
+        return captured_piece
+
+    def pop_move(self) -> int:
+        """
+        Takes back the last move made with push_move or make_move. Any game
+        state found for the position after it is forgotten, and is worked out
+        again by the next get_game_state call.
+        :return: The move that was taken back
+        """
+        self.change_current_side()
+        self._ply_count -= 1
+        self._quiet_plies = self._quiet_history.pop()
+        self._game_state = "UNFINISHED"
+        self._state_pending = True
+        return self._board.pop()
+
+    def legal_moves(self) -> list:
+        """
+        Finds every legal move for the side whose turn it is. Passing is not
+        included.
+        :return: list of moves encoded by encode_move, with the capture flag
+                 set on captures
+        """
+        # A checkmate that has not been looked for yet leaves no legal moves anyway
+        if self._game_state != "UNFINISHED":
+            return []
+        return self._find_legal_moves(self.get_current_side().get_pieces(True))
+
+    def legal_moves_from(self, square: str) -> list:
+        """
+        Finds every legal move for the piece on one space
+        :param square: The column, row reference of the space, for example "a7"
+        :return: list of moves encoded by encode_move. Empty if there is no
+                 piece of the current side on the space.
+        """
+        location = self.translate_space(square)
+        if location[0] == -1 or self._game_state != "UNFINISHED":
+            return []
+        piece = self.get_board().get_space_info(location[0], location[1])
+        if piece is None or piece.get_color() != self.get_current_side().get_color():
+            return []
+        return self._find_legal_moves([piece])
+
+    def _find_legal_moves(self, pieces: list) -> list:
+        """
+        Finds the legal moves of some of the current side's pieces. Pins and
+        lines toward the general are worked out once, so only moves that could
+        expose the general are tried on the board and tested for check.
+        :param pieces: The pieces to find moves for
+        :return: list of moves encoded by encode_move
+        """
+        board = self.get_board()
+        current_side = self.get_current_side()
+        color = current_side.get_color()
+        general = current_side.get_general()
+        in_check, checking_pieces = self.get_check_status(color, board)
+        if in_check:
+            return list(self._generate_evasions(checking_pieces, pieces))
+        vacate_spaces, occupy_spaces = self._find_pin_spaces(color, board)
+
+        legal_moves = []
+        for piece in pieces:
+            from_location = piece.get_location()
+            from_code = (from_location[0] * 9 + from_location[1]) * 90
+            test_every_move = piece is general or from_location in vacate_spaces
+            for move in board.find_valid_moves(piece):
+                code = from_code + move[0] * 9 + move[1]
+                if board.get_space_info(move[0], move[1]) is not None:
+                    code |= CAPTURE_FLAG
+                if test_every_move or move in occupy_spaces:
+                    board.push(code)
+                    moved_into_check = self.is_in_check(color, board)
+                    board.pop()
+                    if moved_into_check:
+                        continue
+                legal_moves.append(code)
+
+        return legal_moves
+
+    def _generate_evasions(self, checking_pieces: list, pieces: list = None):
+        """
+        Generates the legal moves for the current side while it is in check.
+        Only moves that could answer the check are tried: general moves,
+        captures of a checking piece, blocking a line, leg or eye space, and
+        moving or capturing a Cannon's screen.
+        Any answer has to deal with the first checking piece, so the other
+        checking pieces are left to the check test.
+        :param checking_pieces: The pieces giving check
+        :param pieces: The pieces to find moves for, all pieces on the board if None
+        :return: Generator of moves encoded by encode_move
+        """
+        board = self.get_board()
+        current_side = self.get_current_side()
+        color = current_side.get_color()
+        general = current_side.get_general()
+        general_row, general_column = general.get_location()
+        if pieces is None:
+            pieces = current_side.get_pieces(True)
+
+        # Spaces a piece can move to, and spaces a piece can move from, to answer the check
+        checker = checking_pieces[0]
+        checker_row, checker_column = checker.get_location()
+        target_spaces = {(checker_row, checker_column)}
+        screen_spaces = set()
+        row_move = (general_row > checker_row) - (general_row < checker_row)
+        column_move = (general_column > checker_column) - (general_column < checker_column)
+        if isinstance(checker, (Chariot, Cannon)):
+            # Every space on the line between the checking piece and the general
+            target_row, target_column = checker_row + row_move, checker_column + column_move
+            while (target_row, target_column) != (general_row, general_column):
+                target_spaces.add((target_row, target_column))
+                if board.get_space_info(target_row, target_column) is not None:
+                    screen_spaces.add((target_row, target_column))
+                target_row, target_column = target_row + row_move, target_column + column_move
+        elif isinstance(checker, Horse):
+            if abs(general_row - checker_row) == 2:
+                target_spaces.add((checker_row + row_move, checker_column))
+            else:
+                target_spaces.add((checker_row, checker_column + column_move))
+        elif isinstance(checker, Elephant):
+            if abs(general_row - checker_row) == 3:
+                target_spaces.add((checker_row + row_move, checker_column))
+                target_spaces.add((checker_row + 2 * row_move, checker_column + column_move))
+            else:
+                target_spaces.add((checker_row, checker_column + column_move))
+                target_spaces.add((checker_row + row_move, checker_column + 2 * column_move))
+
+        for piece in pieces:
+            from_location = piece.get_location()
+            from_code = (from_location[0] * 9 + from_location[1]) * 90
+            every_move = piece is general or from_location in screen_spaces
+            for move in board.find_valid_moves(piece):
+                if not every_move and move not in target_spaces:
+                    continue
+                code = from_code + move[0] * 9 + move[1]
+                if board.get_space_info(move[0], move[1]) is not None:
+                    code |= CAPTURE_FLAG
+                board.push(code)
+                moved_into_check = self.is_in_check(color, board)
+                board.pop()
+                if not moved_into_check:
+                    yield code
+
+    def _find_pin_spaces(self, side: str, board: JanggiBoard) -> (set, set):
+        """
+        Finds the spaces where moving a piece away, or moving a piece onto,
+        could put the side's general in check.
+        A piece leaving one of the first two occupied spaces on a line with an
+        enemy Chariot or Cannon on it can open the line. A piece landing
+        anywhere on a line with an enemy Cannon can become the Cannon's screen.
+        A piece leaving the leg of an enemy Horse or Elephant frees it.
+        :param side: The side whose general is being protected
+        :param board: The JanggiBoard to look at
+        :return: Tuple of the set of vacate spaces and the set of occupy spaces
+        """
+        vacate_spaces = set()
+        occupy_spaces = set()
+        enemy = "blue" if side == "red" else "red"
+        row, column = self.get_side(side).get_general().get_location()
+
+        # Lines only matter while the enemy has a Chariot or Cannon left
+        directions = []
+        enemy_side = self.get_side(enemy)
+        if enemy_side.count_pieces_of_type(Chariot) or enemy_side.count_pieces_of_type(Cannon):
+            directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+            if board.check_space_in_palace(row, column):
+                directions += [(1, 1), (-1, 1), (-1, -1), (1, -1)]
+        for row_move, column_move in directions:
+            diagonal = row_move != 0 and column_move != 0
+            line = []
+            occupied = []
+            enemy_chariot = False
+            enemy_cannon = False
+            target_row, target_column = row + row_move, column + column_move
+            while board.check_location_on_board(target_row, target_column) and \
+                    (not diagonal or board.check_space_in_palace(target_row, target_column)):
+                line.append((target_row, target_column))
+                piece = board.get_space_info(target_row, target_column)
+                if piece is not None:
+                    occupied.append((target_row, target_column))
+                    if piece.get_color() == enemy:
+                        enemy_chariot = enemy_chariot or isinstance(piece, Chariot)
+                        enemy_cannon = enemy_cannon or isinstance(piece, Cannon)
+                target_row, target_column = target_row + row_move, target_column + column_move
+            if enemy_chariot or enemy_cannon:
+                vacate_spaces.update(occupied[:2])
+            if enemy_cannon:
+                occupy_spaces.update(line)
+
+        for (row_move, column_move), leg in board.get_horse_attacks():
+            if board.get_enemy_piece(row + row_move, column + column_move, enemy, Horse) is not None:
+                vacate_spaces.add((row + leg[0], column + leg[1]))
+        for (row_move, column_move), first, second in board.get_elephant_attacks():
+            if board.get_enemy_piece(row + row_move, column + column_move, enemy, Elephant) is not None:
+                vacate_spaces.add((row + first[0], column + first[1]))
+                vacate_spaces.add((row + second[0], column + second[1]))
+
+        return vacate_spaces, occupy_spaces
+
     def get_board(self) -> JanggiBoard:
         """
         Returns the game board.
@@ -1001,17 +2177,38 @@ class JanggiGame:
         :return: Returns a tuple of the row, column location. If an invalid input
                 is provided, the method will return (-1, -1).
         """
-        # Reduce "a1" row by one to start at 0
-        row_location = int(location[1:]) - 1
-        # subtract off the ASCII value of 'a' 97
+        # Names are looked up in a table made once, instead of parsed
+        square = SQUARE_NUMBERS.get(location)
+        if square is None:
+            return -1, -1
+        return SQUARE_LOCATIONS[square]
 
-        col_location = ord(location[0]) - 97
-        # Check that the locations are on the board
-        if not self.get_board().check_location_on_board(row_location, col_location):
-            row_location = -1
-            col_location = -1
+    def position_key(self) -> int:
+        """
+        Returns a 64 bit Zobrist hash of the pieces on the board and the side
+        to move. It is kept up to date as moves are made, so it is cheap to call.
+        :return: 64 bit integer key
+        """
+        return self._board.get_key()
 
-        return row_location, col_location
+    def compute_position_key(self) -> int:
+        """
+        Computes the position hash from scratch, for checking position_key
+        :return: 64 bit integer key
+        """
+        key = self._board.compute_key()
+        if self.get_current_side().get_color() == "red":
+            key ^= ZOBRIST_RED_TO_MOVE
+        return key
+
+    @staticmethod
+    def translate_location(location: (int, int)) -> str:
+        """
+        Translates a (row, column) location back to the "letter number" form
+        :param location: Tuple of row, column, for example (0, 0)
+        :return: String of location in form "a1"
+        """
+        return chr(location[1] + 97) + str(location[0] + 1)
 
     def get_current_side(self) -> Side:
         """
@@ -1026,10 +2223,15 @@ class JanggiGame:
         :param color: Color of the side to set
         :return: Nothing
         """
+        if color == self._current_side.get_color():
+            return
         if color == "blue":
             self._current_side = self._blue_side
         elif color == "red":
             self._current_side = self._red_side
+        else:
+            return
+        self._board.toggle_side_key()
 
     def change_current_side(self):
         """
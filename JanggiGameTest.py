@@ -1,6 +1,10 @@
+import random
 import unittest
+from unittest import mock
 from JanggiGame import JanggiGame, Chariot, General, Elephant, Soldier
-from JanggiGame import Cannon, Guard, Horse
+from JanggiGame import Cannon, Guard, Horse, JanggiPiece
+from JanggiGame import LINE_LOCATIONS, START_POSITION
+from JanggiGame import encode_move, spaces_to_move, move_to_spaces, get_move_squares
 
 
 class JanggiGameTest(unittest.TestCase):
@@ -1000,6 +1004,392 @@ class JanggiGameTest(unittest.TestCase):
         self.assertEqual(False, red_check)
         self.assertEqual(True, blue_check)
 
+    def test_push_pop(self):
+        """Tests that moves made with push are fully taken back by pop"""
+        board = self.my_game.get_board()
+        layout_before = [list(row) for row in board.get_board_layout()]
+        red_soldier = board.get_space_info(3, 0)
+        blue_soldier = board.get_space_info(6, 0)
+
+        # Move a red soldier up and take the blue soldier
+        board.push(encode_move(27, 36))
+        board.push(encode_move(36, 45))
+        captured = board.push(encode_move(45, 54, True))
+        self.assertIs(captured, blue_soldier)
+        self.assertIs(board.get_space_info(6, 0), red_soldier)
+        self.assertFalse(blue_soldier.check_piece_on_board())
+        self.assertEqual(3, board.get_move_count())
+
+        # Take the moves back and confirm the board is restored
+        self.assertEqual(encode_move(45, 54, True), board.pop())
+        self.assertIs(board.get_space_info(6, 0), blue_soldier)
+        self.assertEqual((6, 0), blue_soldier.get_location())
+        board.pop()
+        board.pop()
+        self.assertEqual((3, 0), red_soldier.get_location())
+        self.assertEqual(layout_before, board.get_board_layout())
+        self.assertEqual(0, board.get_move_count())
+
+    def test_failed_move_restores_board(self):
+        """Tests that a move into check leaves the board unchanged"""
+        self.my_game.make_move("e9", "f8")
+        self.my_game.make_move("i1", "i2")
+        self.my_game.make_move("a1", "a1")
+        self.my_game.make_move("i2", "f2")
+        layout_before = [list(row) for row in self.my_game.get_board().get_board_layout()]
+        move_complete = self.my_game.make_move("i7", "i6")
+        self.assertEqual(move_complete, False)
+        self.assertEqual(layout_before, self.my_game.get_board().get_board_layout())
+
+    def test_find_attackers(self):
+        """Compares find_attackers with the moves of every enemy piece"""
+        rng = random.Random(3)
+        board = self.my_game.get_board()
+        for ply in range(150):
+            for side, enemy in (("red", "blue"), ("blue", "red")):
+                enemy_moves = [(piece, board.find_valid_moves(piece))
+                               for piece in self.my_game.get_side(enemy).get_pieces(True)]
+                for row in range(10):
+                    for column in range(9):
+                        piece = board.get_space_info(row, column)
+                        if piece is not None and piece.get_color() == enemy:
+                            continue
+                        expected = [attacker for attacker, moves in enemy_moves if (row, column) in moves]
+                        attackers = board.find_attackers(row, column, side)
+                        self.assertCountEqual(expected, attackers, (row, column, side))
+            pieces = self.my_game.get_current_side().get_pieces(True)
+            moves = [encode_move(piece.get_location()[0] * 9 + piece.get_location()[1], move[0] * 9 + move[1])
+                     for piece in pieces for move in board.find_valid_moves(piece)
+                     if not isinstance(board.get_space_info(move[0], move[1]), General)]
+            board.push(rng.choice(moves))
+            self.my_game.change_current_side()
+
+    def test_get_check_status(self):
+        """Tests that the checking pieces are reported"""
+        self.assertEqual((False, []), self.my_game.get_check_status("blue"))
+        self.my_game.make_move("e9", "f8")
+        self.my_game.make_move("i1", "i2")
+        self.my_game.make_move("a1", "a1")
+        self.my_game.make_move("i2", "f2")
+        in_check, checking_pieces = self.my_game.get_check_status("blue")
+        self.assertTrue(in_check)
+        self.assertEqual([self.my_game.get_board().get_space_info(1, 5)], checking_pieces)
+        self.assertIsInstance(checking_pieces[0], Chariot)
+
+    def test_legal_moves(self):
+        """Compares legal_moves with trying every move on the board"""
+        rng = random.Random(11)
+        board = self.my_game.get_board()
+        for ply in range(200):
+            color = self.my_game.get_current_side().get_color()
+            expected = []
+            for piece in self.my_game.get_current_side().get_pieces(True):
+                from_location = piece.get_location()
+                for move in board.find_valid_moves(piece):
+                    code = encode_move(from_location[0] * 9 + from_location[1], move[0] * 9 + move[1],
+                                       board.get_space_info(move[0], move[1]) is not None)
+                    board.push(code)
+                    if not self.my_game.is_in_check(color):
+                        expected.append(code)
+                    board.pop()
+            legal_moves = self.my_game.legal_moves()
+            self.assertCountEqual(expected, legal_moves)
+            if not legal_moves:
+                break
+            self.assertTrue(self.my_game.make_move(rng.choice(legal_moves)))
+
+    def test_legal_moves_from(self):
+        """Tests finding the legal moves of a single piece"""
+        self.assertCountEqual([spaces_to_move("a7", "a6"), spaces_to_move("a7", "b7")],
+                              self.my_game.legal_moves_from("a7"))
+        self.assertEqual([], self.my_game.legal_moves_from("a4"))
+        self.assertEqual([], self.my_game.legal_moves_from("e5"))
+        self.assertEqual([], self.my_game.legal_moves_from("m11"))
+        self.assertEqual("e9", self.my_game.translate_location((8, 4)))
+
+    def test_legal_moves_in_check(self):
+        """Tests that only moves answering a check are generated"""
+        for from_space, to_space in (("i10", "i9"), ("a9", "a9"), ("i9", "f9"), ("a9", "a9"),
+                                     ("f9", "f4"), ("a9", "a9"), ("f4", "g4"), ("a9", "a9"),
+                                     ("g4", "g2")):
+            self.my_game.make_move(from_space, to_space)
+        self.assertTrue(self.my_game.is_in_check("red"))
+        legal_moves = self.my_game.legal_moves()
+        # The guard can block the chariot and the general can step away
+        self.assertIn(spaces_to_move("f1", "f2"), legal_moves)
+        self.assertIn(spaces_to_move("e2", "e3"), legal_moves)
+        board = self.my_game.get_board()
+        for move in legal_moves:
+            board.push(move)
+            self.assertFalse(self.my_game.is_in_check("red"), move)
+            board.pop()
+        self.assertEqual("UNFINISHED", self.my_game.get_game_state())
+
+    def test_position_key(self):
+        """Tests that the position key is kept up to date as moves are made"""
+        rng = random.Random(5)
+        start_key = self.my_game.position_key()
+        self.assertEqual(start_key, self.my_game.compute_position_key())
+        self.my_game.make_move("a1", "a1")
+        self.assertNotEqual(start_key, self.my_game.position_key())
+        self.assertEqual(self.my_game.compute_position_key(), self.my_game.position_key())
+        self.my_game.make_move("a1", "a1")
+        self.assertEqual(start_key, self.my_game.position_key())
+
+        board = self.my_game.get_board()
+        for ply in range(100):
+            legal_moves = self.my_game.legal_moves()
+            if not legal_moves:
+                break
+            key_before = self.my_game.position_key()
+            board.push(legal_moves[0])
+            board.pop()
+            self.assertEqual(key_before, self.my_game.position_key())
+            self.my_game.make_move(*move_to_spaces(rng.choice(legal_moves)))
+            self.assertEqual(self.my_game.compute_position_key(), self.my_game.position_key())
+
+    def test_position_key_transposition(self):
+        """Tests that the same position reached by different orders has the same key"""
+        other_game = JanggiGame()
+        for from_space, to_space in (("a7", "a6"), ("a4", "a5"), ("c7", "c6"), ("c4", "c5")):
+            self.my_game.make_move(from_space, to_space)
+        for from_space, to_space in (("c7", "c6"), ("c4", "c5"), ("a7", "a6"), ("a4", "a5")):
+            other_game.make_move(from_space, to_space)
+        self.assertEqual(self.my_game.position_key(), other_game.position_key())
+
+    def test_line_occupancy(self):
+        """Tests that the line occupancy masks follow moves, captures and take backs"""
+        board = self.my_game.get_board()
+        rng = random.Random(5)
+        for ply in range(60):
+            for line, locations in enumerate(LINE_LOCATIONS):
+                expected = sum(1 << index for index, (row, column) in enumerate(locations)
+                               if board.get_space_info(row, column) is not None)
+                self.assertEqual(expected, board.get_line_occupancy(line), (ply, locations))
+            moves = self.my_game.legal_moves()
+            if not moves:
+                break
+            self.my_game.push_move(rng.choice(moves))
+        while board.get_move_count():
+            self.my_game.pop_move()
+        self.assertEqual(0b111101111, board.get_line_occupancy(0))
+        self.assertEqual(0b1001001001, board.get_line_occupancy(10))
+
+    def test_move_cache(self):
+        """Tests that cached moves match freshly generated ones through moves and take backs"""
+        board = self.my_game.get_board()
+        rng = random.Random(7)
+        for ply in range(80):
+            for color in ("red", "blue"):
+                for piece in self.my_game.get_side(color).get_pieces(True):
+                    self.assertEqual(board.generate_valid_moves(piece), board.find_valid_moves(piece),
+                                     (ply, piece, piece.get_location()))
+            moves = self.my_game.legal_moves()
+            if not moves:
+                break
+            if ply % 4 == 3:
+                self.my_game.pop_move()
+            else:
+                self.my_game.push_move(rng.choice(moves))
+
+    def test_move_cache_invalidation(self):
+        """Tests that a move only drops the cached moves of the pieces it affects"""
+        board = self.my_game.get_board()
+        chariot = board.get_space_info(0, 0)
+        horse = board.get_space_info(0, 1)
+        far_horse = board.get_space_info(9, 7)
+        for piece in (chariot, horse, far_horse):
+            board.find_valid_moves(piece)
+        self.assertEqual({"hits": 0, "misses": 3, "entries": 3}, board.get_cache_stats())
+        board.find_valid_moves(chariot)
+        self.assertEqual(1, board.get_cache_stats()["hits"])
+
+        # The soldier on a4 moving to a5 opens the chariot's column and the horse's
+        # leg is not touched, so only the chariot has to be found again
+        self.assertTrue(self.my_game.make_move("c10", "d8"))
+        self.assertTrue(self.my_game.make_move("a4", "a5"))
+        stats = board.get_cache_stats()
+        board.find_valid_moves(horse)
+        board.find_valid_moves(far_horse)
+        self.assertEqual(stats["hits"] + 2, board.get_cache_stats()["hits"])
+        self.assertEqual([(1, 0), (2, 0), (3, 0)], board.find_valid_moves(chariot))
+        self.assertEqual(stats["misses"] + 1, board.get_cache_stats()["misses"])
+
+        board.clear_move_cache()
+        self.assertEqual(0, board.get_cache_stats()["entries"])
+
+    def test_live_pieces(self):
+        """Tests that the live piece indexes follow captures and take backs in side order"""
+        rng = random.Random(9)
+        sides = [self.my_game.get_side(color) for color in ("red", "blue")]
+        all_pieces = [side.get_pieces(True)[:] for side in sides]
+        for ply in range(120):
+            for side, pieces in zip(sides, all_pieces):
+                expected = [piece for piece in pieces if piece.check_piece_on_board()]
+                self.assertEqual(expected, side.get_pieces(True), ply)
+                for piece_class in (General, Guard, Horse, Elephant, Chariot, Cannon, Soldier):
+                    self.assertEqual([piece for piece in expected if type(piece) is piece_class],
+                                     side.get_pieces_of_type(piece_class), (ply, piece_class))
+            moves = self.my_game.legal_moves()
+            if not moves:
+                break
+            if ply % 3 == 2:
+                self.my_game.pop_move()
+            else:
+                self.my_game.push_move(rng.choice(moves))
+
+        # A soldier taking the first chariot removes it and taking the move back puts it back first
+        while self.my_game.get_board().get_move_count():
+            self.my_game.pop_move()
+        self.my_game.push_move(spaces_to_move("a7", "a6"))
+        self.my_game.push_move(spaces_to_move("a4", "a5"))
+        self.my_game.push_move(spaces_to_move("a10", "a7"))
+        self.my_game.push_move(spaces_to_move("h3", "h3"))
+        captured = self.my_game.push_move(spaces_to_move("a6", "a5"))
+        self.assertIsInstance(captured, Soldier)
+        self.my_game.push_move(spaces_to_move("a1", "a4"))
+        self.my_game.push_move(spaces_to_move("a5", "a4"))
+        self.assertEqual(1, sides[0].count_pieces_of_type(Chariot))
+        self.my_game.pop_move()
+        self.assertEqual(2, sides[0].count_pieces_of_type(Chariot))
+        self.assertEqual((3, 0), sides[0].get_pieces_of_type(Chariot)[0].get_location())
+
+    def test_check_move_direct(self):
+        """Compares each piece's direct move check with searching its list of valid moves"""
+        rng = random.Random(13)
+        board = self.my_game.get_board()
+        for ply in range(150):
+            for color in ("red", "blue"):
+                for piece in self.my_game.get_side(color).get_pieces(True):
+                    for row in range(-1, 11):
+                        for column in range(-1, 10):
+                            self.assertEqual(JanggiPiece.check_move(piece, row, column, board),
+                                             piece.check_move(row, column, board),
+                                             (ply, piece, piece.get_location(), (row, column)))
+            moves = self.my_game.legal_moves()
+            if not moves:
+                break
+            self.my_game.push_move(rng.choice(moves))
+
+    def test_position_strings(self):
+        """Tests writing positions and setting games up from them"""
+        self.assertEqual(START_POSITION, self.my_game.to_position())
+        self.assertEqual(START_POSITION, JanggiGame.from_position(START_POSITION).to_position())
+        self.my_game.make_move("c7", "c6")
+        self.my_game.make_move("a1", "a1")
+        self.assertEqual("reha1aehr/4k4/1c5c1/p1p1p1p1p/9/2P6/P3P1P1P/1C5C1/4K4/REHA1AEHR b 2 2 EHEH/EHEH",
+                         self.my_game.to_position())
+
+        rng = random.Random(17)
+        for ply in range(120):
+            position = self.my_game.to_position()
+            copy = JanggiGame.from_position(position)
+            self.assertEqual(position, copy.to_position())
+            self.assertEqual(self.my_game.position_key(), copy.position_key())
+            self.assertEqual(self.my_game.get_move_number(), copy.get_move_number())
+            self.assertEqual(self.my_game.get_quiet_plies(), copy.get_quiet_plies())
+            self.assertCountEqual(self.my_game.legal_moves(), copy.legal_moves())
+            moves = self.my_game.legal_moves()
+            if not moves:
+                break
+            self.my_game.push_move(rng.choice(moves))
+        while self.my_game.get_board().get_move_count() > 2:
+            self.my_game.pop_move()
+        self.assertEqual(2, self.my_game.get_quiet_plies())
+        self.assertEqual(2, self.my_game.get_move_number())
+
+        # Blue is mated by the two chariots, the setup is kept as written
+        copy = JanggiGame.from_position("4k4/9/9/9/9/9/9/9/r8/r3K4 b 40 57 HEEH/EHHE")
+        self.assertEqual("RED_WON", copy.get_game_state())
+        self.assertEqual("HEEH/EHHE", copy.get_setup())
+        self.assertEqual(2, len(copy.get_side("red").get_pieces_of_type(Chariot)))
+        for position in ("9/9 b 0 1 EHEH/EHEH", START_POSITION.replace(" b ", " x "),
+                         START_POSITION.replace("4k4", "4k5"), START_POSITION.replace("4k4", "3kk3"),
+                         START_POSITION.replace("4k4", "9"), START_POSITION.replace("EHEH/EHEH", "EEEH/EHEH"),
+                         START_POSITION.replace(" 0 1 ", " 0 0 ")):
+            with self.assertRaises(ValueError):
+                JanggiGame.from_position(position)
+
+    def test_undo_pass(self):
+        """Tests that a pass made with make_move is taken back on its own"""
+        self.assertTrue(self.my_game.make_move("c7", "c6"))
+        after_move = self.my_game.to_position()
+        key = self.my_game.position_key()
+        self.assertTrue(self.my_game.make_move("a1", "a1"))
+        self.assertEqual("blue", self.my_game.get_current_side().get_color())
+        self.assertEqual(2, self.my_game.get_board().get_move_count())
+        pass_move = self.my_game.pop_move()
+        self.assertEqual(get_move_squares(pass_move)[0], get_move_squares(pass_move)[1])
+        self.assertEqual(after_move, self.my_game.to_position())
+        self.assertEqual(key, self.my_game.position_key())
+        self.assertEqual("red", self.my_game.get_current_side().get_color())
+        self.assertEqual(1, self.my_game.get_quiet_plies())
+
+    def test_replay(self):
+        """Tests replaying a recorded game at each level of checking"""
+        record = [spaces_to_move(from_space, to_space) for from_space, to_space in
+                  [("i10", "i9"), ("a1", "a1"), ("i9", "f9"), ("a1", "a1"), ("f9", "f4"),
+                   ("a1", "a1"), ("f4", "g4"), ("a1", "a1"), ("g4", "g2"), ("f1", "f2"),
+                   ("a1", "a1"), ("e2", "e1"), ("e7", "e6"), ("a1", "a1"), ("e6", "e5"),
+                   ("a1", "a1"), ("e5", "e4"), ("a1", "a1"), ("e4", "e3"), ("a1", "a1"),
+                   ("h10", "g8"), ("a1", "a1"), ("h8", "e8"), ("e1", "f1"), ("g2", "g1")]]
+        for move in record:
+            self.assertTrue(self.my_game.make_move(move))
+        self.assertEqual("BLUE_WON", self.my_game.get_game_state())
+        for verify in ("none", "legality", "full"):
+            game = JanggiGame()
+            self.assertEqual(len(record), game.replay(iter(record), verify))
+            self.assertEqual("BLUE_WON", game.get_game_state())
+            self.assertEqual(self.my_game.to_position(), game.to_position())
+            self.assertEqual(self.my_game.position_key(), game.position_key())
+
+        # A move the piece cannot make, or a pass while in check, is refused
+        for verify in ("legality", "full"):
+            with self.assertRaises(ValueError):
+                JanggiGame().replay([spaces_to_move("c7", "c5")], verify)
+            with self.assertRaises(ValueError):
+                JanggiGame().replay(record[:-2] + [spaces_to_move("a1", "a1")], verify)
+        with self.assertRaises(ValueError):
+            JanggiGame().replay(record, "some")
+
+    def test_lazy_game_state(self):
+        """Tests that checkmate is only looked for when the game state is asked for"""
+        position = "4k4/9/9/9/9/9/9/1r7/r8/4K4 r 0 40 EHEH/EHEH"
+        mate = spaces_to_move("b8", "b10")
+        game = JanggiGame.from_position(position)
+        with mock.patch.object(game, "_check_for_mate", wraps=game._check_for_mate) as check_for_mate:
+            self.assertTrue(game.make_move(mate))
+            self.assertEqual([], game.legal_moves())
+            self.assertFalse(game.make_move("e10", "e10"))
+            check_for_mate.assert_not_called()
+            self.assertEqual("RED_WON", game.get_game_state())
+            self.assertEqual("RED_WON", game.get_game_state())
+            self.assertEqual(1, check_for_mate.call_count)
+
+        # Taking the move back forgets the result, whether or not it was asked for
+        game.pop_move()
+        self.assertEqual("UNFINISHED", game.get_game_state())
+        game = JanggiGame.from_position(position)
+        game.make_move(mate)
+        game.pop_move()
+        self.assertEqual("UNFINISHED", game.get_game_state())
+
+        # An eager game finds the checkmate as the move is made
+        game = JanggiGame.from_position(position, eager_game_state=True)
+        self.assertTrue(game.get_eager_game_state())
+        with mock.patch.object(game, "_check_for_mate", wraps=game._check_for_mate) as check_for_mate:
+            self.assertTrue(game.make_move(mate))
+            self.assertEqual(1, check_for_mate.call_count)
+            self.assertEqual("RED_WON", game.get_game_state())
+            self.assertEqual(1, check_for_mate.call_count)
+        game = JanggiGame.from_position(position)
+        game.make_move(mate)
+        with mock.patch.object(game, "_check_for_mate", wraps=game._check_for_mate) as check_for_mate:
+            game.set_eager_game_state(True)
+            self.assertEqual(1, check_for_mate.call_count)
+        self.assertEqual("RED_WON", game.get_game_state())
+
+
 if __name__ == "__main__":
     """Runs the unit test"""
     unittest.main()
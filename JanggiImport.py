@@ -0,0 +1,105 @@
+# Author: John Cheshire
+# Date: March 9, 2021
+# Description: This file contains an importer for archives of finished Janggi
+#               games. Each line of a record file is one game, written as its
+#               moves with the from and to space names run together, for
+#               example "c7c6 c4c5 b10d7", where a move to the same space is a
+#               pass. Blank lines and lines starting with # are skipped. The
+#               file is read one line at a time, so archives of any size can
+#               be imported, and the plies replayed per second are reported.
+#               Run it as a script to import a file, for example
+#               python JanggiImport.py games.txt --verify legality
+import argparse
+import re
+import time
+from JanggiGame import JanggiGame, JanggiBoard, REPLAY_CHECKS, spaces_to_move
+from JanggiBackends import BOARD_CLASSES
+
+# A move written as its from and to space names, for example "b10d7"
+_MOVE_PATTERN = re.compile(r"([a-i](?:10|[1-9]))([a-i](?:10|[1-9]))$")
+# Moves already parsed, by their text. There are at most 90 * 90 of them.
+_PARSED_MOVES = {}
+
+
+def parse_moves(line: str) -> list:
+    """
+    Reads the moves of one game record
+    :param line: Moves separated by spaces, for example "c7c6 c4c5"
+    :return: list of moves encoded by encode_move, without capture flags
+    """
+    moves = []
+    for text in line.split():
+        move = _PARSED_MOVES.get(text)
+        if move is None:
+            match = _MOVE_PATTERN.match(text)
+            if match is None:
+                raise ValueError("Not a move: " + text)
+            move = _PARSED_MOVES[text] = spaces_to_move(match.group(1), match.group(2))
+        moves.append(move)
+    return moves
+
+
+def replay_records(lines, verify: str = "none", board_class: type = JanggiBoard):
+    """
+    Replays game records one at a time
+    :param lines: Iterable of record lines, such as an open file
+    :param verify: How much to check each game, one of REPLAY_CHECKS
+    :param board_class: Board class for the games to use
+    :return: Generator of (game, plies) tuples, one for each record, where the
+             game is the JanggiGame at the end of the record
+    """
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        game = JanggiGame(board_class)
+        try:
+            plies = game.replay(parse_moves(line), verify)
+        except ValueError as error:
+            raise ValueError("Line " + str(line_number) + ": " + str(error)) from None
+        yield game, plies
+
+
+def import_games(lines, verify: str = "none", board_class: type = JanggiBoard) -> dict:
+    """
+    Replays every game record and measures how fast it went
+    :param lines: Iterable of record lines, such as an open file
+    :param verify: How much to check each game, one of REPLAY_CHECKS
+    :param board_class: Board class for the games to use
+    :return: Dictionary of the number of games, plies, seconds, plies per
+             second, and the number of games that ended in each game state
+    """
+    games = 0
+    plies = 0
+    results = {}
+    start = time.perf_counter()
+    for game, game_plies in replay_records(lines, verify, board_class):
+        games += 1
+        plies += game_plies
+        state = game.get_game_state()
+        results[state] = results.get(state, 0) + 1
+    seconds = time.perf_counter() - start
+    return {
+        "games": games,
+        "plies": plies,
+        "seconds": seconds,
+        "plies_per_second": plies / seconds if seconds else 0.0,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replays a file of Janggi game records")
+    parser.add_argument("path")
+    parser.add_argument("--verify", choices=REPLAY_CHECKS, default="none")
+    parser.add_argument("--board", choices=sorted(BOARD_CLASSES), default="list")
+    arguments = parser.parse_args()
+
+    with open(arguments.path) as record_file:
+        stats = import_games(record_file, arguments.verify, BOARD_CLASSES[arguments.board])
+    print("Games:", stats["games"])
+    print("Plies:", stats["plies"])
+    print("Seconds:", round(stats["seconds"], 3))
+    print("Plies per second:", round(stats["plies_per_second"]))
+    for state, count in sorted(stats["results"].items()):
+        print(state + ":", count)
@@ -0,0 +1,54 @@
+import unittest
+from JanggiGame import JanggiGame, encode_move
+from JanggiBitboard import BitboardJanggiBoard
+from JanggiImport import parse_moves, replay_records, import_games
+
+# Blue's chariot and horse mate red, with passes written as a move to the same space
+MATE_RECORD = ("i10i9 a1a1 i9f9 a1a1 f9f4 a1a1 f4g4 a1a1 g4g2 f1f2 a1a1 e2e1 e7e6 a1a1 e6e5 "
+               "a1a1 e5e4 a1a1 e4e3 a1a1 h10g8 a1a1 h8e8 e1f1 g2g1")
+
+
+class JanggiImportTest(unittest.TestCase):
+    """Janggi game record import tests"""
+
+    def test_parse_moves(self):
+        """Tests reading the moves of a record"""
+        self.assertEqual([encode_move(56, 47), encode_move(81, 63), encode_move(0, 0)],
+                         parse_moves("  c7c6 a10a8\ta1a1 "))
+        self.assertEqual([], parse_moves(""))
+        for text in ("c7", "c7c11", "j1j2", "c7-c6"):
+            with self.assertRaises(ValueError):
+                parse_moves(text)
+
+    def test_replay_records(self):
+        """Tests that each record is replayed into its own game"""
+        lines = ["# archive", "", MATE_RECORD + "\n", "c7c6 c4c5"]
+        for verify in ("none", "legality", "full"):
+            games = list(replay_records(lines, verify, BitboardJanggiBoard))
+            self.assertEqual([25, 2], [plies for game, plies in games])
+            self.assertEqual("BLUE_WON", games[0][0].get_game_state())
+            self.assertIsInstance(games[1][0].get_board(), BitboardJanggiBoard)
+
+        reference = JanggiGame()
+        reference.make_move("c7", "c6")
+        reference.make_move("c4", "c5")
+        self.assertEqual(reference.to_position(), games[1][0].to_position())
+
+    def test_bad_records(self):
+        """Tests that errors name the line of the bad record"""
+        with self.assertRaisesRegex(ValueError, "Line 2"):
+            import_games(["c7c6", "c4c5 c7c5"], "legality")
+        with self.assertRaisesRegex(ValueError, "Line 1"):
+            import_games(["c7c6 x"])
+
+    def test_import_games(self):
+        """Tests the counts and speed an import reports"""
+        stats = import_games([MATE_RECORD, "c7c6 c4c5", "# not a game"] * 3)
+        self.assertEqual(6, stats["games"])
+        self.assertEqual(81, stats["plies"])
+        self.assertEqual({"BLUE_WON": 3, "UNFINISHED": 3}, stats["results"])
+        self.assertGreater(stats["plies_per_second"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
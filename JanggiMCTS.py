@@ -0,0 +1,448 @@
+# Author: John Cheshire
+# Date: March 9, 2021
+# Description: This file contains a Monte Carlo tree search player for
+#               JanggiGame. It picks moves with UCT, keeps the tree in flat
+#               arrays instead of one object per node, and sends batches of
+#               playouts to a pool of worker processes. The tree under the move
+#               that was played is kept for the next search.
+import math
+import os
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from JanggiGame import JanggiGame, SQUARE_LOCATIONS, CAPTURE_FLAG, encode_move, get_move_squares
+from JanggiEngine import evaluate_position, ORDERING_VALUES
+from JanggiTransposition import pack_move, unpack_move
+
+# Exploration constant for UCT
+EXPLORATION = 1.4
+# Score difference that makes a cut off playout count as about a 73% win
+PLAYOUT_SCORE_SCALE = 400
+# Marks a node whose children have not been made yet
+UNEXPANDED = -1
+
+
+def _find_moves(game: JanggiGame) -> list:
+    """
+    Finds the moves of the side to move, with passing as the only move when a
+    side that is not in check has nothing else
+    :param game: The JanggiGame position
+    :return: list of moves, empty if the side to move is checkmated
+    """
+    moves = game.legal_moves()
+    if moves:
+        return moves
+    color = game.get_current_side().get_color()
+    if game.is_in_check(color):
+        return []
+    row, column = game.get_current_side().get_general().get_location()
+    return [encode_move(row * 9 + column, row * 9 + column)]
+
+
+def playout(game: JanggiGame, max_plies: int, heuristic: bool, generator: random.Random) -> float:
+    """
+    Plays random moves from a position until one side is checkmated or the ply
+    limit is reached, then takes the moves back
+    :param game: The JanggiGame position to play from
+    :param max_plies: Most moves to play before scoring the position
+    :param heuristic: Whether captures of valuable pieces are picked more often
+    :param generator: Random number generator to use
+    :return: Result for the side to move at the start, 1 for a win, 0 for a
+             loss, and between them for a position cut off by the ply limit
+    """
+    board = game.get_board()
+    plies = 0
+    result = None
+    while plies < max_plies:
+        moves = _find_moves(game)
+        if not moves:
+            # The side to move is checkmated
+            result = 0.0 if plies % 2 == 0 else 1.0
+            break
+        if heuristic:
+            weights = []
+            for move in moves:
+                if move & CAPTURE_FLAG:
+                    target = board.get_space_info(*SQUARE_LOCATIONS[get_move_squares(move)[1]])
+                    weights.append(1 + 4 * ORDERING_VALUES[type(target)])
+                else:
+                    weights.append(1)
+            move = generator.choices(moves, weights)[0]
+        else:
+            move = generator.choice(moves)
+        game.push_move(move)
+        plies += 1
+
+    if result is None:
+        score = evaluate_position(game)
+        if plies % 2:
+            score = -score
+        result = 1 / (1 + math.exp(-score / PLAYOUT_SCORE_SCALE))
+    for _ in range(plies):
+        game.pop_move()
+    return result
+
+
+def _playout_worker(positions: list, board_class: type, max_plies: int, heuristic: bool,
+                    seed: int) -> (list, float):
+    """
+    Runs a batch of playouts in a worker process
+    :param positions: list of position strings from JanggiGame.to_position
+    :param board_class: Board class for the games to use
+    :param max_plies: Most moves to play in each playout
+    :param heuristic: Whether to use heuristic playouts
+    :param seed: Seed for the random number generator
+    :return: Tuple of the results in order and the seconds spent
+    """
+    start = time.perf_counter()
+    generator = random.Random(seed)
+    results = [playout(JanggiGame.from_position(position, board_class), max_plies, heuristic, generator)
+               for position in positions]
+    return results, time.perf_counter() - start
+
+
+class JanggiMCTS:
+    """
+    The JanggiMCTS class picks moves for the side to move in a JanggiGame by
+    Monte Carlo tree search. Nodes live in parallel arrays indexed by node
+    number, and a node's children are stored next to each other.
+    Call advance with every move played in the game to keep the tree, and
+    close when done with it to stop the worker processes.
+    """
+    def __init__(self, game: JanggiGame, workers: int = 0, time_limit: float = None,
+                 playout_limit: int = None, batch_size: int = None, max_plies: int = 60,
+                 heuristic: bool = True, seed: int = None):
+        """
+        Initializes the player for a game and a search budget
+        :param game: The JanggiGame to search. Moves are made and taken back on
+                     it during the search, it is left as it was afterwards.
+        :param workers: Number of playout processes, 0 to play out in this
+                        process, or None for the CPU count
+        :param time_limit: Seconds allowed for a search, or None for no limit
+        :param playout_limit: Playouts allowed for a search, or None for no limit.
+                              1000 is used when neither limit is given.
+        :param batch_size: Leaves played out together, four for each worker if None
+        :param max_plies: Most moves in a playout before the position is scored
+        :param heuristic: Whether playouts prefer capturing valuable pieces
+        :param seed: Seed for the random number generator, or None
+        """
+        self._game = game
+        self._workers = workers if workers is not None else os.cpu_count() or 1
+        self._time_limit = time_limit
+        if time_limit is None and playout_limit is None:
+            playout_limit = 1000
+        self._playout_limit = playout_limit
+        self._batch_size = batch_size if batch_size is not None else max(1, 4 * self._workers)
+        self._max_plies = max_plies
+        self._heuristic = heuristic
+        self._random = random.Random(seed)
+        self._executor = None
+        self._playouts = 0
+        self._seconds = 0.0
+        self._playout_seconds = 0.0
+        self._reset_tree()
+
+    def __enter__(self):
+        """Allows the player to be used in a with statement"""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Closes the player at the end of a with statement"""
+        self.close()
+
+    def close(self):
+        """
+        Stops the worker processes
+        :return: Nothing
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _reset_tree(self):
+        """
+        Throws the tree away and starts a new one with an unexpanded root
+        :return: Nothing
+        """
+        self._parents = array("i")
+        self._moves = array("i")
+        self._first_children = array("i")
+        self._child_counts = array("i")
+        self._visits = array("i")
+        self._values = array("d")
+        self._add_node(-1, 0)
+        self._root_key = None
+
+    def _add_node(self, parent: int, move_code: int) -> int:
+        """
+        Adds an unexpanded node to the arrays
+        :param parent: Number of the parent node, -1 for the root
+        :param move_code: The move from the parent, packed by pack_move
+        :return: Number of the new node
+        """
+        self._parents.append(parent)
+        self._moves.append(move_code)
+        self._first_children.append(UNEXPANDED)
+        self._child_counts.append(0)
+        self._visits.append(0)
+        self._values.append(0.0)
+        return len(self._parents) - 1
+
+    def get_node_count(self) -> int:
+        """
+        Returns the number of nodes in the tree
+        :return: Node count
+        """
+        return len(self._parents)
+
+    def get_root_visits(self) -> int:
+        """
+        Returns the number of playouts that went through the root
+        :return: Visit count
+        """
+        return self._visits[0]
+
+    def get_root_children(self) -> list:
+        """
+        Returns the root moves that have been expanded with their statistics
+        :return: list of (move, visits, average result) tuples, where the
+                 result is for the side to move at the root
+        """
+        children = []
+        first = self._first_children[0]
+        for child in range(first, first + self._child_counts[0]) if first != UNEXPANDED else ():
+            visits = self._visits[child]
+            children.append((unpack_move(self._moves[child]), visits,
+                             self._values[child] / visits if visits else 0.0))
+        return children
+
+    def get_stats(self) -> dict:
+        """
+        Returns the playout count and rates of the last search. The rate per
+        core divides by the time the workers spent playing out.
+        :return: Dictionary of statistic name to value
+        """
+        return {"playouts": self._playouts,
+                "nodes": self.get_node_count(),
+                "seconds": self._seconds,
+                "playouts_per_second": self._playouts / self._seconds if self._seconds else 0.0,
+                "playouts_per_core_second":
+                    self._playouts / self._playout_seconds if self._playout_seconds else 0.0}
+
+    def advance(self, move: int):
+        """
+        Moves the root of the tree to the child reached by a move, keeping the
+        statistics under it and dropping the rest. Call it when a move is
+        played in the game, before or after making it.
+        :param move: The move
+        :return: Nothing
+        """
+        # The position after the move, so the next search can check it
+        if self._game.position_key() == self._root_key:
+            self._game.push_move(move)
+            expected_key = self._game.position_key()
+            self._game.pop_move()
+        else:
+            expected_key = self._game.position_key()
+
+        move_code = pack_move(move)
+        first = self._first_children[0]
+        new_root = None
+        if first != UNEXPANDED:
+            for child in range(first, first + self._child_counts[0]):
+                if self._moves[child] == move_code:
+                    new_root = child
+                    break
+        if new_root is None:
+            self._reset_tree()
+            self._root_key = expected_key
+            return
+
+        # Copy the subtree to new arrays breadth first, which keeps every
+        # node's children next to each other
+        parents, moves = array("i", [-1]), array("i", [0])
+        first_children, child_counts = array("i", [UNEXPANDED]), array("i", [0])
+        visits, values = array("i", [self._visits[new_root]]), array("d", [self._values[new_root]])
+        old_nodes = [new_root]
+        position = 0
+        while position < len(old_nodes):
+            old_node = old_nodes[position]
+            first = self._first_children[old_node]
+            if first != UNEXPANDED:
+                first_children[position] = len(old_nodes)
+                child_counts[position] = self._child_counts[old_node]
+                for child in range(first, first + self._child_counts[old_node]):
+                    old_nodes.append(child)
+                    parents.append(position)
+                    moves.append(self._moves[child])
+                    first_children.append(UNEXPANDED)
+                    child_counts.append(0)
+                    visits.append(self._visits[child])
+                    values.append(self._values[child])
+            position += 1
+        self._parents, self._moves = parents, moves
+        self._first_children, self._child_counts = first_children, child_counts
+        self._visits, self._values = visits, values
+        self._root_key = expected_key
+
+    def search(self) -> (int, list):
+        """
+        Runs playouts from the current position of the game until the budget
+        runs out
+        :return: Tuple of the best move and the line of most visited moves
+                 after it. The best move is None if the side to move has no moves.
+        """
+        start = time.perf_counter()
+        self._playouts = 0
+        self._playout_seconds = 0.0
+        if self._root_key != self._game.position_key():
+            self._reset_tree()
+            self._root_key = self._game.position_key()
+        if self._first_children[0] == UNEXPANDED:
+            self._expand(0)
+        if self._child_counts[0] == 0:
+            self._seconds = time.perf_counter() - start
+            return None, []
+
+        deadline = None
+        if self._time_limit is not None:
+            deadline = start + self._time_limit
+        if self._workers and self._executor is None:
+            self._executor = ProcessPoolExecutor(self._workers)
+
+        while True:
+            batch = self._batch_size
+            if self._playout_limit is not None:
+                batch = min(batch, self._playout_limit - self._playouts)
+            if batch <= 0 or (deadline is not None and time.perf_counter() >= deadline):
+                break
+            self._run_batch(batch)
+
+        self._seconds = time.perf_counter() - start
+        pv = []
+        node = 0
+        while self._first_children[node] != UNEXPANDED and self._child_counts[node]:
+            first = self._first_children[node]
+            node = max(range(first, first + self._child_counts[node]), key=self._visits.__getitem__)
+            if not self._visits[node]:
+                break
+            pv.append(unpack_move(self._moves[node]))
+        if not pv:
+            pv.append(unpack_move(self._moves[self._first_children[0]]))
+        return pv[0], pv
+
+    def _expand(self, node: int):
+        """
+        Makes the children of a node. The game must be at the node's position.
+        :param node: Number of the node
+        :return: Nothing
+        """
+        moves = _find_moves(self._game)
+        self._random.shuffle(moves)
+        self._first_children[node] = len(self._parents)
+        self._child_counts[node] = len(moves)
+        for move in moves:
+            self._add_node(node, pack_move(move))
+
+    def _select(self, node: int) -> int:
+        """
+        Picks the child of a node with the highest UCT score, unvisited first
+        :param node: Number of the node
+        :return: Number of the child
+        """
+        first = self._first_children[node]
+        visits = self._visits
+        values = self._values
+        log_visits = math.log(max(1, visits[node]))
+        best_child = first
+        best_score = -1.0
+        for child in range(first, first + self._child_counts[node]):
+            child_visits = visits[child]
+            if not child_visits:
+                return child
+            score = values[child] / child_visits + EXPLORATION * math.sqrt(log_visits / child_visits)
+            if score > best_score:
+                best_score = score
+                best_child = child
+        return best_child
+
+    def _run_batch(self, batch: int):
+        """
+        Picks a batch of leaves, plays them out and adds the results to the tree.
+        Visits are counted as a leaf is picked, so each result counts as a
+        loss until it comes back and the batch spreads over different leaves.
+        :param batch: Number of leaves to pick
+        :return: Nothing
+        """
+        leaves = []
+        pending = []
+        for _ in range(batch):
+            node = 0
+            self._visits[0] += 1
+            plies = 0
+            while True:
+                if self._first_children[node] == UNEXPANDED:
+                    if self._visits[node] > 1 or node == 0:
+                        self._expand(node)
+                    else:
+                        break
+                if not self._child_counts[node]:
+                    break
+                node = self._select(node)
+                self._game.push_move(unpack_move(self._moves[node]))
+                self._visits[node] += 1
+                plies += 1
+
+            if self._first_children[node] != UNEXPANDED and not self._child_counts[node]:
+                # Checkmate, a win for the side that moved into the node
+                self._backpropagate(node, 1.0)
+            elif self._workers:
+                leaves.append(node)
+                pending.append(self._game.to_position())
+            else:
+                playout_start = time.perf_counter()
+                result = playout(self._game, self._max_plies, self._heuristic, self._random)
+                self._playout_seconds += time.perf_counter() - playout_start
+                self._backpropagate(node, 1.0 - result)
+            for _ in range(plies):
+                self._game.pop_move()
+            self._playouts += 1
+
+        if not pending:
+            return
+        chunk = -(-len(pending) // self._workers)
+        board_class = type(self._game.get_board())
+        futures = [self._executor.submit(_playout_worker, pending[index:index + chunk], board_class,
+                                         self._max_plies, self._heuristic, self._random.getrandbits(32))
+                   for index in range(0, len(pending), chunk)]
+        results = []
+        for future in futures:
+            chunk_results, seconds = future.result()
+            results.extend(chunk_results)
+            self._playout_seconds += seconds
+        for node, result in zip(leaves, results):
+            self._backpropagate(node, 1.0 - result)
+
+    def _backpropagate(self, node: int, value: float):
+        """
+        Adds a result to a node and its ancestors. The visits were already
+        counted when the node was picked.
+        :param node: Number of the node
+        :param value: Result for the side that moved into the node
+        :return: Nothing
+        """
+        while node != -1:
+            self._values[node] += value
+            value = 1.0 - value
+            node = self._parents[node]
+
+
+if __name__ == "__main__":
+    """Prints playout throughput in this process and with a process pool"""
+    for worker_count in (0, os.cpu_count() or 1):
+        with JanggiMCTS(JanggiGame(), worker_count, playout_limit=200, seed=1) as player:
+            player.search()
+            stats = player.get_stats()
+            print(worker_count, "workers:", round(stats["playouts_per_second"]), "playouts per second,",
+                  round(stats["playouts_per_core_second"]), "per core second")
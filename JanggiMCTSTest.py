@@ -0,0 +1,76 @@
+import unittest
+from JanggiGame import JanggiGame
+from JanggiMCTS import JanggiMCTS, UNEXPANDED
+
+
+class JanggiMCTSTest(unittest.TestCase):
+    """Janggi Monte Carlo tree search tests"""
+
+    def setUp(self) -> None:
+        self.my_game = JanggiGame()
+
+    def play(self, moves: list):
+        """Makes a list of moves on the test game"""
+        for from_space, to_space in moves:
+            self.assertTrue(self.my_game.make_move(from_space, to_space), (from_space, to_space))
+
+    def test_finds_mate(self):
+        """Tests that the search finds a mate in one"""
+        self.play([("i10", "i9"), ("a1", "a1"), ("i9", "f9"), ("a1", "a1"), ("f9", "f4"),
+                   ("a1", "a1"), ("f4", "g4"), ("a1", "a1"), ("g4", "g2"), ("f1", "f2"),
+                   ("a1", "a1"), ("e2", "e1"), ("e7", "e6"), ("a1", "a1"), ("e6", "e5"),
+                   ("a1", "a1"), ("e5", "e4"), ("a1", "a1"), ("e4", "e3"), ("a1", "a1"),
+                   ("h10", "g8"), ("a1", "a1"), ("h8", "e8"), ("e1", "f1")])
+        key = self.my_game.position_key()
+        player = JanggiMCTS(self.my_game, playout_limit=300, max_plies=4, seed=3)
+        best_move, pv = player.search()
+        self.assertEqual(key, self.my_game.position_key())
+        self.assertEqual(300, player.get_root_visits())
+        self.my_game.make_move(best_move)
+        self.assertEqual("BLUE_WON", self.my_game.get_game_state())
+
+    def test_node_arrays(self):
+        """Tests that every node's children are stored together after their parent"""
+        player = JanggiMCTS(self.my_game, playout_limit=60, max_plies=4, seed=1)
+        player.search()
+        self.assertEqual(60, player.get_stats()["playouts"])
+        self.assertEqual(len(self.my_game.legal_moves()), len(player.get_root_children()))
+        for node in range(player.get_node_count()):
+            first = player._first_children[node]
+            if first == UNEXPANDED:
+                continue
+            self.assertGreater(first, node)
+            children = range(first, first + player._child_counts[node])
+            self.assertTrue(all(player._parents[child] == node for child in children))
+            # Visits were counted on the way down, so a parent has its own playout plus its children's
+            self.assertEqual(player._visits[node], 1 + sum(player._visits[child] for child in children)
+                             if node else sum(player._visits[child] for child in children))
+
+    def test_tree_reuse(self):
+        """Tests that the subtree under the played move is kept"""
+        player = JanggiMCTS(self.my_game, playout_limit=100, max_plies=4, seed=2)
+        best_move, pv = player.search()
+        visits = [child[1] for child in player.get_root_children() if child[0] == best_move][0]
+        player.advance(best_move)
+        self.my_game.make_move(best_move)
+        self.assertEqual(visits, player.get_root_visits())
+        player.search()
+        self.assertEqual(visits + 100, player.get_root_visits())
+
+        # A search from a position the tree does not belong to starts over
+        self.assertTrue(self.my_game.make_move("a4", "a5"))
+        player.search()
+        self.assertEqual(100, player.get_root_visits())
+
+    def test_process_pool(self):
+        """Tests playouts in worker processes"""
+        with JanggiMCTS(self.my_game, workers=1, playout_limit=8, max_plies=4, seed=1) as player:
+            best_move, pv = player.search()
+            self.assertIn(best_move, self.my_game.legal_moves())
+            stats = player.get_stats()
+            self.assertEqual(8, stats["playouts"])
+            self.assertGreater(stats["playouts_per_core_second"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,365 @@
+# Author: John Cheshire
+# Date: March 9, 2021
+# Description: This file contains a JanggiBoard backend that also keeps the
+#               position in one flat list of cells with a border of off-board
+#               cells around it. A step in any direction is adding a fixed
+#               number to the cell index, and a walk stops when it reaches the
+#               border, so no location tuples are built and no bounds are
+#               tested. Palace membership is looked up in arrays built when the
+#               module is imported. Use it by passing it to the game, for
+#               example JanggiGame(MailboxJanggiBoard).
+from JanggiGame import JanggiBoard, JanggiPiece
+from JanggiGame import General, Guard, Horse, Elephant, Chariot, Cannon, Soldier
+from JanggiGame import HORSE_PATHS, ELEPHANT_PATHS
+
+ROWS = 10
+COLUMNS = 9
+# Three cells of border on every side, as far as an Elephant reaches, so every
+# leaper lookup from an edge lands on a border cell inside the list
+PADDING = 3
+WIDTH = COLUMNS + 2 * PADDING
+HEIGHT = ROWS + 2 * PADDING
+CELLS = WIDTH * HEIGHT
+
+# Marks a cell that is not on the board
+OFF_BOARD = object()
+
+# Cell of each row, column location
+LOCATION_CELLS = [[(row + PADDING) * WIDTH + column + PADDING for column in range(COLUMNS)] for row in range(ROWS)]
+# Row, column location of each cell, None for the border
+CELL_LOCATIONS = [None] * CELLS
+for _location_row, _location_cells in enumerate(LOCATION_CELLS):
+    for _location_column, _location_cell in enumerate(_location_cells):
+        CELL_LOCATIONS[_location_cell] = (_location_row, _location_column)
+
+# Steps in the order the list board walks them: south, north, east, west, then
+# the palace diagonals south east, north east, north west, south west
+ORTHOGONAL_STEPS = (WIDTH, -WIDTH, 1, -1)
+DIAGONAL_STEPS = (WIDTH + 1, -WIDTH + 1, -WIDTH - 1, WIDTH - 1)
+# General and Guard steps, row by row from the top left neighbour
+NEIGHBOR_STEPS = (-WIDTH - 1, -WIDTH, -WIDTH + 1, -1, 1, WIDTH - 1, WIDTH, WIDTH + 1)
+
+
+def _build_palace_arrays() -> (list, dict):
+    """
+    Builds the palace lookups
+    :return: Tuple of a list of whether each cell is in either palace, and a
+             dictionary of color to a list of whether each cell is in that
+             color's palace
+    """
+    in_palace = [False] * CELLS
+    own_palace = {"red": [False] * CELLS, "blue": [False] * CELLS}
+    for row in range(ROWS):
+        for column in range(COLUMNS):
+            if JanggiBoard.check_space_in_palace(row, column):
+                cell = LOCATION_CELLS[row][column]
+                in_palace[cell] = True
+                own_palace["red" if row < 3 else "blue"][cell] = True
+    return in_palace, own_palace
+
+
+def _build_palace_diagonals() -> list:
+    """
+    Builds the diagonal steps a Chariot or Cannon can take from each cell,
+    the ones whose first step stays in the palace
+    :return: List of tuples of steps indexed by cell
+    """
+    diagonals = []
+    for cell in range(CELLS):
+        steps = ()
+        if IN_PALACE[cell]:
+            steps = tuple(step for step in DIAGONAL_STEPS if IN_PALACE[cell + step])
+        diagonals.append(steps)
+    return diagonals
+
+
+def _cell_steps(paths: list) -> tuple:
+    """
+    Converts row, column offsets to cell steps
+    :param paths: Sequence of offset sequences
+    :return: Tuple of tuples of steps
+    """
+    return tuple(tuple(row_move * WIDTH + column_move for row_move, column_move in path) for path in paths)
+
+
+IN_PALACE, OWN_PALACE = _build_palace_arrays()
+PALACE_DIAGONALS = _build_palace_diagonals()
+# Horse moves as (leg step, destination step), Elephant moves as (first, second, destination)
+HORSE_STEPS = _cell_steps(HORSE_PATHS)
+ELEPHANT_STEPS = _cell_steps(ELEPHANT_PATHS)
+# Steps from an attacked cell back to a Horse and its leg, and to an Elephant and its two middle cells
+HORSE_ATTACK_STEPS = _cell_steps([[horse, leg] for horse, leg in JanggiBoard.get_horse_attacks()])
+ELEPHANT_ATTACK_STEPS = _cell_steps([list(path) for path in JanggiBoard.get_elephant_attacks()])
+# Forward step of each color's Soldiers
+FORWARD_STEPS = {"red": WIDTH, "blue": -WIDTH}
+
+
+class MailboxJanggiBoard(JanggiBoard):
+    """
+    A JanggiBoard that also keeps the pieces in a flat list of cells with an
+    off-board border, and uses it to find valid moves and attackers
+    """
+    def __init__(self, spaces: list = None):
+        """Initializes the board and fills the cells from the spaces"""
+        super().__init__(spaces)
+        self._cells = [OFF_BOARD] * CELLS
+        for row in range(ROWS):
+            for column in range(COLUMNS):
+                self._cells[LOCATION_CELLS[row][column]] = self._spaces[row][column]
+
+    def set_space_info(self, row: int, column: int, piece: JanggiPiece):
+        """
+        Sets the piece on a specific board space and its cell
+        :param row: Row to set
+        :param column: Column to set
+        :param piece: Piece to set in space
+        :return: Nothing
+        """
+        super().set_space_info(row, column, piece)
+        self._cells[LOCATION_CELLS[row][column]] = piece
+
+    def clear_space(self, row: int, column: int):
+        """
+        Sets the specified space and its cell to be empty
+        :param row: row of space to clear
+        :param column: column of space to clear
+        :return: nothing
+        """
+        super().clear_space(row, column)
+        self._cells[LOCATION_CELLS[row][column]] = None
+
+    def get_cell(self, cell: int):
+        """
+        Returns what is in a cell
+        :param cell: Cell index
+        :return: The piece, None for an empty space, or OFF_BOARD
+        """
+        return self._cells[cell]
+
+    def find_move_cells(self, piece: JanggiPiece) -> list:
+        """
+        Finds the valid moves of a piece as cells, in the same order as the
+        piece's own find_valid_moves
+        :param piece: The piece to find moves for
+        :return: list of destination cells
+        """
+        cells = self._cells
+        row, column = piece.get_location()
+        start = LOCATION_CELLS[row][column]
+        color = piece.get_color()
+        piece_class = type(piece)
+        targets = []
+
+        if piece_class is Chariot:
+            for steps, diagonal in ((ORTHOGONAL_STEPS, False), (PALACE_DIAGONALS[start], True)):
+                for step in steps:
+                    cell = start + step
+                    target = cells[cell]
+                    while target is not OFF_BOARD and (not diagonal or IN_PALACE[cell]):
+                        if target is not None:
+                            if target.get_color() != color:
+                                targets.append(cell)
+                            break
+                        targets.append(cell)
+                        cell += step
+                        target = cells[cell]
+            return targets
+
+        if piece_class is Cannon:
+            for steps, diagonal in ((ORTHOGONAL_STEPS, False), (PALACE_DIAGONALS[start], True)):
+                for step in steps:
+                    cell = start + step
+                    target = cells[cell]
+                    jumped = False
+                    while target is not OFF_BOARD and (not diagonal or IN_PALACE[cell]):
+                        if target is not None:
+                            # A cannon cannot be jumped over or taken
+                            if type(target) is Cannon:
+                                break
+                            if jumped:
+                                if target.get_color() != color:
+                                    targets.append(cell)
+                                break
+                            jumped = True
+                        elif jumped:
+                            targets.append(cell)
+                        cell += step
+                        target = cells[cell]
+            return targets
+
+        if piece_class is Horse:
+            for leg, destination in HORSE_STEPS:
+                if cells[start + leg] is None:
+                    target = cells[start + destination]
+                    if target is None or (target is not OFF_BOARD and target.get_color() != color):
+                        targets.append(start + destination)
+            return targets
+
+        if piece_class is Elephant:
+            for first, second, destination in ELEPHANT_STEPS:
+                if cells[start + first] is None and cells[start + second] is None:
+                    target = cells[start + destination]
+                    if target is None or (target is not OFF_BOARD and target.get_color() != color):
+                        targets.append(start + destination)
+            return targets
+
+        if piece_class is Soldier:
+            forward = FORWARD_STEPS[color]
+            steps = (-1, 1, forward)
+            if IN_PALACE[start]:
+                steps += tuple(step for step in (forward - 1, forward + 1) if IN_PALACE[start + step])
+            for step in steps:
+                target = cells[start + step]
+                if target is None or (target is not OFF_BOARD and target.get_color() != color):
+                    targets.append(start + step)
+            return targets
+
+        # General and Guard move to any space next to them in their own palace
+        palace = OWN_PALACE[color]
+        for step in NEIGHBOR_STEPS:
+            if palace[start + step]:
+                target = cells[start + step]
+                if target is None or target.get_color() != color:
+                    targets.append(start + step)
+        return targets
+
+    def generate_valid_moves(self, piece: JanggiPiece) -> list:
+        """
+        Creates a list of all valid moves for a piece using the cells
+        :param piece: The piece to find moves for
+        :return: list of moves that are valid
+        """
+        return [CELL_LOCATIONS[cell] for cell in self.find_move_cells(piece)]
+
+    def check_move(self, piece: JanggiPiece, row: int, column: int) -> bool:
+        """
+        Determine whether or not the requested move is valid for a piece
+        :param piece: The piece to move
+        :param row: Row of move destination
+        :param column: Column of move destination
+        :return: True or False
+        """
+        if not self.check_location_on_board(row, column):
+            return False
+        # A cached list answers it, otherwise only the cells toward the target are walked
+        moves = self._move_cache.get(piece)
+        if moves is not None:
+            return (row, column) in moves
+
+        cells = self._cells
+        piece_row, piece_column = piece.get_location()
+        start = LOCATION_CELLS[piece_row][piece_column]
+        end = LOCATION_CELLS[row][column]
+        color = piece.get_color()
+        target = cells[end]
+        if target is not None and target.get_color() == color:
+            return False
+        piece_class = type(piece)
+        delta = end - start
+
+        if piece_class is Chariot or piece_class is Cannon:
+            row_move = row - piece_row
+            column_move = column - piece_column
+            if row_move == 0 and column_move == 0:
+                return False
+            step = (row_move > 0) - (row_move < 0)
+            step = step * WIDTH + (column_move > 0) - (column_move < 0)
+            if row_move and column_move:
+                # Diagonals only run inside the palace
+                if abs(row_move) != abs(column_move) or step not in PALACE_DIAGONALS[start] or not IN_PALACE[end]:
+                    return False
+            between = [cells[cell] for cell in range(start + step, end, step) if cells[cell] is not None]
+            if piece_class is Chariot:
+                return not between
+            # A Cannon jumps exactly one piece, and cannot jump or take a Cannon
+            return len(between) == 1 and type(between[0]) is not Cannon and type(target) is not Cannon
+
+        if piece_class is Horse:
+            for leg, destination in HORSE_STEPS:
+                if destination == delta:
+                    return cells[start + leg] is None
+            return False
+
+        if piece_class is Elephant:
+            for first, second, destination in ELEPHANT_STEPS:
+                if destination == delta:
+                    return cells[start + first] is None and cells[start + second] is None
+            return False
+
+        if piece_class is Soldier:
+            forward = FORWARD_STEPS[color]
+            if delta in (-1, 1, forward):
+                return True
+            return delta in (forward - 1, forward + 1) and IN_PALACE[start] and IN_PALACE[end]
+
+        # General and Guard move to any space next to them in their own palace
+        return delta in NEIGHBOR_STEPS and OWN_PALACE[color][end]
+
+    def find_attackers(self, row: int, column: int, side: str) -> list:
+        """
+        Finds the pieces of the other side that could move to a space, walking
+        the cells out from the space
+        :param row: Row of the space being attacked
+        :param column: Column of the space being attacked
+        :param side: The side being attacked, "red" or "blue"
+        :return: list of the attacking pieces
+        """
+        cells = self._cells
+        start = LOCATION_CELLS[row][column]
+        attackers = []
+        enemy = "blue" if side == "red" else "red"
+        target_is_cannon = type(cells[start]) is Cannon
+
+        # Chariots and Cannons along the lines, diagonals only inside the palace
+        for steps, diagonal in ((ORTHOGONAL_STEPS, False), (PALACE_DIAGONALS[start], True)):
+            for step in steps:
+                cell = start + step
+                piece = cells[cell]
+                screen_found = False
+                while piece is not OFF_BOARD and (not diagonal or IN_PALACE[cell]):
+                    if piece is not None:
+                        if screen_found:
+                            # The second piece on the line attacks if it is a Cannon
+                            if type(piece) is Cannon and piece.get_color() == enemy and not target_is_cannon:
+                                attackers.append(piece)
+                            break
+                        # A Cannon cannot be jumped over, so it ends the line
+                        if type(piece) is Cannon:
+                            break
+                        if type(piece) is Chariot and piece.get_color() == enemy:
+                            attackers.append(piece)
+                        screen_found = True
+                    cell += step
+                    piece = cells[cell]
+
+        # Horses whose leg space is empty
+        for horse, leg in HORSE_ATTACK_STEPS:
+            piece = cells[start + horse]
+            if type(piece) is Horse and piece.get_color() == enemy and cells[start + leg] is None:
+                attackers.append(piece)
+
+        # Elephants whose two spaces in between are empty
+        for elephant, first, second in ELEPHANT_ATTACK_STEPS:
+            piece = cells[start + elephant]
+            if type(piece) is Elephant and piece.get_color() == enemy and \
+                    cells[start + first] is None and cells[start + second] is None:
+                attackers.append(piece)
+
+        # Soldiers to the side, behind, or diagonally behind inside the palace
+        behind = -FORWARD_STEPS[enemy]
+        steps = (-1, 1, behind)
+        if IN_PALACE[start]:
+            steps += tuple(step for step in (behind - 1, behind + 1) if IN_PALACE[start + step])
+        for step in steps:
+            piece = cells[start + step]
+            if type(piece) is Soldier and piece.get_color() == enemy:
+                attackers.append(piece)
+
+        # The General and Guards can only attack spaces inside their own palace
+        if OWN_PALACE[enemy][start]:
+            for step in NEIGHBOR_STEPS:
+                piece = cells[start + step]
+                if (type(piece) is General or type(piece) is Guard) and piece.get_color() == enemy:
+                    attackers.append(piece)
+
+        return attackers
@@ -0,0 +1,96 @@
+import random
+import unittest
+from JanggiGame import JanggiGame, JanggiBoard
+from JanggiMailbox import MailboxJanggiBoard, OFF_BOARD, LOCATION_CELLS, CELLS, IN_PALACE, PALACE_DIAGONALS, \
+    WIDTH
+from JanggiPerft import make_position, perft, REFERENCE_COUNTS
+
+
+class MailboxJanggiBoardTest(unittest.TestCase):
+    """Mailbox backend tests"""
+
+    def setUp(self) -> None:
+        self.my_game = JanggiGame(MailboxJanggiBoard)
+
+    def test_cells_follow_moves(self):
+        """Tests that the cells are updated when pieces move and are taken"""
+        board = self.my_game.get_board()
+        self.assertEqual(32, sum(1 for cell in range(CELLS) if board.get_cell(cell) not in (None, OFF_BOARD)))
+        self.my_game.make_move("a7", "a6")
+        self.my_game.make_move("a4", "a5")
+        self.my_game.make_move("a6", "a5")
+        self.assertEqual(31, sum(1 for cell in range(CELLS) if board.get_cell(cell) not in (None, OFF_BOARD)))
+        self.assertIs(board.get_space_info(4, 0), board.get_cell(LOCATION_CELLS[4][0]))
+        self.assertIsNone(board.get_cell(LOCATION_CELLS[5][0]))
+        self.assertIs(OFF_BOARD, board.get_cell(LOCATION_CELLS[0][0] - 1))
+
+    def test_palace_arrays(self):
+        """Tests the palace lookups against check_space_in_palace"""
+        for row in range(10):
+            for column in range(9):
+                cell = LOCATION_CELLS[row][column]
+                self.assertEqual(JanggiBoard.check_space_in_palace(row, column), IN_PALACE[cell])
+        self.assertEqual(4, len(PALACE_DIAGONALS[LOCATION_CELLS[1][4]]))
+        self.assertEqual((-WIDTH - 1,), PALACE_DIAGONALS[LOCATION_CELLS[9][5]])
+        self.assertEqual(2, len(PALACE_DIAGONALS[LOCATION_CELLS[0][4]]))
+        self.assertEqual((), PALACE_DIAGONALS[LOCATION_CELLS[4][4]])
+
+    def test_matches_list_board(self):
+        """Plays random games and compares moves and attackers with the list board at every position"""
+        rng = random.Random(11)
+        for game_number in range(4):
+            game = JanggiGame(MailboxJanggiBoard)
+            list_game = JanggiGame()
+            board = game.get_board()
+            list_board = list_game.get_board()
+            for ply in range(80):
+                for color in ("red", "blue"):
+                    for piece in game.get_side(color).get_pieces(True):
+                        self.assertEqual(piece.find_valid_moves(board), board.find_valid_moves(piece),
+                                         repr(piece) + str(piece.get_location()))
+                    for row in range(10):
+                        for column in range(9):
+                            self.assertEqual([piece.get_location()
+                                              for piece in list_board.find_attackers(row, column, color)],
+                                             [piece.get_location()
+                                              for piece in board.find_attackers(row, column, color)])
+                # Without a cached list, check_move walks toward each space and must agree with the list board
+                board.clear_move_cache()
+                for piece in game.get_current_side().get_pieces(True):
+                    list_piece = list_board.get_space_info(*piece.get_location())
+                    for row in range(10):
+                        for column in range(9):
+                            self.assertEqual(list_piece.check_move(row, column, list_board),
+                                             board.check_move(piece, row, column),
+                                             repr(piece) + str(piece.get_location()) + str((row, column)))
+                moves = game.legal_moves()
+                self.assertEqual(list_game.legal_moves(), moves)
+                if not moves:
+                    break
+                move = rng.choice(moves)
+                game.push_move(move)
+                list_game.push_move(move)
+
+    def test_perft(self):
+        """Tests the mailbox board against the perft reference counts"""
+        for name in ("start", "palace"):
+            self.assertEqual(REFERENCE_COUNTS[name][:3],
+                             [perft(make_position(name, MailboxJanggiBoard), depth) for depth in (1, 2, 3)])
+
+    def test_game_play(self):
+        """Tests that a game played on the mailbox backend follows the rules"""
+        self.assertFalse(self.my_game.make_move("b8", "b7"))
+        self.assertTrue(self.my_game.make_move("e9", "e8"))
+        self.assertFalse(self.my_game.make_move("b3", "d3"))
+        self.assertTrue(self.my_game.make_move("c1", "d3"))
+        self.assertTrue(self.my_game.make_move("b8", "g8"))
+        self.assertTrue(self.my_game.make_move("b3", "g3"))
+        self.assertTrue(self.my_game.make_move("g8", "g4"))
+        self.assertFalse(self.my_game.make_move("g3", "g7"))
+        self.assertFalse(self.my_game.get_board().check_move(
+            self.my_game.get_board().get_space_info(0, 0), 10, 0))
+
+
+if __name__ == "__main__":
+    """Runs the unit test"""
+    unittest.main()
@@ -0,0 +1,291 @@
+# Author: John Cheshire
+# Date: March 9, 2021
+# Description: This file contains a search that runs JanggiEngine in several
+#               worker processes so it is not held to one core. The workers
+#               share one transposition table kept in shared memory. In
+#               "lazy_smp" mode every worker searches the whole position, every
+#               other worker starting one depth deeper, and they help each
+#               other through the table. In "root_split" mode
+#               the root moves are divided between the workers.
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from JanggiGame import JanggiGame
+from JanggiEngine import JanggiEngine
+from JanggiTransposition import TranspositionTable
+
+MODES = ("lazy_smp", "root_split")
+# Seconds each worker is held while the pool starts, so no worker takes two warm up tasks
+WARM_UP_SECONDS = 0.05
+
+# Shared memory blocks already opened by this worker process, by name
+_attached_tables = {}
+
+
+def _get_shared_table(name: str, size_mb: float) -> TranspositionTable:
+    """
+    Opens the shared transposition table in a worker process, once per process
+    :param name: Name of the SharedMemory block
+    :param size_mb: Memory budget the table was made with
+    :return: TranspositionTable using the shared block
+    """
+    if name not in _attached_tables:
+        shared_memory = SharedMemory(name=name)
+        _attached_tables[name] = (shared_memory, TranspositionTable(size_mb, shared_memory))
+    return _attached_tables[name][1]
+
+
+def _warm_up_worker(table_name: str, size_mb: float):
+    """
+    Opens the shared transposition table in a worker process and holds the
+    process long enough that every worker is given one of these tasks
+    :param table_name: Name of the shared transposition table block
+    :param size_mb: Memory budget of the table
+    :return: Nothing
+    """
+    _get_shared_table(table_name, size_mb)
+    time.sleep(WARM_UP_SECONDS)
+
+
+def _search_worker(position: str, board_class: type, table_name: str, size_mb: float, root_moves: list,
+                   start_depth: int, deadline: float, node_limit: int, max_depth: int) -> (list, int):
+    """
+    Runs one engine search in a worker process
+    :param position: The position string from JanggiGame.to_position
+    :param board_class: Board class for the game to use
+    :param table_name: Name of the shared transposition table block
+    :param size_mb: Memory budget of the table
+    :param root_moves: Root moves to search, in order
+    :param start_depth: Depth of the first iteration
+    :param deadline: time.time() to stop at, or None
+    :param node_limit: Nodes allowed, or None
+    :param max_depth: Deepest search to try
+    :return: Tuple of the finished iterations and the node count
+    """
+    game = JanggiGame.from_position(position, board_class)
+    time_limit = None
+    if deadline is not None:
+        time_limit = max(0.0, deadline - time.time())
+    engine = JanggiEngine(game, time_limit, node_limit, max_depth, _get_shared_table(table_name, size_mb))
+    engine.search(root_moves, start_depth)
+    return engine.get_iterations(), engine.get_nodes()
+
+
+class ParallelJanggiEngine:
+    """
+    Searches a JanggiGame position with JanggiEngine in several processes that
+    share a transposition table. Call close when done with it to stop the
+    worker processes and free the shared memory.
+    """
+    def __init__(self, game: JanggiGame, workers: int = None, mode: str = "lazy_smp",
+                 time_limit: float = None, node_limit: int = None, max_depth: int = 64,
+                 size_mb: float = 64):
+        """
+        Initializes the engine and allocates the shared transposition table
+        :param game: The JanggiGame to search. It is not changed.
+        :param workers: Number of worker processes, the CPU count if None
+        :param mode: "lazy_smp" or "root_split"
+        :param time_limit: Seconds allowed for a search, or None for no limit
+        :param node_limit: Positions allowed for each worker, or None for no limit
+        :param max_depth: Deepest search to try
+        :param size_mb: Memory budget of the shared transposition table
+        """
+        if mode not in MODES:
+            raise ValueError("mode must be one of " + ", ".join(MODES))
+        self._game = game
+        self._workers = workers if workers is not None else os.cpu_count() or 1
+        self._mode = mode
+        self._time_limit = time_limit
+        self._node_limit = node_limit
+        self._max_depth = max_depth
+        self._size_mb = size_mb
+        self._shared_memory = SharedMemory(create=True, size=TranspositionTable.shared_size(size_mb))
+        self._table = TranspositionTable(size_mb, self._shared_memory)
+        self._executor = None
+        self._nodes = 0
+        self._depth = 0
+        self._score = 0
+
+    def __enter__(self):
+        """Allows the engine to be used in a with statement"""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Closes the engine at the end of a with statement"""
+        self.close()
+
+    def close(self):
+        """
+        Stops the worker processes and frees the shared transposition table
+        :return: Nothing
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._shared_memory is not None:
+            self._table.close()
+            self._shared_memory.close()
+            self._shared_memory.unlink()
+            self._shared_memory = None
+
+    def start(self):
+        """
+        Starts the worker processes and opens the shared table in each, so
+        the first search does not pay for it. search calls it if needed.
+        :return: Nothing
+        """
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(self._workers)
+        futures = [self._executor.submit(_warm_up_worker, self._shared_memory.name, self._size_mb)
+                   for worker in range(self._workers)]
+        for future in futures:
+            future.result()
+
+    def get_transposition_table(self) -> TranspositionTable:
+        """
+        Returns the main process's view of the shared transposition table
+        :return: TranspositionTable object
+        """
+        return self._table
+
+    def get_nodes(self) -> int:
+        """
+        Returns the number of positions visited by all workers in the last search
+        :return: Node count
+        """
+        return self._nodes
+
+    def get_depth(self) -> int:
+        """
+        Returns the depth the reported move was searched to
+        :return: Depth in moves
+        """
+        return self._depth
+
+    def get_score(self) -> int:
+        """
+        Returns the score of the best move from the side to move's point of view
+        :return: Score in hundredths of a soldier
+        """
+        return self._score
+
+    def search(self) -> (int, list):
+        """
+        Searches the current position of the game on every worker
+        :return: Tuple of the best move and the principal variation. The best
+                 move is None if the side to move has no legal moves.
+        """
+        self._nodes = 0
+        self._depth = 0
+        self._score = 0
+        root_moves = self._game.legal_moves()
+        if not root_moves:
+            return None, []
+        self.start()
+
+        deadline = None
+        if self._time_limit is not None:
+            deadline = time.time() + self._time_limit
+
+        if self._mode == "lazy_smp":
+            # Every worker searches every move, starting from a different one,
+            # and every other worker starts one depth deeper, so they fill the
+            # shared table with different parts of the tree
+            move_lists = [root_moves[index % len(root_moves):] + root_moves[:index % len(root_moves)]
+                          for index in range(self._workers)]
+            start_depths = [1 + index % 2 for index in range(self._workers)]
+        else:
+            move_lists = [root_moves[index::self._workers] for index in range(self._workers)]
+            move_lists = [moves for moves in move_lists if moves]
+            start_depths = [1] * len(move_lists)
+
+        position = self._game.to_position()
+        board_class = type(self._game.get_board())
+        futures = [self._executor.submit(_search_worker, position, board_class, self._shared_memory.name,
+                                         self._size_mb, moves, start_depth, deadline, self._node_limit,
+                                         self._max_depth)
+                   for moves, start_depth in zip(move_lists, start_depths)]
+        results = [future.result() for future in futures]
+        self._nodes = sum(nodes for iterations, nodes in results)
+
+        if self._mode == "lazy_smp":
+            best = self._pick_deepest([iterations for iterations, nodes in results])
+        else:
+            best = self._pick_best_split([iterations for iterations, nodes in results])
+        if best is None:
+            return root_moves[0], [root_moves[0]]
+        self._depth, self._score, pv = best
+        return pv[0], list(pv)
+
+    @staticmethod
+    def _pick_deepest(worker_iterations: list) -> (int, int, list):
+        """
+        Picks the deepest finished iteration of any worker, preferring the
+        first worker when several reached the same depth
+        :param worker_iterations: list of each worker's iteration results
+        :return: Tuple of depth, score and principal variation, or None
+        """
+        best = None
+        for iterations in worker_iterations:
+            if iterations and (best is None or iterations[-1][0] > best[0]):
+                best = iterations[-1]
+        return best
+
+    @staticmethod
+    def _pick_best_split(worker_iterations: list) -> (int, int, list):
+        """
+        Picks the best move over all workers at the deepest depth every worker
+        finished, so the scores being compared come from the same depth
+        :param worker_iterations: list of each worker's iteration results
+        :return: Tuple of depth, score and principal variation, or None
+        """
+        if not all(worker_iterations):
+            return None
+        depth = min(iterations[-1][0] for iterations in worker_iterations)
+        candidates = [iterations[depth - 1] for iterations in worker_iterations]
+        return max(candidates, key=lambda result: result[1])
+
+
+def benchmark(move_lists: list, depth: int, worker_counts: list, mode: str = "lazy_smp") -> dict:
+    """
+    Times searches to a fixed depth on a set of positions with different
+    numbers of workers. The worker processes are started before the clock
+    starts, so only the searches are timed.
+    :param move_lists: Each position as a list of (from space, to space) moves
+                       played from the starting position
+    :param depth: Depth to search each position to
+    :param worker_counts: Numbers of workers to time
+    :param mode: "lazy_smp" or "root_split"
+    :return: Dictionary of worker count to total seconds
+    """
+    games = []
+    for moves in move_lists:
+        game = JanggiGame()
+        for from_space, to_space in moves:
+            game.make_move(from_space, to_space)
+        games.append(game)
+
+    timings = {}
+    for workers in worker_counts:
+        total = 0.0
+        for game in games:
+            with ParallelJanggiEngine(game, workers, mode, max_depth=depth) as engine:
+                engine.start()
+                start = time.perf_counter()
+                engine.search()
+                total += time.perf_counter() - start
+        timings[workers] = total
+    return timings
+
+
+if __name__ == "__main__":
+    """Prints time to depth for one worker up to the CPU count"""
+    positions = [[],
+                 [("c7", "c6"), ("c4", "c5"), ("b10", "d7"), ("h1", "g3")],
+                 [("i10", "i9"), ("a1", "a1"), ("i9", "f9"), ("a1", "a1"), ("f9", "f5")]]
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    for search_mode in MODES:
+        for worker_count, seconds in benchmark(positions, 4, counts, search_mode).items():
+            print(search_mode, worker_count, "workers", round(seconds, 2), "seconds")
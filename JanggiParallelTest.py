@@ -0,0 +1,68 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from JanggiGame import JanggiGame, encode_move
+from JanggiEngine import JanggiEngine
+from JanggiParallel import ParallelJanggiEngine, _get_shared_table
+from JanggiTransposition import TranspositionTable, BOUND_EXACT
+
+
+def store_entry(name: str, size_mb: float, key: int):
+    """Stores one entry in a shared table from another process"""
+    _get_shared_table(name, size_mb).store(key, 5, BOUND_EXACT, 42, encode_move(0, 9))
+
+
+class JanggiParallelTest(unittest.TestCase):
+    """Parallel Janggi engine tests"""
+
+    def setUp(self) -> None:
+        self.my_game = JanggiGame()
+        for from_space, to_space in [("c7", "c6"), ("c4", "c5"), ("b10", "d7"), ("h1", "g3")]:
+            self.assertTrue(self.my_game.make_move(from_space, to_space))
+
+    def test_root_split_matches_single_search(self):
+        """Tests that splitting the root moves finds the same score as one process"""
+        engine = JanggiEngine(self.my_game, max_depth=2)
+        engine.search()
+        with ParallelJanggiEngine(self.my_game, 2, "root_split", max_depth=2, size_mb=1) as parallel:
+            move, pv = parallel.search()
+            self.assertEqual(parallel.get_depth(), 2)
+            self.assertEqual(parallel.get_score(), engine.get_score())
+            self.assertIn(move, self.my_game.legal_moves())
+            self.assertGreater(parallel.get_nodes(), 0)
+
+    def test_lazy_smp(self):
+        """Tests that lazy SMP returns a legal move and fills the shared table"""
+        with ParallelJanggiEngine(self.my_game, 2, "lazy_smp", max_depth=2, size_mb=1) as parallel:
+            # Starting the workers first leaves the search the same
+            parallel.start()
+            move, pv = parallel.search()
+            self.assertIn(move, self.my_game.legal_moves())
+            self.assertEqual(parallel.get_depth(), 2)
+            # The workers stored the positions after the root moves
+            self.my_game.push_move(move)
+            self.assertIsNotNone(parallel.get_transposition_table().probe(self.my_game.position_key()))
+            self.my_game.pop_move()
+        # The game itself is not changed by the search
+        self.assertEqual(self.my_game.get_board().get_move_count(), 4)
+
+    def test_shared_table(self):
+        """Tests that an entry stored by another process can be read"""
+        shared_memory = SharedMemory(create=True, size=TranspositionTable.shared_size(1))
+        table = TranspositionTable(1, shared_memory)
+        try:
+            with ProcessPoolExecutor(1) as executor:
+                executor.submit(store_entry, shared_memory.name, 1, 12345).result()
+            self.assertEqual(table.probe(12345), (5, BOUND_EXACT, 42, encode_move(0, 9)))
+        finally:
+            table.close()
+            shared_memory.close()
+            shared_memory.unlink()
+
+    def test_bad_mode(self):
+        """Tests that an unknown mode is rejected"""
+        self.assertRaises(ValueError, ParallelJanggiEngine, self.my_game, 2, "tree_split")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,375 @@
+# Author: John Cheshire
+# Date: March 9, 2021
+# Description: This file contains a perft tool for JanggiGame. Perft counts the
+#               positions reached by playing every legal move to a fixed depth,
+#               which checks the move generator against known counts and
+#               measures how fast it is. Passing is not counted as a move.
+#               Deep counts can be split between worker processes and can
+#               share a hash table of subtree counts between them.
+#               Run it as a script to count one position, for example
+#               python JanggiPerft.py start 3 --divide --workers 4
+import argparse
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from JanggiGame import JanggiGame, JanggiBoard, MOVE_MASK, move_to_spaces
+from JanggiBackends import BOARD_CLASSES
+
+# Curated positions, each as the moves played from the starting position
+POSITIONS = {
+    "start": [],
+    "opening": [("c7", "c6"), ("c4", "c5"), ("b10", "d7"), ("h1", "g3"),
+                ("h10", "g8"), ("c1", "d3")],
+    "chariots": [("i10", "i9"), ("a1", "a2"), ("i9", "f9"), ("a2", "d2"),
+                 ("f9", "f5"), ("i1", "i2"), ("a10", "a9"), ("i2", "f2")],
+    "palace": [("i10", "i9"), ("a1", "a1"), ("i9", "f9"), ("a1", "a1"), ("f9", "f4"),
+               ("a1", "a1"), ("f4", "g4"), ("a1", "a1"), ("g4", "g2"), ("f1", "f2"),
+               ("a1", "a1"), ("e2", "e1"), ("e7", "e6"), ("a1", "a1"), ("e6", "e5")],
+}
+
+# Leaf counts for each position at depth 1, 2, 3 and so on
+REFERENCE_COUNTS = {
+    "start": [31, 961, 31002, 999646],
+    "opening": [38, 1555, 59711, 2391503],
+    "chariots": [45, 1894, 77362, 3148599],
+    "palace": [28, 1074, 29774, 1185592],
+}
+
+# Nodes per second of benchmark(3) on the list board when the baseline was recorded
+BASELINE_NODES_PER_SECOND = 130000
+# Fraction of the baseline the benchmark may fall short by before failing
+BASELINE_TOLERANCE = 0.25
+
+# Each hash table slot is a 64 bit key and 64 bit data word
+_HASH_SLOT_BYTES = 16
+# Data word layout: count above the low 8 bits, depth in the low 8 bits
+_HASH_DEPTH_BITS = 8
+
+
+class PerftHashTable:
+    """
+    A fixed size table of subtree counts keyed by position hash and depth, so
+    a position reached by different move orders is only counted once. Every
+    slot is replaced by the newest count. Like TranspositionTable, each slot
+    stores the key xor the data word so an entry torn by two processes
+    writing at once does not match any key.
+    """
+    def __init__(self, size_mb: float = 16, shared_memory: SharedMemory = None):
+        """
+        Allocates the table
+        :param size_mb: Memory budget in megabytes. The slot count is rounded
+                        down to a power of two.
+        :param shared_memory: SharedMemory block of at least
+                              shared_size(size_mb) bytes to keep the table in,
+                              or None to use private memory
+        """
+        slots = self.slot_count(size_mb)
+        self._mask = slots - 1
+        if shared_memory is None:
+            self._buffer = None
+            self._keys = array("Q", [0]) * slots
+            self._data = array("Q", [0]) * slots
+        else:
+            self._buffer = shared_memory.buf[:slots * _HASH_SLOT_BYTES].cast("Q")
+            self._keys = self._buffer[:slots]
+            self._data = self._buffer[slots:]
+        self._hits = 0
+
+    @staticmethod
+    def slot_count(size_mb: float) -> int:
+        """
+        Returns the number of slots a table of the given budget has
+        :param size_mb: Memory budget in megabytes
+        :return: Slot count, a power of two
+        """
+        slots = max(1, int(size_mb * 1024 * 1024) // _HASH_SLOT_BYTES)
+        return 1 << (slots.bit_length() - 1)
+
+    @classmethod
+    def shared_size(cls, size_mb: float) -> int:
+        """
+        Returns the number of bytes of shared memory a table needs
+        :param size_mb: Memory budget in megabytes
+        :return: Size in bytes
+        """
+        return cls.slot_count(size_mb) * _HASH_SLOT_BYTES
+
+    def close(self):
+        """
+        Releases the view of the shared memory block so it can be closed. The
+        table cannot be used afterwards.
+        :return: Nothing
+        """
+        if self._buffer is not None:
+            self._keys.release()
+            self._data.release()
+            self._buffer.release()
+            self._buffer = None
+
+    def probe(self, key: int, depth: int) -> int:
+        """
+        Looks up the count of a position
+        :param key: 64 bit position hash
+        :param depth: Depth the count is for
+        :return: The count, or None if it is not in the table
+        """
+        slot = key & self._mask
+        data = self._data[slot]
+        if data and self._keys[slot] ^ data == key and data & ((1 << _HASH_DEPTH_BITS) - 1) == depth:
+            self._hits += 1
+            return data >> _HASH_DEPTH_BITS
+        return None
+
+    def store(self, key: int, depth: int, count: int):
+        """
+        Saves the count of a position
+        :param key: 64 bit position hash
+        :param depth: Depth the count is for
+        :param count: Number of positions at the depth
+        :return: Nothing
+        """
+        slot = key & self._mask
+        data = count << _HASH_DEPTH_BITS | depth
+        self._keys[slot] = key ^ data
+        self._data[slot] = data
+
+    def get_hits(self) -> int:
+        """
+        Returns the number of counts found in the table by this process
+        :return: Hit count
+        """
+        return self._hits
+
+
+def make_position(name: str, board_class: type = JanggiBoard) -> JanggiGame:
+    """
+    Sets up one of the curated positions
+    :param name: Key of the position in POSITIONS
+    :param board_class: Board class for the game to use
+    :return: JanggiGame at the position
+    """
+    game = JanggiGame(board_class)
+    for from_space, to_space in POSITIONS[name]:
+        if not game.make_move(from_space, to_space):
+            raise ValueError("Illegal move " + from_space + to_space + " in position " + name)
+    return game
+
+
+def perft(game: JanggiGame, depth: int, table: PerftHashTable = None) -> int:
+    """
+    Counts the positions reached by every sequence of legal moves of a length
+    :param game: The JanggiGame to count from. It is left as it was.
+    :param depth: Number of moves in each sequence
+    :param table: Table of counts to look positions up in and add them to, or None
+    :return: Number of positions at the depth
+    """
+    if depth == 0:
+        return 1
+    if table is not None and depth > 1:
+        key = game.position_key()
+        nodes = table.probe(key, depth)
+        if nodes is not None:
+            return nodes
+    moves = game.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        game.push_move(move)
+        nodes += perft(game, depth - 1, table)
+        game.pop_move()
+    if table is not None:
+        table.store(key, depth, nodes)
+    return nodes
+
+
+def divide(game: JanggiGame, depth: int) -> dict:
+    """
+    Counts the positions under each root move separately, to find which move
+    a wrong count comes from
+    :param game: The JanggiGame to count from. It is left as it was.
+    :param depth: Number of moves in each sequence, including the root move
+    :return: Dictionary of root move to number of positions
+    """
+    counts = {}
+    for move in game.legal_moves():
+        game.push_move(move)
+        counts[move] = perft(game, depth - 1)
+        game.pop_move()
+    return counts
+
+
+# Shared hash tables already opened by this worker process, by name
+_attached_tables = {}
+
+
+def _perft_worker(position: str, depth: int, board_class: type, table_name: str, size_mb: float) -> int:
+    """
+    Counts one subtree in a worker process
+    :param position: The subtree's position string, from JanggiGame.to_position
+    :param depth: Number of moves left to count
+    :param board_class: Board class to use
+    :param table_name: Name of the shared PerftHashTable block, or None
+    :param size_mb: Memory budget of the shared table
+    :return: Number of positions at the depth
+    """
+    table = None
+    if table_name is not None:
+        if table_name not in _attached_tables:
+            shared_memory = SharedMemory(name=table_name)
+            _attached_tables[table_name] = (shared_memory, PerftHashTable(size_mb, shared_memory))
+        table = _attached_tables[table_name][1]
+    return perft(JanggiGame.from_position(position, board_class), depth, table)
+
+
+def parallel_divide(game: JanggiGame, depth: int, workers: int = None, split_depth: int = 1,
+                    hash_mb: float = None) -> dict:
+    """
+    Counts the positions under each root move, splitting the work between
+    worker processes. Every sequence of split_depth moves becomes one task.
+    :param game: The JanggiGame to count from. It is left as it was.
+    :param depth: Number of moves in each sequence, including the root move
+    :param workers: Number of worker processes, the CPU count if None
+    :param split_depth: 1 to send each root move's subtree as a task, 2 to
+                        send each subtree two moves down
+    :param hash_mb: Size of a hash table shared by the workers, or None for none
+    :return: Dictionary of root move to number of positions
+    """
+    if depth <= split_depth:
+        return divide(game, depth)
+
+    # Write the position after every sequence of split_depth moves
+    tasks = []
+    root_moves = game.legal_moves()
+    for root_move in root_moves:
+        game.push_move(root_move)
+        if split_depth == 1:
+            tasks.append((root_move, game.to_position()))
+        else:
+            for move in game.legal_moves():
+                game.push_move(move)
+                tasks.append((root_move, game.to_position()))
+                game.pop_move()
+        game.pop_move()
+
+    board_class = type(game.get_board())
+    shared_memory = None
+    table_name = None
+    if hash_mb is not None:
+        shared_memory = SharedMemory(create=True, size=PerftHashTable.shared_size(hash_mb))
+        table_name = shared_memory.name
+    counts = {move: 0 for move in root_moves}
+    try:
+        worker_count = workers if workers is not None else os.cpu_count() or 1
+        with ProcessPoolExecutor(worker_count) as executor:
+            futures = [executor.submit(_perft_worker, position, depth - split_depth, board_class,
+                                       table_name, hash_mb)
+                       for root_move, position in tasks]
+            for (root_move, position), future in zip(tasks, futures):
+                counts[root_move] += future.result()
+    finally:
+        if shared_memory is not None:
+            shared_memory.close()
+            shared_memory.unlink()
+    return counts
+
+
+def parallel_perft(game: JanggiGame, depth: int, workers: int = None, split_depth: int = 1,
+                   hash_mb: float = None) -> int:
+    """
+    Counts the positions at a depth, splitting the work between worker processes
+    :param game: The JanggiGame to count from. It is left as it was.
+    :param depth: Number of moves in each sequence
+    :param workers: Number of worker processes, the CPU count if None
+    :param split_depth: 1 to split by root move, 2 to split by subtree two moves down
+    :param hash_mb: Size of a hash table shared by the workers, or None for none
+    :return: Number of positions at the depth
+    """
+    if depth == 0:
+        return 1
+    return sum(parallel_divide(game, depth, workers, split_depth, hash_mb).values())
+
+
+def timed_perft(game: JanggiGame, depth: int) -> (int, float):
+    """
+    Runs perft and times it
+    :param game: The JanggiGame to count from
+    :param depth: Number of moves in each sequence
+    :return: Tuple of the node count and the seconds taken
+    """
+    start = time.perf_counter()
+    nodes = perft(game, depth)
+    return nodes, time.perf_counter() - start
+
+
+def check_reference(board_class: type = JanggiBoard, max_depth: int = None) -> list:
+    """
+    Compares perft counts with the reference table
+    :param board_class: Board class to check
+    :param max_depth: Deepest reference count to check, or None for all of them
+    :return: list of (position name, depth, expected, found) for every count
+             that does not match, empty if all of them match
+    """
+    mismatches = []
+    for name, counts in REFERENCE_COUNTS.items():
+        game = make_position(name, board_class)
+        for depth, expected in enumerate(counts, 1):
+            if max_depth is not None and depth > max_depth:
+                break
+            found = perft(game, depth)
+            if found != expected:
+                mismatches.append((name, depth, expected, found))
+    return mismatches
+
+
+def benchmark(depth: int = 3, board_class: type = JanggiBoard) -> float:
+    """
+    Measures perft speed over every curated position
+    :param depth: Depth to count each position to
+    :param board_class: Board class to measure
+    :return: Nodes per second
+    """
+    total_nodes = 0
+    total_seconds = 0.0
+    for name in POSITIONS:
+        nodes, seconds = timed_perft(make_position(name, board_class), depth)
+        total_nodes += nodes
+        total_seconds += seconds
+    return total_nodes / total_seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Counts Janggi positions to a depth")
+    parser.add_argument("position", choices=sorted(POSITIONS))
+    parser.add_argument("depth", type=int)
+    parser.add_argument("--divide", action="store_true", help="show the count under each root move")
+    parser.add_argument("--board", choices=sorted(BOARD_CLASSES), default="list")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes, 0 to count in this process")
+    parser.add_argument("--split", type=int, choices=(1, 2), default=1, help="moves deep to split work at")
+    parser.add_argument("--hash", type=float, default=None, help="megabytes of shared hash table")
+    arguments = parser.parse_args()
+    if arguments.depth < 1:
+        parser.error("depth must be at least 1")
+
+    perft_game = make_position(arguments.position, BOARD_CLASSES[arguments.board])
+    perft_start = time.perf_counter()
+    if arguments.workers:
+        root_counts = parallel_divide(perft_game, arguments.depth, arguments.workers, arguments.split,
+                                      arguments.hash)
+    else:
+        hash_table = PerftHashTable(arguments.hash) if arguments.hash is not None else None
+        root_counts = {}
+        for root_move in perft_game.legal_moves():
+            perft_game.push_move(root_move)
+            root_counts[root_move] = perft(perft_game, arguments.depth - 1, hash_table)
+            perft_game.pop_move()
+    perft_seconds = time.perf_counter() - perft_start
+    perft_nodes = sum(root_counts.values())
+    if arguments.divide:
+        for root_move, count in sorted(root_counts.items(), key=lambda item: item[0] & MOVE_MASK):
+            print("".join(move_to_spaces(root_move)), count)
+    print("Nodes:", perft_nodes)
+    print("Seconds:", round(perft_seconds, 3))
+    print("Nodes per second:", round(perft_nodes / perft_seconds))
@@ -0,0 +1,73 @@
+import os
+import unittest
+from JanggiGame import JanggiGame, JanggiBoard
+from JanggiBitboard import BitboardJanggiBoard
+from JanggiPerft import perft, divide, make_position, check_reference, benchmark, REFERENCE_COUNTS, \
+    BASELINE_NODES_PER_SECOND, BASELINE_TOLERANCE, parallel_perft, \
+    parallel_divide, PerftHashTable
+
+
+class JanggiPerftTest(unittest.TestCase):
+    """Janggi perft tests"""
+
+    def test_reference_counts(self):
+        """Tests both boards against the reference counts to depth 3"""
+        self.assertEqual([], check_reference(JanggiBoard, 3))
+        self.assertEqual([], check_reference(BitboardJanggiBoard, 3))
+
+    def test_divide(self):
+        """Tests that the counts under each root move add up to the total"""
+        game = make_position("palace")
+        key = game.position_key()
+        counts = divide(game, 2)
+        self.assertEqual(len(game.legal_moves()), len(counts))
+        self.assertEqual(REFERENCE_COUNTS["palace"][1], sum(counts.values()))
+        self.assertEqual(perft(game, 0), 1)
+        self.assertEqual(key, game.position_key())
+
+    def test_position_strings(self):
+        """Tests that a written position sets up the same position on each board"""
+        for name in ("start", "palace"):
+            game = make_position(name)
+            position = game.to_position()
+            for board_class in (JanggiBoard, BitboardJanggiBoard):
+                copy = JanggiGame.from_position(position, board_class)
+                self.assertEqual(game.position_key(), copy.position_key())
+                self.assertEqual(copy.position_key(), copy.compute_position_key())
+                self.assertCountEqual(game.legal_moves(), copy.legal_moves())
+                self.assertEqual(REFERENCE_COUNTS[name][1], perft(copy, 2))
+                self.assertEqual(position, copy.to_position())
+
+    def test_hash_table(self):
+        """Tests storing and looking up subtree counts"""
+        table = PerftHashTable(1)
+        table.store(12345, 3, 1 << 40)
+        self.assertEqual(1 << 40, table.probe(12345, 3))
+        self.assertIsNone(table.probe(12345, 2))
+        self.assertIsNone(table.probe(54321, 3))
+        game = make_position("opening")
+        self.assertEqual(REFERENCE_COUNTS["opening"][2], perft(game, 3, table))
+        self.assertEqual(REFERENCE_COUNTS["opening"][2], perft(game, 3, table))
+        self.assertGreater(table.get_hits(), 0)
+
+    def test_parallel_perft(self):
+        """Tests that splitting perft between processes gives the same counts"""
+        game = make_position("palace")
+        key = game.position_key()
+        self.assertEqual(divide(game, 3), parallel_divide(game, 3, workers=2))
+        self.assertEqual(REFERENCE_COUNTS["palace"][2], parallel_perft(game, 3, 2, split_depth=2))
+        self.assertEqual(REFERENCE_COUNTS["palace"][2], parallel_perft(game, 3, 2, split_depth=2, hash_mb=1))
+        self.assertEqual(REFERENCE_COUNTS["palace"][0], parallel_perft(game, 1, 2))
+        self.assertEqual(key, game.position_key())
+
+    @unittest.skipUnless(os.environ.get("JANGGI_BENCHMARK"), "set JANGGI_BENCHMARK=1 to run benchmarks")
+    def test_benchmark(self):
+        """Tests the full reference table and that perft speed has not dropped below the baseline"""
+        self.assertEqual([], check_reference(JanggiBoard))
+        nodes_per_second = benchmark(3)
+        print("Perft nodes per second:", round(nodes_per_second))
+        self.assertGreaterEqual(nodes_per_second, BASELINE_NODES_PER_SECOND * (1 - BASELINE_TOLERANCE))
+
+
+if __name__ == '__main__':
+    unittest.main()
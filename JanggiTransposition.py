@@ -0,0 +1,208 @@
+# Author: John Cheshire
+# Date: March 9, 2021
+# Description: This file contains a fixed size transposition table for search
+#               code. Entries are packed into preallocated arrays of 64 bit
+#               integers so memory use is set by a budget in megabytes, and
+#               every bucket has a depth-preferred slot and an always-replace
+#               slot. The table can live in shared memory so that several
+#               search processes use the same entries.
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+
+# Bound types stored with a score. 0 marks an empty slot.
+BOUND_EXACT = 1
+BOUND_LOWER = 2
+BOUND_UPPER = 3
+
+# Each slot is a 64 bit key and 64 bit data word, and a bucket holds two slots
+SLOT_BYTES = 16
+BUCKET_SLOTS = 2
+
+# Data word layout, from the low bits up:
+# move + 1 (15 bits, 0 for no move), depth (8 bits), bound (2 bits), score + 2 ** 31 (32 bits)
+_MOVE_BITS = 15
+_DEPTH_SHIFT = 15
+_BOUND_SHIFT = 23
+_SCORE_SHIFT = 25
+_SCORE_OFFSET = 1 << 31
+
+
+def pack_move(move: int) -> int:
+    """
+    Packs a move, as encoded by JanggiGame.encode_move, shifted up by one so
+    that 0 stays reserved to mean no move
+    :param move: The move, or None
+    :return: The move plus one, 0 for no move
+    """
+    if move is None:
+        return 0
+    return move + 1
+
+
+def unpack_move(code: int) -> int:
+    """
+    Unpacks a move packed by pack_move
+    :param code: Packed move plus one
+    :return: The move, or None
+    """
+    if code == 0:
+        return None
+    return code - 1
+
+
+class TranspositionTable:
+    """
+    A fixed size hash table of search results keyed by position hash. Each
+    bucket has two slots: the first keeps the deepest result seen for the
+    bucket, the second always takes the newest result.
+    Each slot stores the key xor the data word next to the data word, so an
+    entry torn by two processes writing at once does not match any key and is
+    treated as empty instead of returning another position's result.
+    """
+    def __init__(self, size_mb: float = 16, shared_memory: SharedMemory = None):
+        """
+        Allocates the table
+        :param size_mb: Memory budget in megabytes. The bucket count is rounded
+                        down to a power of two so a key is placed with a mask.
+        :param shared_memory: SharedMemory block of at least
+                              shared_size(size_mb) bytes to keep the table in,
+                              or None to use private memory
+        """
+        slots = self.slot_count(size_mb)
+        self._mask = slots // BUCKET_SLOTS - 1
+        self._shared_memory = shared_memory
+        if shared_memory is None:
+            self._buffer = None
+            self._keys = array("Q", [0]) * slots
+            self._data = array("Q", [0]) * slots
+        else:
+            self._buffer = shared_memory.buf[:slots * SLOT_BYTES].cast("Q")
+            self._keys = self._buffer[:slots]
+            self._data = self._buffer[slots:]
+        self._probes = 0
+        self._hits = 0
+        self._collisions = 0
+        self._stores = 0
+
+    @staticmethod
+    def slot_count(size_mb: float) -> int:
+        """
+        Returns the number of slots a table of the given budget has
+        :param size_mb: Memory budget in megabytes
+        :return: Slot count, a power of two of at least two
+        """
+        buckets = max(1, int(size_mb * 1024 * 1024) // (SLOT_BYTES * BUCKET_SLOTS))
+        return (1 << (buckets.bit_length() - 1)) * BUCKET_SLOTS
+
+    @classmethod
+    def shared_size(cls, size_mb: float) -> int:
+        """
+        Returns the number of bytes of shared memory a table needs
+        :param size_mb: Memory budget in megabytes
+        :return: Size in bytes
+        """
+        return cls.slot_count(size_mb) * SLOT_BYTES
+
+    def close(self):
+        """
+        Releases the view of the shared memory block so it can be closed. The
+        table cannot be used afterwards.
+        :return: Nothing
+        """
+        if self._buffer is not None:
+            self._keys.release()
+            self._data.release()
+            self._buffer.release()
+            self._buffer = None
+
+    def probe(self, key: int) -> (int, int, int, int):
+        """
+        Looks up a position
+        :param key: 64 bit position hash
+        :return: Tuple of depth, bound, score and best move, or None if the
+                 position is not in the table
+        """
+        self._probes += 1
+        index = (key & self._mask) * BUCKET_SLOTS
+        keys = self._keys
+        for slot in (index, index + 1):
+            data = self._data[slot]
+            if data and keys[slot] ^ data == key:
+                self._hits += 1
+                return ((data >> _DEPTH_SHIFT) & 0xFF, (data >> _BOUND_SHIFT) & 0x3,
+                        (data >> _SCORE_SHIFT) - _SCORE_OFFSET,
+                        unpack_move(data & ((1 << _MOVE_BITS) - 1)))
+        if self._data[index] or self._data[index + 1]:
+            self._collisions += 1
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, move: int):
+        """
+        Saves a search result. It goes in the depth-preferred slot if that slot
+        holds the same position or a shallower result, and the entry it
+        replaces moves to the always-replace slot. Otherwise it goes in the
+        always-replace slot.
+        :param key: 64 bit position hash
+        :param depth: Depth the position was searched to
+        :param bound: BOUND_EXACT, BOUND_LOWER or BOUND_UPPER
+        :param score: Score of the position
+        :param move: Best move found, or None
+        :return: Nothing
+        """
+        self._stores += 1
+        index = (key & self._mask) * BUCKET_SLOTS
+        keys = self._keys
+        data = self._data
+        move_code = pack_move(move)
+        first_matches = keys[index] ^ data[index] == key
+        second_matches = keys[index + 1] ^ data[index + 1] == key
+
+        # Keep the old best move when the new result does not have one
+        if not move_code:
+            if first_matches and data[index]:
+                move_code = data[index] & ((1 << _MOVE_BITS) - 1)
+            elif second_matches and data[index + 1]:
+                move_code = data[index + 1] & ((1 << _MOVE_BITS) - 1)
+        new_data = move_code | (min(depth, 0xFF) << _DEPTH_SHIFT) | (bound << _BOUND_SHIFT) | \
+            ((score + _SCORE_OFFSET) << _SCORE_SHIFT)
+
+        if first_matches or depth >= (data[index] >> _DEPTH_SHIFT) & 0xFF or not data[index]:
+            if not first_matches and data[index]:
+                keys[index + 1] = keys[index]
+                data[index + 1] = data[index]
+            elif second_matches:
+                keys[index + 1] = 0
+                data[index + 1] = 0
+            keys[index] = key ^ new_data
+            data[index] = new_data
+        else:
+            keys[index + 1] = key ^ new_data
+            data[index + 1] = new_data
+
+    def clear(self):
+        """
+        Empties the table and resets the statistics
+        :return: Nothing
+        """
+        self._keys[:] = array("Q", [0]) * len(self._keys)
+        self._data[:] = array("Q", [0]) * len(self._data)
+        self._probes = 0
+        self._hits = 0
+        self._collisions = 0
+        self._stores = 0
+
+    def get_size(self) -> int:
+        """
+        Returns the number of slots in the table
+        :return: Slot count
+        """
+        return len(self._data)
+
+    def get_stats(self) -> dict:
+        """
+        Returns the probe, hit, collision and store counts. A collision is a
+        probe that missed although the bucket held other positions.
+        :return: Dictionary of statistic name to count
+        """
+        return {"probes": self._probes, "hits": self._hits,
+                "collisions": self._collisions, "stores": self._stores}
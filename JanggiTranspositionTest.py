@@ -0,0 +1,74 @@
+import unittest
+from JanggiGame import encode_move
+from JanggiTransposition import TranspositionTable, pack_move, unpack_move
+from JanggiTransposition import BOUND_EXACT, BOUND_LOWER, BOUND_UPPER
+
+
+class TranspositionTableTest(unittest.TestCase):
+    """Transposition table tests"""
+
+    def setUp(self) -> None:
+        self.table = TranspositionTable(1)
+
+    def test_size(self):
+        """Tests that the table fits in its memory budget"""
+        self.assertEqual(1024 * 1024 // 16, self.table.get_size())
+        self.assertEqual(2, TranspositionTable(0).get_size())
+
+    def test_store_and_probe(self):
+        """Tests that stored results come back unchanged"""
+        move = encode_move(54, 45)
+        self.table.store(12345, 4, BOUND_EXACT, -250, move)
+        self.table.store(67890, 2, BOUND_LOWER, 99000, None)
+        self.assertEqual((4, BOUND_EXACT, -250, move), self.table.probe(12345))
+        self.assertEqual((2, BOUND_LOWER, 99000, None), self.table.probe(67890))
+        self.assertIsNone(self.table.probe(55555))
+
+        # A result without a best move keeps the earlier best move
+        self.table.store(12345, 5, BOUND_UPPER, 10, None)
+        self.assertEqual((5, BOUND_UPPER, 10, move), self.table.probe(12345))
+
+    def test_replacement(self):
+        """Tests the depth-preferred and always-replace slots"""
+        buckets = self.table.get_size() // 2
+        deep, shallow, newest = 7, 7 + buckets, 7 + 2 * buckets
+        self.table.store(deep, 6, BOUND_EXACT, 1, None)
+        self.table.store(shallow, 2, BOUND_EXACT, 2, None)
+        self.assertIsNotNone(self.table.probe(deep))
+        self.assertIsNotNone(self.table.probe(shallow))
+
+        # A shallow result takes the always-replace slot and the deep result stays
+        self.table.store(newest, 1, BOUND_EXACT, 3, None)
+        self.assertIsNotNone(self.table.probe(deep))
+        self.assertIsNone(self.table.probe(shallow))
+        self.assertIsNotNone(self.table.probe(newest))
+
+        # A deeper result takes the depth-preferred slot and the old one moves over
+        self.table.store(shallow, 8, BOUND_EXACT, 4, None)
+        self.assertEqual(4, self.table.probe(shallow)[2])
+        self.assertEqual(1, self.table.probe(deep)[2])
+        self.assertIsNone(self.table.probe(newest))
+
+    def test_stats(self):
+        """Tests the hit and collision counts"""
+        buckets = self.table.get_size() // 2
+        self.table.store(3, 1, BOUND_EXACT, 0, None)
+        self.table.probe(3)
+        self.table.probe(3 + buckets)
+        self.table.probe(4)
+        self.assertEqual({"probes": 3, "hits": 1, "collisions": 1, "stores": 1},
+                         self.table.get_stats())
+        self.table.clear()
+        self.assertIsNone(self.table.probe(3))
+
+    def test_pack_move(self):
+        """Tests that moves survive packing"""
+        for move in (encode_move(0, 1), encode_move(89, 0, True), encode_move(40, 40)):
+            self.assertEqual(move, unpack_move(pack_move(move)))
+        self.assertEqual(0, pack_move(None))
+        self.assertIsNone(unpack_move(0))
+
+
+if __name__ == "__main__":
+    """Runs the unit test"""
+    unittest.main()